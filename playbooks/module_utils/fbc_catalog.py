@@ -0,0 +1,177 @@
+"""
+File-based catalog (FBC) helpers shared by the roles' modules: stream the
+documents of a rendered catalog (a JSON stream, YAML, or a /configs tree of
+either) and keep a compact on-disk index of what operator mirroring looks
+up - package -> default channel -> channels (entries, head) -> bundles
+(image, related images).
+"""
+
+import json
+import os
+
+from ansible.module_utils.json_cache import write_atomically
+
+INDEX_VERSION = 1
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class CatalogError(Exception):
+    pass
+
+
+def _json_documents(path):
+    """Documents of a JSON stream file, read a chunk at a time so a
+    catalog of hundreds of MB is never held in memory as a whole."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    with open(path) as f:
+        eof = False
+        while not eof:
+            chunk = f.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            position = 0
+            while True:
+                while position < len(buffer) and buffer[position].isspace():
+                    position += 1
+                if position == len(buffer):
+                    break
+                try:
+                    document, position = decoder.raw_decode(buffer, position)
+                except ValueError:
+                    if eof:
+                        raise CatalogError(f"{path}: invalid JSON at offset {position}")
+                    # Incomplete document; read more.
+                    break
+                yield document
+            buffer = buffer[position:]
+
+
+def _yaml_documents(path):
+    try:
+        import yaml
+    except ImportError:
+        raise CatalogError(f"PyYAML is needed to read {path}")
+    with open(path) as f:
+        for document in yaml.safe_load_all(f):
+            if document:
+                yield document
+
+
+def catalog_files(path):
+    """Catalog files at path (a file, or every .json/.yaml/.yml under a
+    directory in path order, hidden files excluded)."""
+    if not os.path.isdir(path):
+        return [path]
+    found = []
+    for directory, subdirectories, files in os.walk(path):
+        subdirectories[:] = sorted(d for d in subdirectories if not d.startswith("."))
+        found.extend(
+            os.path.join(directory, name)
+            for name in sorted(files)
+            if not name.startswith(".") and name.endswith((".json", ".yaml", ".yml"))
+        )
+    return found
+
+
+def documents(path):
+    """Every FBC document under path, in order."""
+    for file_path in catalog_files(path):
+        if file_path.endswith((".yaml", ".yml")):
+            yield from _yaml_documents(file_path)
+        else:
+            yield from _json_documents(file_path)
+
+
+def render(path, destination):
+    """Write every document under path to destination as a JSON stream,
+    one document per line."""
+    def write(f):
+        for document in documents(path):
+            f.write(json.dumps(document))
+            f.write("\n")
+    write_atomically(destination, write)
+
+
+def fingerprint(path):
+    return [
+        [os.path.relpath(file_path, path) if os.path.isdir(path) else os.path.basename(file_path),
+         os.stat(file_path).st_size, os.stat(file_path).st_mtime_ns]
+        for file_path in catalog_files(path)
+    ]
+
+
+def channel_head(entries):
+    """Name of the entry no other entry replaces or skips, or None if that
+    isn't unique."""
+    superseded = set()
+    for entry in entries:
+        if entry.get("replaces"):
+            superseded.add(entry["replaces"])
+        superseded.update(entry.get("skips") or [])
+    heads = [entry["name"] for entry in entries if entry["name"] not in superseded]
+    return heads[0] if len(heads) == 1 else None
+
+
+def build_index(path):
+    """Index of the catalog at path, built in one pass over its documents."""
+    packages = {}
+    order = []
+    declared = set()
+
+    def package(name):
+        if name not in packages:
+            packages[name] = {"default_channel": "", "channels": {}, "bundles": {}}
+            order.append(name)
+        return packages[name]
+
+    for document in documents(path):
+        schema = document.get("schema")
+        if schema == "olm.package" and document.get("name"):
+            package(document["name"])["default_channel"] = document.get("defaultChannel") or ""
+            declared.add(document["name"])
+        elif schema == "olm.channel" and document.get("package"):
+            entries = document.get("entries") or []
+            package(document["package"])["channels"][document.get("name", "")] = {
+                "entries": [entry["name"] for entry in entries],
+                "head": channel_head(entries),
+            }
+        elif schema == "olm.bundle" and document.get("package"):
+            package(document["package"])["bundles"][document.get("name", "")] = {
+                "image": document.get("image", ""),
+                "related_images": [
+                    related["image"] for related in document.get("relatedImages") or [] if related.get("image")
+                ],
+            }
+
+    # Packages with an olm.package document come first, as they are what a
+    # single-package catalog is named after.
+    return {
+        "version": INDEX_VERSION,
+        "order": [name for name in order if name in declared] + [name for name in order if name not in declared],
+        "packages": packages,
+    }
+
+
+def load_index(path, index_path):
+    """Index of the catalog at path, rebuilt only when the catalog files
+    changed since index_path was written. Returns (index, rebuilt)."""
+    current = fingerprint(path)
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION and index.get("fingerprint") == current:
+            return index, False
+    except (OSError, ValueError):
+        pass
+
+    index = build_index(path)
+    index["fingerprint"] = current
+    write_atomically(index_path, lambda f: json.dump(index, f, separators=(",", ":")))
+    return index, True
+
+
+def default_index_path(path):
+    if os.path.isdir(path):
+        return os.path.join(path, ".fbc-index.json")
+    return f"{path}.index"
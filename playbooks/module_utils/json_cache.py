@@ -0,0 +1,47 @@
+"""
+Small JSON cache files shared by the roles' modules: atomic writes, and
+loading with entries older than a TTL dropped.
+"""
+
+import json
+import os
+import tempfile
+
+
+def write_atomically(destination, write):
+    """Call write(f) on a scratch file next to destination and move it into
+    place, so readers never see a partly written file."""
+    directory = os.path.dirname(os.path.abspath(destination))
+    fd, scratch = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, "w") as f:
+            write(f)
+        os.replace(scratch, destination)
+    except BaseException:
+        os.unlink(scratch)
+        raise
+
+
+def load_cache(path, ttl, now, stamp, pinned=None):
+    """{key: entry} from the cache at path, keeping entries whose stamp
+    field is less than ttl seconds before now, and any entry whose key
+    pinned(key) says never expires. A missing or unreadable file is an
+    empty cache."""
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(entries, dict):
+        return {}
+    return {
+        key: entry
+        for key, entry in entries.items()
+        if isinstance(entry, dict)
+        and ((pinned is not None and pinned(key)) or now - entry.get(stamp, 0) < ttl)
+    }
+
+
+def save_cache(path, entries):
+    write_atomically(path, lambda f: json.dump(entries, f))
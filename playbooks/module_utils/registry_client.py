@@ -0,0 +1,263 @@
+"""
+Minimal Docker Registry HTTP API v2 client shared by the roles' modules
+(container_image_mirror, ocp_operator_mirror): manifest digests and bodies
+and blob downloads, with the registry token handshake and credentials read
+from the same auth files skopeo uses.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode, urljoin
+
+from ansible.module_utils.urls import open_url
+
+# Everything `skopeo copy --all` may have pushed, so the registry hands back
+# the top-level manifest (index/list included) instead of converting it.
+MANIFEST_ACCEPT = ", ".join(
+    [
+        "application/vnd.oci.image.index.v1+json",
+        "application/vnd.docker.distribution.manifest.list.v2+json",
+        "application/vnd.oci.image.manifest.v1+json",
+        "application/vnd.docker.distribution.manifest.v2+json",
+    ]
+)
+INDEX_MEDIA_TYPES = (
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+)
+
+DOCKER_HUB = "docker.io"
+DOCKER_HUB_API = "registry-1.docker.io"
+
+# Where skopeo/podman look for credentials when no --authfile is given, in
+# the order containers-auth.json(5) documents.
+DEFAULT_AUTH_FILES = (
+    "${REGISTRY_AUTH_FILE}",
+    "${XDG_RUNTIME_DIR}/containers/auth.json",
+    "~/.config/containers/auth.json",
+    "~/.docker/config.json",
+    "/etc/containers/auth.json",
+)
+
+CHALLENGE_PARAM_RE = re.compile(r'(\w+)="([^"]*)"')
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+class RegistryError(Exception):
+    pass
+
+
+def parse_reference(ref):
+    """Split 'registry/repo:tag' or 'registry/repo@sha256:...' into
+    (registry, repository, tag_or_digest), applying Docker Hub defaults."""
+    name, sep, digest = ref.partition("@")
+    if not sep:
+        # A ':' after the last '/' is a tag; one before it is a port.
+        slash = name.rfind("/")
+        colon = name.rfind(":")
+        if colon > slash:
+            name, digest = name[:colon], name[colon + 1:]
+        else:
+            digest = "latest"
+
+    first, _, rest = name.partition("/")
+    if rest and ("." in first or ":" in first or first == "localhost"):
+        registry, repository = first, rest
+    else:
+        registry, repository = DOCKER_HUB, name
+    if registry == DOCKER_HUB and "/" not in repository:
+        repository = f"library/{repository}"
+    return registry, repository, digest
+
+
+def load_auths(authfile=None):
+    """Registry -> 'user:password' base64 from authfile, or from the first
+    existing default auth file."""
+    candidates = [authfile] if authfile else [os.path.expanduser(os.path.expandvars(path)) for path in DEFAULT_AUTH_FILES]
+    for path in candidates:
+        if not path or "$" in path or not os.path.isfile(path):
+            continue
+        try:
+            with open(path) as f:
+                auths = json.load(f).get("auths", {})
+        except (OSError, ValueError):
+            continue
+        return {
+            re.sub(r"^https?://", "", key).rstrip("/"): entry.get("auth")
+            for key, entry in auths.items()
+            if entry.get("auth")
+        }
+    return {}
+
+
+class RegistryClient:
+    """Thread-safe: bearer tokens are cached per registry and scope, and
+    the HTTP scheme that worked for an insecure registry is remembered."""
+
+    def __init__(self, auths=None, timeout=30):
+        self.auths = auths or {}
+        self.timeout = timeout
+        self._tokens = {}
+        self._schemes = {}
+        self._lock = threading.Lock()
+
+    def _credentials(self, registry):
+        auth = self.auths.get(registry)
+        if auth is None and registry == DOCKER_HUB_API:
+            auth = self.auths.get(DOCKER_HUB) or self.auths.get("index.docker.io")
+        return auth
+
+    def _fetch_token(self, registry, challenge, scope):
+        params = dict(CHALLENGE_PARAM_RE.findall(challenge))
+        realm = params.pop("realm", None)
+        if not realm:
+            raise RegistryError(f"{registry}: bearer challenge without realm: {challenge}")
+        query = {"service": params.get("service", "")} if params.get("service") else {}
+        query["scope"] = params.get("scope", scope)
+
+        headers = {}
+        credentials = self._credentials(registry)
+        if credentials:
+            headers["Authorization"] = f"Basic {credentials}"
+        response = open_url(
+            f"{realm}?{urlencode(query)}", headers=headers, timeout=self.timeout, validate_certs=True
+        )
+        body = json.loads(response.read())
+        return body.get("token") or body.get("access_token")
+
+    def _open(self, method, registry, path, scope, headers, tls_verify, follow_redirects="urllib2"):
+        host = DOCKER_HUB_API if registry == DOCKER_HUB else registry
+        schemes = [self._schemes.get(host, "https")]
+        if not tls_verify and schemes[0] == "https":
+            # Same fallback skopeo makes with --tls-verify=false.
+            schemes.append("http")
+
+        last_error = None
+        for scheme in schemes:
+            url = f"{scheme}://{host}{path}"
+            request_headers = dict(headers)
+            with self._lock:
+                token = self._tokens.get((host, scope))
+            if token:
+                request_headers["Authorization"] = token
+            try:
+                try:
+                    response = open_url(
+                        url,
+                        method=method,
+                        headers=request_headers,
+                        timeout=self.timeout,
+                        validate_certs=tls_verify,
+                        follow_redirects=follow_redirects,
+                    )
+                except HTTPError as e:
+                    if e.code != 401:
+                        raise
+                    challenge = e.headers.get("WWW-Authenticate", "")
+                    if challenge.lower().startswith("bearer"):
+                        token = f"Bearer {self._fetch_token(host, challenge[6:].strip(), scope)}"
+                    elif self._credentials(host):
+                        token = f"Basic {self._credentials(host)}"
+                    else:
+                        raise
+                    with self._lock:
+                        self._tokens[(host, scope)] = token
+                    request_headers["Authorization"] = token
+                    response = open_url(
+                        url,
+                        method=method,
+                        headers=request_headers,
+                        timeout=self.timeout,
+                        validate_certs=tls_verify,
+                        follow_redirects=follow_redirects,
+                    )
+                self._schemes[host] = scheme
+                return response
+            except HTTPError:
+                raise
+            except (URLError, OSError) as e:
+                last_error = e
+        raise RegistryError(f"{host}: {last_error}")
+
+    def manifest_digest(self, ref, tls_verify=True):
+        """Digest of the manifest ref points at, or None if it doesn't
+        exist. HEAD only; falls back to hashing the body for registries
+        that omit Docker-Content-Digest."""
+        registry, repository, reference = parse_reference(ref)
+        path = f"/v2/{repository}/manifests/{reference}"
+        scope = f"repository:{repository}:pull"
+        try:
+            response = self._open(
+                "HEAD", registry, path, scope, {"Accept": MANIFEST_ACCEPT}, tls_verify
+            )
+        except HTTPError as e:
+            if e.code == 404:
+                return None
+            raise RegistryError(f"HEAD {registry}{path}: HTTP {e.code}")
+        digest = response.headers.get("Docker-Content-Digest")
+        if digest:
+            return digest
+        return self.get_manifest(ref, tls_verify)[2]
+
+    def get_manifest(self, ref, tls_verify=True):
+        """(media type, raw body, digest) of the manifest ref points at."""
+        registry, repository, reference = parse_reference(ref)
+        path = f"/v2/{repository}/manifests/{reference}"
+        scope = f"repository:{repository}:pull"
+        try:
+            response = self._open(
+                "GET", registry, path, scope, {"Accept": MANIFEST_ACCEPT}, tls_verify
+            )
+        except HTTPError as e:
+            raise RegistryError(f"GET {registry}{path}: HTTP {e.code}")
+        body = response.read()
+        media_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+        if not media_type:
+            media_type = json.loads(body).get("mediaType", "")
+        digest = "sha256:" + hashlib.sha256(body).hexdigest()
+        return media_type, body, digest
+
+    def image_blobs(self, ref, tls_verify=True):
+        """Digest -> size of every blob (configs and layers) `skopeo copy
+        --all` would copy for ref, following an index into each platform's
+        manifest."""
+        media_type, body, _ = self.get_manifest(ref, tls_verify)
+        manifest = json.loads(body)
+        if media_type in INDEX_MEDIA_TYPES or "manifests" in manifest:
+            registry, repository, _ = parse_reference(ref)
+            children = [
+                json.loads(self.get_manifest(f"{registry}/{repository}@{child['digest']}", tls_verify)[1])
+                for child in manifest.get("manifests", [])
+            ]
+        else:
+            children = [manifest]
+
+        blobs = {}
+        for child in children:
+            for descriptor in [child.get("config")] + child.get("layers", []):
+                if descriptor and descriptor.get("digest"):
+                    blobs[descriptor["digest"]] = descriptor.get("size", 0)
+        return blobs
+
+    def open_blob(self, ref, digest, tls_verify=True):
+        """Unread response streaming blob digest of ref's repository.
+
+        Registries usually redirect blob downloads to a CDN or object store
+        that rejects the registry's Authorization header, so the redirect is
+        followed without it.
+        """
+        registry, repository, _ = parse_reference(ref)
+        path = f"/v2/{repository}/blobs/{digest}"
+        scope = f"repository:{repository}:pull"
+        try:
+            return self._open("GET", registry, path, scope, {}, tls_verify, follow_redirects="none")
+        except HTTPError as e:
+            if e.code not in REDIRECT_CODES or not e.headers.get("Location"):
+                raise RegistryError(f"GET {registry}{path}: HTTP {e.code}")
+            location = urljoin(e.geturl(), e.headers["Location"])
+        return open_url(location, timeout=self.timeout, validate_certs=tls_verify)
@@ -0,0 +1,460 @@
+#!/usr/bin/python
+"""
+Ansible module that mirrors a list of images with `skopeo copy --all`
+through a bounded worker pool.
+
+Replaces a serial `command` loop with `retries`/`delay`: every image is
+retried independently with exponential backoff, so one slow or flaky image
+no longer holds up the rest of the list. Before copying, source and
+destination manifest digests are resolved concurrently and images the
+destination already holds byte-for-byte are skipped. The remaining copies
+are ordered so that layers shared between images are pushed once, by the
+first image that has them, before the images that reuse them start.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.registry_client import RegistryClient, RegistryError, load_auths
+
+DOCUMENTATION = r"""
+---
+module: skopeo_mirror
+short_description: Mirror container images concurrently with skopeo
+description:
+  - Runs C(skopeo copy --all) for each image, up to I(concurrency) at a time.
+  - A failed copy is retried with exponential backoff and jitter without
+    blocking the other images.
+  - With I(skip_existing), the source and destination manifest digests of
+    every image are first resolved concurrently (HEAD on
+    C(/v2/<repo>/manifests/<ref>)), and images whose digests already match
+    are not copied.
+  - With I(plan_shared_layers), the manifests of the images left to copy
+    (every platform of an index) are read first. Each blob shared by
+    several images is assigned to the first image that has it, images with
+    the most shared blobs go first, and an image only starts once the images
+    owning its shared blobs have made their first copy attempt (a failing
+    owner's retries don't hold it back). Later copies then find those blobs
+    already in the registry (or mount them from the other repository)
+    instead of uploading them again.
+  - Per-image failures do not fail the module; they are reported in
+    I(results) with a non-zero C(rc), like a looped C(command) task with
+    C(failed_when: false).
+options:
+  images:
+    description: Images to mirror, each a dict with C(source) and C(dest) keys.
+    type: list
+    elements: dict
+    required: true
+  registry:
+    description: Destination registry as C(host:port).
+    type: str
+    required: true
+  namespace:
+    description: Prefix prepended to every C(dest), e.g. C(ran-test/).
+    type: str
+    default: ""
+  authfile:
+    description: Registry auth file passed to skopeo as C(--authfile).
+    type: path
+  dest_tls_verify:
+    description: Verify the destination registry's TLS certificate.
+    type: bool
+    default: false
+  concurrency:
+    description: Maximum number of copies pushing to the destination registry at once.
+    type: int
+    default: 4
+  retries:
+    description: Retries per image after the first attempt fails.
+    type: int
+    default: 5
+  retry_delay:
+    description: Base delay in seconds before the first retry; doubled on every retry.
+    type: int
+    default: 10
+  retry_max_delay:
+    description: Upper bound in seconds for a single backoff delay.
+    type: int
+    default: 300
+  skip_existing:
+    description:
+      - Skip images whose destination manifest digest equals the source's.
+      - If either digest can't be resolved, the image is copied.
+    type: bool
+    default: true
+  plan_shared_layers:
+    description: Order copies so blobs shared between images are pushed once.
+    type: bool
+    default: true
+  digest_concurrency:
+    description: Maximum number of manifest digest and manifest lookups in flight.
+    type: int
+    default: 16
+"""
+
+EXAMPLES = r"""
+- name: Mirror images
+  skopeo_mirror:
+    images:
+      - source: quay.io/org/image:v1
+        dest: org/image:v1
+    registry: registry.example.com:5000
+    namespace: ran-test/
+    concurrency: 4
+  register: _mirror_result
+"""
+
+RETURN = r"""
+results:
+  description:
+    - One entry per input image, in input order, shaped like a looped
+      C(command) task's results so existing summaries keep working.
+  returned: always
+  type: list
+  elements: dict
+  contains:
+    image_item:
+      description: The input image dict.
+      type: dict
+    rc:
+      description: Exit code of the last skopeo attempt.
+      type: int
+    stdout:
+      description: Output of the last skopeo attempt.
+      type: str
+    stderr:
+      description: Error output of the last skopeo attempt.
+      type: str
+    cmd:
+      description: The skopeo command line.
+      type: list
+    attempts:
+      description: Number of skopeo attempts made.
+      type: int
+    elapsed:
+      description: Seconds spent on this image, including backoff.
+      type: float
+    mirror_status:
+      description: C(copied), C(skipped) (digests already matched) or C(failed).
+      type: str
+    source_digest:
+      description: Resolved source manifest digest, if looked up.
+      type: str
+    dest_digest:
+      description: Destination manifest digest before copying, if looked up.
+      type: str
+    waited_for:
+      description: C(dest) of the images this copy waited for to share their layers.
+      type: list
+      elements: str
+layer_plan:
+  description:
+    - Blob statistics of the images that were copied, when
+      I(plan_shared_layers) is on.
+    - C(logical_bytes) is the sum of every image's blobs, what independent
+      copies would push; C(transferred_bytes) counts each distinct blob of the
+      copied images once, an upper bound on what was actually uploaded.
+  returned: when plan_shared_layers
+  type: dict
+  contains:
+    images:
+      description: Number of images whose manifests were read.
+      type: int
+    blobs:
+      description: Number of distinct blobs across those images.
+      type: int
+    shared_blobs:
+      description: Number of blobs used by more than one image.
+      type: int
+    logical_bytes:
+      description: Sum of the blob sizes of every copied image.
+      type: int
+    transferred_bytes:
+      description: Size of the distinct blobs of the copied images.
+      type: int
+copied:
+  description: Number of images copied.
+  returned: always
+  type: int
+skipped:
+  description: Number of images already present with the same digest.
+  returned: always
+  type: int
+failed_images:
+  description: Number of images that failed to copy.
+  returned: always
+  type: int
+"""
+
+
+def destination_ref(registry, namespace, dest):
+    return f"{registry}/{namespace}{dest}"
+
+
+def resolve_digests(client, image, params):
+    """(source digest, destination digest, lookup error) for one image; a
+    digest is None when it couldn't be resolved or doesn't exist."""
+    source = image["source"]
+    dest = destination_ref(params["registry"], params["namespace"], image["dest"])
+    try:
+        if "@sha256:" in source:
+            source_digest = source.split("@", 1)[1]
+        else:
+            source_digest = client.manifest_digest(source)
+        dest_digest = client.manifest_digest(dest, tls_verify=params["dest_tls_verify"])
+    except (RegistryError, OSError, ValueError) as e:
+        return None, None, str(e)
+    return source_digest, dest_digest, None
+
+
+def skipped_result(image, started):
+    return {
+        "image_item": image,
+        "rc": 0,
+        "stdout": "",
+        "stderr": "",
+        "cmd": [],
+        "attempts": 0,
+        "elapsed": round(time.monotonic() - started, 2),
+        "changed": False,
+        "failed": False,
+        "mirror_status": "skipped",
+    }
+
+
+def plan_copy_order(blobs_by_image):
+    """Order image indexes for copying and work out what each must wait for.
+
+    blobs_by_image maps an index to its {blob digest: size}. Images with the
+    most shared blobs go first; each shared blob is owned by the first image
+    in that order that has it, and an image depends on the owners of its
+    blobs. Owners always come earlier, so the dependencies can't cycle.
+    """
+    users = {}
+    for index, blobs in blobs_by_image.items():
+        for digest in blobs:
+            users.setdefault(digest, []).append(index)
+
+    def shared_count(index):
+        return sum(1 for digest in blobs_by_image[index] if len(users[digest]) > 1)
+
+    order = sorted(blobs_by_image, key=lambda index: (-shared_count(index), index))
+    owner = {}
+    for index in order:
+        for digest in blobs_by_image[index]:
+            owner.setdefault(digest, index)
+
+    depends_on = {
+        index: sorted({owner[digest] for digest in blobs_by_image[index]} - {index})
+        for index in order
+    }
+    return order, depends_on
+
+
+def source_blobs(client, image):
+    """{blob digest: size} of an image's source, or {} if it can't be read;
+    such an image is simply copied without waiting for anything."""
+    try:
+        return client.image_blobs(image["source"])
+    except (RegistryError, OSError, ValueError, KeyError):
+        return {}
+
+
+def layer_plan(blobs_by_image, results):
+    copied = [index for index in blobs_by_image if results[index]["mirror_status"] == "copied"]
+    users = {}
+    for index in blobs_by_image:
+        for digest in blobs_by_image[index]:
+            users[digest] = users.get(digest, 0) + 1
+    sizes = {}
+    for index in copied:
+        sizes.update(blobs_by_image[index])
+    return {
+        "images": len(blobs_by_image),
+        "blobs": len(users),
+        "shared_blobs": sum(1 for count in users.values() if count > 1),
+        "logical_bytes": sum(sum(blobs_by_image[index].values()) for index in copied),
+        "transferred_bytes": sum(sizes.values()),
+    }
+
+
+def skopeo_copy_cmd(skopeo, image, params):
+    cmd = [skopeo, "copy", "--all"]
+    if params["authfile"]:
+        cmd.extend(["--authfile", params["authfile"]])
+    if not params["dest_tls_verify"]:
+        cmd.append("--dest-tls-verify=false")
+    cmd.append(f"docker://{image['source']}")
+    cmd.append(f"docker://{destination_ref(params['registry'], params['namespace'], image['dest'])}")
+    return cmd
+
+
+def backoff_delay(attempt, base, ceiling):
+    """Delay before retry number `attempt` (1-based): exponential, capped,
+    with jitter so images that failed together don't retry in lockstep."""
+    delay = min(ceiling, base * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def copy_result(image, cmd, attempts, started, rc, stdout, stderr):
+    return {
+        "image_item": image,
+        "rc": rc,
+        "stdout": stdout,
+        "stderr": stderr,
+        "cmd": cmd,
+        "attempts": attempts,
+        "elapsed": round(time.monotonic() - started, 2),
+        "changed": rc == 0,
+        "failed": False,
+        "mirror_status": "copied" if rc == 0 else "failed",
+    }
+
+
+def mirror_images(module, skopeo, images, order, depends_on, params):
+    """Copy images[index] for every index in order, at most `concurrency` at
+    a time, retrying each with backoff. Returns {index: result}.
+
+    Workers only ever run skopeo: a failed copy is resubmitted by a timer
+    once its backoff delay is up, so an image that is backing off doesn't
+    hold a worker. An image is submitted once every image it depends on has
+    made its first attempt, successful or not, so a flaky layer owner delays
+    its dependents by one copy rather than by all of its retries.
+    """
+    waiting = {index: set(depends_on.get(index, ())) for index in order}
+    dependents = {}
+    for index, owners in waiting.items():
+        for owner in owners:
+            dependents.setdefault(owner, []).append(index)
+    cmds = {index: skopeo_copy_cmd(skopeo, images[index], params) for index in order}
+    attempts = dict.fromkeys(order, 0)
+    started = {}
+    results = {}
+    lock = threading.Lock()
+    finished = threading.Event()
+    if not order:
+        return results
+
+    with ThreadPoolExecutor(max_workers=params["concurrency"]) as pool:
+        def attempt(index):
+            started.setdefault(index, time.monotonic())
+            attempts[index] += 1
+            try:
+                rc, stdout, stderr = module.run_command(cmds[index])
+            except Exception as e:
+                rc, stdout, stderr = 1, "", str(e)
+            retry = rc != 0 and attempts[index] <= params["retries"]
+
+            ready = []
+            with lock:
+                if attempts[index] == 1:
+                    for dependent in dependents.get(index, ()):
+                        waiting[dependent].discard(index)
+                        if not waiting[dependent]:
+                            ready.append(dependent)
+                if not retry:
+                    results[index] = copy_result(
+                        images[index], cmds[index], attempts[index], started[index], rc, stdout, stderr
+                    )
+                    if len(results) == len(order):
+                        finished.set()
+            for dependent in ready:
+                pool.submit(attempt, dependent)
+            if retry:
+                delay = backoff_delay(attempts[index], params["retry_delay"], params["retry_max_delay"])
+                timer = threading.Timer(delay, pool.submit, (attempt, index))
+                timer.daemon = True
+                timer.start()
+
+        # Submitting in plan order hands the layer owners the first workers.
+        for index in order:
+            if not waiting[index]:
+                pool.submit(attempt, index)
+        finished.wait()
+    return results
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            images=dict(type="list", elements="dict", required=True),
+            registry=dict(type="str", required=True),
+            namespace=dict(type="str", default=""),
+            authfile=dict(type="path"),
+            dest_tls_verify=dict(type="bool", default=False),
+            concurrency=dict(type="int", default=4),
+            retries=dict(type="int", default=5),
+            retry_delay=dict(type="int", default=10),
+            retry_max_delay=dict(type="int", default=300),
+            skip_existing=dict(type="bool", default=True),
+            plan_shared_layers=dict(type="bool", default=True),
+            digest_concurrency=dict(type="int", default=16),
+        ),
+        supports_check_mode=False,
+    )
+    params = module.params
+
+    for image in params["images"]:
+        if not image.get("source") or not image.get("dest"):
+            module.fail_json(msg=f"Every image needs 'source' and 'dest', got {image}")
+    if params["concurrency"] < 1:
+        module.fail_json(msg="concurrency must be at least 1")
+
+    skopeo = module.get_bin_path("skopeo", required=True)
+
+    images = params["images"]
+    started = time.monotonic()
+
+    client = RegistryClient(load_auths(params["authfile"]))
+    digests = [(None, None, None)] * len(images)
+    if params["skip_existing"] and images:
+        with ThreadPoolExecutor(max_workers=params["digest_concurrency"]) as pool:
+            digests = list(pool.map(lambda image: resolve_digests(client, image, params), images))
+
+    results = [None] * len(images)
+    to_copy = []
+    for index, (image, (source_digest, dest_digest, _)) in enumerate(zip(images, digests)):
+        if source_digest and source_digest == dest_digest:
+            results[index] = skipped_result(image, started)
+        else:
+            to_copy.append(index)
+
+    order, depends_on, blobs_by_image = to_copy, {}, {}
+    if params["plan_shared_layers"] and to_copy:
+        with ThreadPoolExecutor(max_workers=params["digest_concurrency"]) as pool:
+            blobs_by_image = dict(zip(to_copy, pool.map(lambda index: source_blobs(client, images[index]), to_copy)))
+        order, depends_on = plan_copy_order(blobs_by_image)
+
+    copied = mirror_images(module, skopeo, images, order, depends_on, params)
+    for index, result in copied.items():
+        results[index] = result
+        if index in depends_on:
+            result["waited_for"] = [images[owner]["dest"] for owner in depends_on[index]]
+
+    for result, (source_digest, dest_digest, lookup_error) in zip(results, digests):
+        result["source_digest"] = source_digest
+        result["dest_digest"] = dest_digest
+        if lookup_error:
+            result["digest_lookup_error"] = lookup_error
+
+    statuses = [result["mirror_status"] for result in results]
+    extra = {}
+    if params["plan_shared_layers"]:
+        extra["layer_plan"] = layer_plan(blobs_by_image, results)
+    module.exit_json(
+        changed="copied" in statuses,
+        results=results,
+        copied=statuses.count("copied"),
+        skipped=statuses.count("skipped"),
+        failed_images=statuses.count("failed"),
+        elapsed=round(time.monotonic() - started, 2),
+        **extra,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+#!/usr/bin/python
+"""
+Ansible module that prepares the FBC index images of several operators at
+once: fetches the /configs catalog of each distinct index image, mirrors the
+image to the internal registry and copies the catalog into a per-operator
+directory or renders it to a JSON file.
+
+Replaces the per-operator remove/pull/create/cp sequence that
+mirror_from_fbc.yaml ran serially for every operator, and the
+`podman run ... render /configs` of the production index, so the
+preparation takes as long as the slowest operator instead of the sum of all
+of them and never has to unpack a whole index image into podman storage.
+"""
+
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.fbc_catalog import CatalogError, render
+from ansible.module_utils.registry_client import (
+    INDEX_MEDIA_TYPES,
+    RegistryClient,
+    RegistryError,
+    load_auths,
+    parse_reference,
+)
+
+DOCUMENTATION = r"""
+---
+module: fbc_catalog_extract
+short_description: Fetch, mirror and extract FBC index catalogs concurrently
+description:
+  - Processes up to I(concurrency) catalogs at a time, each in its own
+    extract directory.
+  - With I(method=registry), the index manifest and image config are read
+    from the registry and every layer is streamed and untarred in order,
+    keeping just the catalog files.
+  - Catalogs are cached in I(cache_dir) by index image digest, so a later
+    run against the same index only resolves the digest.
+  - If the registry can't be read, or with I(method=podman), the image is
+    pulled and the catalog copied out of a temporary container instead.
+  - An index image shared by several catalogs is fetched once, and mirrored
+    once per destination; the other catalogs reuse it.
+options:
+  catalogs:
+    description:
+      - Catalogs to prepare, each a dict with C(name), C(image) (index image
+        with tag or digest) and at least one of C(extract_dir) (emptied, then
+        receives C(configs/)) and C(render_to) (file that receives every
+        catalog document as a JSON stream, like C(opm render)).
+      - An optional C(mirror_dest) is a reference to C(skopeo copy --all) the
+        index image to.
+      - Other keys are ignored.
+    type: list
+    elements: dict
+    required: true
+  authfile:
+    description: Registry auth file for the registry client, podman and skopeo.
+    type: path
+  method:
+    description: Where catalogs are read from; C(registry) falls back to C(podman) per image.
+    type: str
+    choices: [registry, podman]
+    default: registry
+  tls_verify:
+    description: Verify TLS certificates when reading index images from the registry.
+    type: bool
+    default: true
+  cache_dir:
+    description: Directory holding extracted catalogs, one subdirectory per index image digest.
+    type: path
+    default: /tmp/fbc-cache
+  concurrency:
+    description: Maximum number of catalogs processed at once.
+    type: int
+    default: 4
+  retries:
+    description: Retries for a failed fetch, pull or mirror.
+    type: int
+    default: 3
+  retry_delay:
+    description: Seconds between retries.
+    type: int
+    default: 10
+  container_prefix:
+    description: Name prefix of the temporary containers used by the podman method.
+    type: str
+    default: fbc_tmp_
+"""
+
+EXAMPLES = r"""
+- name: Prepare FBC catalogs
+  fbc_catalog_extract:
+    catalogs:
+      - name: sriov-fec
+        image: quay.io/org/fbc:ocp__4.20__sriov-fec
+        extract_dir: /tmp/fbc/sriov-fec-4.20
+        mirror_dest: registry.example.com:5000/operators/sriov-fec
+    authfile: /tmp/auth.json
+  register: _fbc_extract
+
+- name: Render the production catalog
+  fbc_catalog_extract:
+    catalogs:
+      - name: redhat-operators
+        image: registry.redhat.io/redhat/redhat-operator-index:v4.20
+        render_to: /tmp/prod_catalog.json
+    authfile: /tmp/auth.json
+"""
+
+RETURN = r"""
+results:
+  description: One entry per input catalog, in input order.
+  returned: always
+  type: list
+  elements: dict
+  contains:
+    name:
+      description: The catalog's C(name).
+      type: str
+    image:
+      description: The index image.
+      type: str
+    digest:
+      description: Digest of the index image.
+      type: str
+    extract_dir:
+      description: Directory holding the extracted C(configs/), if requested.
+      type: str
+    render_to:
+      description: File the catalog was rendered to, if requested.
+      type: str
+    source:
+      description: C(cache), C(registry) or C(podman), where the catalog came from.
+      type: str
+    elapsed:
+      description: Seconds spent on this catalog, including waiting for a shared fetch.
+      type: float
+"""
+
+CONFIGS_DIR = "configs"
+CONFIGS_LABEL = "operators.operatorframework.io.index.configs.v1"
+WHITEOUT_PREFIX = ".wh."
+OPAQUE_WHITEOUT = ".wh..wh..opq"
+
+
+class StepError(Exception):
+    pass
+
+
+class Once:
+    """Runs a function once per key; concurrent callers with the same key
+    wait for the first one and share its result or error."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def __call__(self, key, function):
+        with self._lock:
+            entry = self._entries.setdefault(key, {"lock": threading.Lock()})
+        with entry["lock"]:
+            if "result" not in entry and "error" not in entry:
+                try:
+                    entry["result"] = function()
+                except StepError as e:
+                    entry["error"] = e
+        if "error" in entry:
+            raise entry["error"]
+        return entry["result"]
+
+
+def retrying(function, retries, delay):
+    for attempt in range(retries + 1):
+        try:
+            return function()
+        except (StepError, RegistryError, OSError, tarfile.TarError, ValueError, KeyError) as e:
+            error = e
+        if attempt < retries:
+            time.sleep(delay)
+    raise StepError(str(error))
+
+
+def run(module, cmd):
+    rc, stdout, stderr = module.run_command(cmd)
+    if rc != 0:
+        raise StepError(f"{' '.join(cmd)} failed with rc {rc}: {stderr.strip()}")
+    return stdout
+
+
+def with_authfile(cmd, authfile):
+    return cmd[:2] + (["--authfile", authfile] if authfile else []) + cmd[2:]
+
+
+def cache_entry(cache_dir, digest):
+    return os.path.join(cache_dir, digest.replace(":", "-"))
+
+
+def store_in_cache(cache_dir, digest, fill):
+    """Run fill(tmp_dir) to produce configs/ in a scratch directory, then
+    move it into the cache in one rename, so concurrent runs never see a
+    half-written entry."""
+    os.makedirs(cache_dir, exist_ok=True)
+    scratch = tempfile.mkdtemp(prefix=".incoming-", dir=cache_dir)
+    try:
+        fill(scratch)
+        if not os.path.isdir(os.path.join(scratch, CONFIGS_DIR)):
+            raise StepError(f"no /{CONFIGS_DIR} directory in the index image")
+        try:
+            os.rename(scratch, cache_entry(cache_dir, digest))
+        except OSError:
+            # Another run stored the same digest first.
+            if not os.path.isdir(cache_entry(cache_dir, digest)):
+                raise
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return cache_entry(cache_dir, digest)
+
+
+def platform_manifest(client, image, tls_verify):
+    """(index digest, image manifest) of image; for a multi-arch index the
+    linux/amd64 manifest, as every platform carries the same catalog."""
+    media_type, body, digest = client.get_manifest(image, tls_verify)
+    manifest = json.loads(body)
+    if media_type in INDEX_MEDIA_TYPES or "manifests" in manifest:
+        children = manifest.get("manifests", [])
+        if not children:
+            raise StepError(f"{image}: empty image index")
+        child = next(
+            (c for c in children if c.get("platform", {}).get("architecture") == "amd64"
+             and c.get("platform", {}).get("os", "linux") == "linux"),
+            children[0],
+        )
+        registry, repository, _ = parse_reference(image)
+        manifest = json.loads(client.get_manifest(f"{registry}/{repository}@{child['digest']}", tls_verify)[1])
+    return digest, manifest
+
+
+def catalog_path(name, prefix):
+    """name of a layer member relative to the catalog directory prefix, or
+    None when the member lies outside it."""
+    name = name[2:] if name.startswith("./") else name
+    name = os.path.normpath(name.lstrip("/"))
+    if name != prefix and not name.startswith(prefix + "/"):
+        return None
+    relative = os.path.relpath(name, prefix)
+    return None if relative.startswith("..") else relative
+
+
+def untar_catalog(stream, dest, configs_path):
+    """Apply one layer's changes under configs_path to dest/configs."""
+    prefix = configs_path.strip("/")
+    root = os.path.join(dest, CONFIGS_DIR)
+    with tarfile.open(fileobj=stream, mode="r|*") as layer:
+        for member in layer:
+            relative = catalog_path(member.name, prefix)
+            if relative is None:
+                continue
+            directory, base = os.path.split(relative)
+            target_dir = os.path.normpath(os.path.join(root, directory))
+            if base == OPAQUE_WHITEOUT:
+                shutil.rmtree(target_dir, ignore_errors=True)
+                os.makedirs(target_dir, exist_ok=True)
+                continue
+            if base.startswith(WHITEOUT_PREFIX):
+                removed = os.path.join(target_dir, base[len(WHITEOUT_PREFIX):])
+                if os.path.isdir(removed) and not os.path.islink(removed):
+                    shutil.rmtree(removed)
+                elif os.path.lexists(removed):
+                    os.remove(removed)
+                continue
+            target = os.path.normpath(os.path.join(root, relative))
+            if member.isdir():
+                os.makedirs(target, exist_ok=True)
+            elif member.isfile():
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if os.path.lexists(target):
+                    os.remove(target)
+                with layer.extractfile(member) as source, open(target, "wb") as f:
+                    shutil.copyfileobj(source, f, 1024 * 1024)
+            elif member.islnk():
+                # A hard link names an earlier member of this or a lower
+                # layer; inside the catalog that file is already extracted.
+                source = catalog_path(member.linkname, prefix)
+                if source is None or not os.path.isfile(os.path.join(root, source)):
+                    raise StepError(f"{member.name} is a hard link to {member.linkname}, outside the catalog")
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if os.path.lexists(target):
+                    os.remove(target)
+                link_or_copy(os.path.join(root, source), target)
+
+
+def fetch_from_registry(client, image, params):
+    """(digest, cached catalog path, source) of image via the registry API."""
+    digest, manifest = platform_manifest(client, image, params["tls_verify"])
+    if os.path.isdir(os.path.join(cache_entry(params["cache_dir"], digest), CONFIGS_DIR)):
+        return digest, cache_entry(params["cache_dir"], digest), "cache"
+
+    config_response = client.open_blob(image, manifest["config"]["digest"], params["tls_verify"])
+    config = json.loads(config_response.read())
+    configs_path = config.get("config", {}).get("Labels", {}).get(CONFIGS_LABEL) or f"/{CONFIGS_DIR}"
+
+    def fill(scratch):
+        # Every layer: one that adds catalog files without naming the
+        # directory in its history (COPY . /, an ADD of a tarball) would
+        # otherwise be dropped; untar_catalog keeps only the catalog.
+        for layer in manifest.get("layers", []):
+            untar_catalog(client.open_blob(image, layer["digest"], params["tls_verify"]), scratch, configs_path)
+
+    return digest, store_in_cache(params["cache_dir"], digest, fill), "registry"
+
+
+def fetch_with_podman(module, podman, image, container, params):
+    """(digest, cached catalog path, source) of image via podman pull/cp."""
+    run(module, with_authfile([podman, "pull", "--quiet", image], params["authfile"]))
+    digest = run(module, [podman, "image", "inspect", "--format", "{{.Digest}}", image]).strip()
+    if os.path.isdir(os.path.join(cache_entry(params["cache_dir"], digest), CONFIGS_DIR)):
+        return digest, cache_entry(params["cache_dir"], digest), "cache"
+
+    def fill(scratch):
+        run(module, [podman, "rm", "--force", "--ignore", container])
+        run(module, [podman, "create", "--name", container, image])
+        try:
+            run(module, [podman, "cp", f"{container}:/{CONFIGS_DIR}", scratch + "/"])
+        finally:
+            module.run_command([podman, "rm", "--force", "--ignore", container])
+
+    return digest, store_in_cache(params["cache_dir"], digest, fill), "podman"
+
+
+def fetch(module, tools, client, image, container, params):
+    if params["method"] == "registry":
+        try:
+            return retrying(lambda: fetch_from_registry(client, image, params), params["retries"], params["retry_delay"])
+        except StepError as e:
+            module.warn(f"Reading {image} from the registry failed ({e}); falling back to podman")
+    podman = tools.get("podman") or module.get_bin_path("podman", required=True)
+    return retrying(lambda: fetch_with_podman(module, podman, image, container, params),
+                    params["retries"], params["retry_delay"])
+
+
+def link_or_copy(source, destination):
+    # Hard links are enough: later tasks add files (catalog.yaml) next to
+    # the catalog but never rewrite the extracted ones in place.
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def mirror(module, skopeo, image, dest, params):
+    def copy():
+        run(module, with_authfile([skopeo, "copy", "--all", "--retry-times", "3", f"docker://{image}", f"docker://{dest}"],
+                                  params["authfile"]))
+    retrying(copy, params["retries"], params["retry_delay"])
+
+
+def prepare(module, tools, client, index, catalog, params, fetches, mirrors):
+    started = time.monotonic()
+    image = catalog["image"]
+    # Container names only have to be unique within this run.
+    container = f"{params['container_prefix']}{catalog['name']}-{index}"
+
+    digest, cached, source = fetches(image, lambda: fetch(module, tools, client, image, container, params))
+    if catalog.get("mirror_dest"):
+        mirrors((image, catalog["mirror_dest"]),
+                lambda: mirror(module, tools["skopeo"], image, catalog["mirror_dest"], params))
+
+    result = {"name": catalog["name"], "image": image, "digest": digest, "source": source}
+    configs = os.path.join(cached, CONFIGS_DIR)
+    if catalog.get("extract_dir"):
+        shutil.rmtree(catalog["extract_dir"], ignore_errors=True)
+        os.makedirs(catalog["extract_dir"], mode=0o755)
+        shutil.copytree(configs, os.path.join(catalog["extract_dir"], CONFIGS_DIR), copy_function=link_or_copy)
+        result["extract_dir"] = catalog["extract_dir"]
+    if catalog.get("render_to"):
+        render(configs, catalog["render_to"])
+        result["render_to"] = catalog["render_to"]
+    result["elapsed"] = round(time.monotonic() - started, 2)
+    return result
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            catalogs=dict(type="list", elements="dict", required=True),
+            authfile=dict(type="path"),
+            method=dict(type="str", choices=["registry", "podman"], default="registry"),
+            tls_verify=dict(type="bool", default=True),
+            cache_dir=dict(type="path", default="/tmp/fbc-cache"),
+            concurrency=dict(type="int", default=4),
+            retries=dict(type="int", default=3),
+            retry_delay=dict(type="int", default=10),
+            container_prefix=dict(type="str", default="fbc_tmp_"),
+        ),
+        supports_check_mode=False,
+    )
+    params = module.params
+
+    for catalog in params["catalogs"]:
+        if not (catalog.get("name") and catalog.get("image")):
+            module.fail_json(msg=f"Every catalog needs 'name' and 'image', got {catalog}")
+        if not (catalog.get("extract_dir") or catalog.get("render_to")):
+            module.fail_json(msg=f"Catalog {catalog['name']} needs 'extract_dir' or 'render_to'")
+    if params["concurrency"] < 1:
+        module.fail_json(msg="concurrency must be at least 1")
+
+    tools = {}
+    if params["method"] == "podman":
+        tools["podman"] = module.get_bin_path("podman", required=True)
+    if any(catalog.get("mirror_dest") for catalog in params["catalogs"]):
+        tools["skopeo"] = module.get_bin_path("skopeo", required=True)
+    client = RegistryClient(load_auths(params["authfile"]))
+
+    fetches, mirrors = Once(), Once()
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=params["concurrency"]) as pool:
+        futures = [
+            pool.submit(prepare, module, tools, client, index, catalog, params, fetches, mirrors)
+            for index, catalog in enumerate(params["catalogs"])
+        ]
+
+    results, errors = [], []
+    for catalog, future in zip(params["catalogs"], futures):
+        try:
+            results.append(future.result())
+        except (StepError, CatalogError, OSError, ValueError) as e:
+            errors.append(f"{catalog['name']}: {e}")
+            results.append({"name": catalog["name"], "image": catalog["image"], "failed": True, "msg": str(e)})
+
+    elapsed = round(time.monotonic() - started, 2)
+    if errors:
+        module.fail_json(msg="; ".join(errors), results=results, elapsed=elapsed)
+    module.exit_json(changed=True, results=results, elapsed=elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/python
+"""
+Ansible module that answers operator lookups (default channel, channel
+entries, bundle selection, bundle images) from an indexed FBC catalog.
+
+Replaces reading whole rendered catalogs into facts and filtering them with
+selectattr chains, or running jq over them, once per operator: the catalog
+is streamed once into a compact on-disk index, reused until the catalog
+changes, and every lookup is a dictionary access.
+"""
+
+import re
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.compat.version import LooseVersion
+from ansible.module_utils.fbc_catalog import CatalogError, default_index_path, load_index
+
+DOCUMENTATION = r"""
+---
+module: fbc_catalog_query
+short_description: Look up packages, channels and bundles in an FBC catalog
+description:
+  - Builds an index of I(catalog) (package, default channel, channel
+    entries and head, bundle image and related images) in one streaming
+    pass and stores it in I(index_path). The index is only rebuilt when the
+    catalog files change.
+  - Answers every query from the index.
+options:
+  catalog:
+    description:
+      - A rendered catalog (JSON stream or YAML) or a directory of them,
+        such as an extracted C(/configs) or one package directory of it.
+    type: path
+    required: true
+  index_path:
+    description:
+      - Where the index is stored. Defaults to C(<catalog>.index) for a file
+        and C(<catalog>/.fbc-index.json) for a directory.
+    type: path
+  queries:
+    description:
+      - Lookups, each a dict with optional C(package) (the first package of
+        the catalog if omitted), C(channel) and C(bundle_version).
+      - With C(channel), a bundle is selected like the role always has: the
+        channel's entries (all of the package's bundles if the channel has
+        none), filtered by the C(bundle_version) regular expression, highest
+        version last. A query that can't select a bundle fails the module.
+      - Without C(channel), only package information is returned, and a
+        package missing from the catalog is not an error.
+    type: list
+    elements: dict
+    required: true
+"""
+
+EXAMPLES = r"""
+- name: Look up default channels
+  fbc_catalog_query:
+    catalog: /tmp/prod_catalog.json
+    queries:
+      - package: local-storage-operator
+  register: _prod_catalog_query
+
+- name: Select a bundle
+  fbc_catalog_query:
+    catalog: /tmp/fbc/sriov-network-operator-4.19/configs/sriov-network-operator
+    queries:
+      - channel: stable
+        bundle_version: '4\.19\.0'
+"""
+
+RETURN = r"""
+results:
+  description: One entry per query, in query order.
+  returned: always
+  type: list
+  elements: dict
+  contains:
+    package:
+      description: The package looked up.
+      type: str
+    found:
+      description: Whether the package is in the catalog.
+      type: bool
+    default_channel:
+      description: The package's default channel, empty if unknown.
+      type: str
+    channels:
+      description: Names of the package's channels.
+      type: list
+      elements: str
+    channel_head:
+      description: Head of the queried channel, if the channel was given and its head is unique.
+      type: str
+    entries:
+      description: Bundle names the selection was made from.
+      type: list
+      elements: str
+    bundle:
+      description: Selected bundle name.
+      type: str
+    images:
+      description: The selected bundle's image followed by its related images, without duplicates.
+      type: list
+      elements: str
+index_rebuilt:
+  description: Whether the index was (re)built from the catalog in this run.
+  returned: always
+  type: bool
+"""
+
+
+class QueryError(Exception):
+    pass
+
+
+def unique(items):
+    return list(dict.fromkeys(items))
+
+
+def select_bundle(package_name, package, query):
+    channel = query["channel"]
+    channel_info = package["channels"].get(channel, {})
+    entries = channel_info.get("entries") or list(package["bundles"])
+    if not entries:
+        raise QueryError(
+            f"No entries for package '{package_name}' channel '{channel}'. "
+            f"Available channels: {list(package['channels'])}"
+        )
+
+    candidates = entries
+    if query.get("bundle_version"):
+        candidates = [name for name in entries if re.search(query["bundle_version"], name)]
+        if not candidates:
+            raise QueryError(
+                f"No bundle entry matched version filter '{query['bundle_version']}' in channel '{channel}'"
+            )
+
+    # Same ordering as community.general.version_sort.
+    chosen = sorted(candidates, key=LooseVersion)[-1]
+    bundle = package["bundles"].get(chosen)
+    if bundle is None:
+        raise QueryError(f"Channel '{channel}' of package '{package_name}' lists bundle '{chosen}' the catalog doesn't have")
+    return {
+        "channel_head": channel_info.get("head"),
+        "entries": entries,
+        "bundle": chosen,
+        "images": unique([bundle["image"]] + bundle["related_images"]),
+    }
+
+
+def answer(index, query):
+    package_name = query.get("package") or (index["order"][0] if index["order"] else "")
+    package = index["packages"].get(package_name)
+    if package is None:
+        if query.get("channel"):
+            raise QueryError(f"No package '{package_name}' in catalog; packages: {index['order'][:20]}")
+        return {"package": package_name, "found": False, "default_channel": "", "channels": []}
+
+    result = {
+        "package": package_name,
+        "found": True,
+        "default_channel": package["default_channel"],
+        "channels": list(package["channels"]),
+    }
+    if query.get("channel"):
+        result.update(select_bundle(package_name, package, query))
+    return result
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            catalog=dict(type="path", required=True),
+            index_path=dict(type="path"),
+            queries=dict(type="list", elements="dict", required=True),
+        ),
+        supports_check_mode=True,
+    )
+    catalog = module.params["catalog"]
+    index_path = module.params["index_path"] or default_index_path(catalog)
+
+    try:
+        index, rebuilt = load_index(catalog, index_path)
+    except (CatalogError, OSError, ValueError) as e:
+        module.fail_json(msg=f"Failed to index catalog {catalog}: {e}")
+
+    results = []
+    for query in module.params["queries"]:
+        try:
+            results.append(answer(index, query))
+        except (QueryError, re.error, TypeError) as e:
+            module.fail_json(msg=str(e), results=results, index_rebuilt=rebuilt)
+
+    module.exit_json(changed=False, results=results, index_rebuilt=rebuilt)
+
+
+if __name__ == "__main__":
+    main()
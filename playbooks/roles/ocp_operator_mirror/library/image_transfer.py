@@ -0,0 +1,278 @@
+#!/usr/bin/python
+"""
+Ansible module that mirrors FBC bundle and related images together with
+their sigstore signatures, several images at a time.
+
+Replaces the serial `skopeo copy` loop of mirror_operators_fbc.yaml and the
+second serial `oc image mirror` loop over the `.sig` artifacts: an image and
+its signature are one unit of work, retried together, and a JSON report
+records what each unit transferred, how long it took and how many attempts
+it needed.
+"""
+
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.registry_client import RegistryClient, RegistryError, load_auths
+
+DOCUMENTATION = r"""
+---
+module: image_transfer
+short_description: Mirror images and their sigstore signatures concurrently
+description:
+  - Copies each image with C(skopeo copy --all), up to I(concurrency)
+    images at a time.
+  - With I(signatures), a source pinned by digest also has its sigstore
+    signature (C(<repository>:sha256-<hex>.sig)) copied right after it. A
+    source without a signature is not an error.
+  - A unit whose image or signature copy fails is retried, continuing with
+    the step that failed, up to I(retries) times.
+  - Fails if any image could not be copied. A signature that could not be
+    copied only produces a warning.
+options:
+  images:
+    description:
+      - Images to mirror, each a dict with C(src) and C(dst) references.
+    type: list
+    elements: dict
+    required: true
+  authfile:
+    description: Registry credentials used for both skopeo and size lookups.
+    type: path
+  tls_verify:
+    description: Verify TLS certificates of the source and destination registries.
+    type: bool
+    default: false
+  signatures:
+    description: Also mirror the sigstore signature of every digest-pinned source.
+    type: bool
+    default: false
+  concurrency:
+    description: Units transferred at the same time.
+    type: int
+    default: 4
+  retries:
+    description: Retries per unit after the first attempt.
+    type: int
+    default: 3
+  retry_delay:
+    description: Seconds to wait between attempts of a unit.
+    type: int
+    default: 3
+  report_path:
+    description: Where to write the JSON transfer report. Not written if omitted.
+    type: path
+"""
+
+EXAMPLES = r"""
+- name: Mirror bundle images and signatures
+  image_transfer:
+    images:
+      - src: registry.redhat.io/openshift4/ose-sriov-network-operator-bundle@sha256:abc...
+        dst: registry.example.com:5000/operators/openshift4/ose-sriov-network-operator-bundle@sha256:abc...
+    authfile: /tmp/auth.json
+    signatures: true
+    concurrency: 8
+    report_path: /tmp/transfer_report.json
+"""
+
+RETURN = r"""
+results:
+  description: One entry per image, in input order. Also the C(images) of the report.
+  returned: always
+  type: list
+  elements: dict
+  contains:
+    src:
+      description: Source reference.
+      type: str
+    dst:
+      description: Destination reference.
+      type: str
+    status:
+      description: C(copied) or C(failed).
+      type: str
+    attempts:
+      description: Attempts the unit took.
+      type: int
+    duration:
+      description: Seconds from the first attempt to the last.
+      type: float
+    bytes:
+      description: Size of the source's configs and layers, null if it couldn't be looked up.
+      type: int
+    signature:
+      description: C(src), C(dst), C(status) (C(copied), C(absent), C(failed) or C(skipped)) and C(bytes) of the signature.
+      type: dict
+    error:
+      description: Last error of a failed step.
+      type: str
+report:
+  description: The transfer report, also written to I(report_path).
+  returned: always
+  type: dict
+  contains:
+    elapsed:
+      description: Seconds for the whole transfer.
+      type: float
+    bytes:
+      description: Total bytes of the copied images and signatures.
+      type: int
+    copied:
+      description: Images copied.
+      type: int
+    failed:
+      description: Images that could not be copied.
+      type: int
+    signatures_copied:
+      description: Signatures copied.
+      type: int
+    images:
+      description: Same as I(results).
+      type: list
+"""
+
+DIGEST_RE = re.compile(r"@(sha256:[0-9a-f]{64})$")
+
+
+def signature_ref(ref):
+    """Sigstore signature tag of a digest-pinned ref, None for a tag."""
+    match = DIGEST_RE.search(ref)
+    if not match:
+        return None
+    return f"{ref[:match.start()]}:{match.group(1).replace(':', '-')}.sig"
+
+
+def size_of(client, ref, tls_verify):
+    try:
+        return sum(client.image_blobs(ref, tls_verify).values())
+    except (RegistryError, ValueError, KeyError):
+        return None
+
+
+def skopeo_copy_cmd(skopeo, src, dst, params):
+    cmd = [skopeo, "copy", "--all"]
+    if params["authfile"]:
+        cmd.extend(["--authfile", params["authfile"]])
+    if not params["tls_verify"]:
+        cmd.extend(["--src-tls-verify=false", "--dest-tls-verify=false"])
+    cmd.extend([f"docker://{src}", f"docker://{dst}"])
+    return cmd
+
+
+def copy(module, skopeo, src, dst, params):
+    """None on success, the error otherwise."""
+    rc, _, stderr = module.run_command(skopeo_copy_cmd(skopeo, src, dst, params))
+    return None if rc == 0 else f"skopeo copy {src} failed with rc {rc}: {stderr.strip()}"
+
+
+def transfer(module, skopeo, client, image, params):
+    """Mirror one image and then its signature, retrying whichever step
+    failed until both are done or the retries run out."""
+    src, dst = image["src"], image["dst"]
+    result = {"src": src, "dst": dst, "status": "failed", "attempts": 0, "bytes": size_of(client, src, params["tls_verify"])}
+    signature = {"src": None, "dst": None, "status": "skipped", "bytes": None}
+    if params["signatures"] and signature_ref(src) and signature_ref(dst):
+        signature.update(src=signature_ref(src), dst=signature_ref(dst), status="pending")
+    result["signature"] = signature
+
+    started = time.monotonic()
+    error = None
+    for attempt in range(params["retries"] + 1):
+        if attempt:
+            time.sleep(params["retry_delay"])
+        result["attempts"] += 1
+
+        if result["status"] != "copied":
+            error = copy(module, skopeo, src, dst, params)
+            if error:
+                continue
+            result["status"] = "copied"
+
+        if signature["status"] in ("pending", "failed"):
+            try:
+                exists = client.manifest_digest(signature["src"], params["tls_verify"])
+            except RegistryError as e:
+                error = f"{signature['src']}: {e}"
+                signature["status"] = "failed"
+                continue
+            if not exists:
+                signature["status"] = "absent"
+            else:
+                error = copy(module, skopeo, signature["src"], signature["dst"], params)
+                if error:
+                    signature["status"] = "failed"
+                    continue
+                signature["status"] = "copied"
+                signature["bytes"] = size_of(client, signature["src"], params["tls_verify"])
+        error = None
+        break
+
+    result["duration"] = round(time.monotonic() - started, 2)
+    if error:
+        result["error"] = error
+    return result
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            images=dict(type="list", elements="dict", required=True),
+            authfile=dict(type="path"),
+            tls_verify=dict(type="bool", default=False),
+            signatures=dict(type="bool", default=False),
+            concurrency=dict(type="int", default=4),
+            retries=dict(type="int", default=3),
+            retry_delay=dict(type="int", default=3),
+            report_path=dict(type="path"),
+        ),
+        supports_check_mode=False,
+    )
+    params = module.params
+
+    for image in params["images"]:
+        if not image.get("src") or not image.get("dst"):
+            module.fail_json(msg=f"Every image needs 'src' and 'dst', got {image}")
+    if params["concurrency"] < 1:
+        module.fail_json(msg="concurrency must be at least 1")
+
+    skopeo = module.get_bin_path("skopeo", required=True)
+    client = RegistryClient(load_auths(params["authfile"]))
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=params["concurrency"]) as pool:
+        results = list(pool.map(lambda image: transfer(module, skopeo, client, image, params), params["images"]))
+
+    copied = [result for result in results if result["status"] == "copied"]
+    signatures_copied = [result["signature"] for result in results if result["signature"]["status"] == "copied"]
+    report = {
+        "elapsed": round(time.monotonic() - started, 2),
+        "bytes": sum(result["bytes"] or 0 for result in copied) + sum(sig["bytes"] or 0 for sig in signatures_copied),
+        "copied": len(copied),
+        "failed": len(results) - len(copied),
+        "signatures_copied": len(signatures_copied),
+        "images": results,
+    }
+    if params["report_path"]:
+        with open(params["report_path"], "w") as f:
+            json.dump(report, f, indent=2)
+
+    for result in copied:
+        if result["signature"]["status"] == "failed":
+            module.warn(f"Signature of {result['src']} was not mirrored: {result.get('error')}")
+
+    failed = [result for result in results if result["status"] != "copied"]
+    if failed:
+        module.fail_json(
+            msg="; ".join(f"{result['src']}: {result.get('error')}" for result in failed),
+            results=results,
+            report=report,
+        )
+    module.exit_json(changed=bool(copied), results=results, report=report)
+
+
+if __name__ == "__main__":
+    main()
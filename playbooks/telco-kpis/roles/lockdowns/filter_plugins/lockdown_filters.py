@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Custom Ansible filters for spoke lockdown metadata accumulation.
+Scan oc-mirror output once and match mirrored bundles to operators by name.
+"""
+
+import re
+
+# Same patterns accumulate-metadata-prod.yml used to apply line by line.
+COPY_LINE = re.compile(r'^[^\n]*Success copying[^\n]*$', re.MULTILINE)
+CATALOG_LINE = re.compile(r'Success copying.*redhat-operator-index')
+CATALOG_IMAGE = re.compile(r'^.*docker://([^ ]+redhat-operator-index[^ ]+).*$')
+BUNDLE_LINE = re.compile(r'Success copying.*-operator-bundle@sha256:')
+BUNDLE_IMAGE = re.compile(r'^.*docker://([^ ]+@sha256:[^ ]+).*$')
+
+
+def _name_keys(image):
+    """
+    Every run of dash-separated words in the repository path of image.
+
+    'registry.redhat.io/openshift4/ose-sriov-network-operator-bundle@sha256:...'
+    gives 'ose', 'ose-sriov', ..., 'sriov-network-operator', ..., 'bundle',
+    so an operator name is found with a single lookup.
+    """
+    repository = image.split('@')[0].split('/', 1)[-1]
+    for component in repository.split('/'):
+        words = component.split('-')
+        for start in range(len(words)):
+            for end in range(start + 1, len(words) + 1):
+                yield '-'.join(words[start:end])
+
+
+def oc_mirror_images(output):
+    """
+    Extract the catalog and bundle images from oc-mirror stdout in one pass.
+
+    Args:
+        output: oc-mirror stdout
+
+    Returns:
+        dict: 'catalog' - first redhat-operator-index image copied ('' if none),
+              'bundles' - bundle images in copy order, without duplicates,
+              'bundles_by_name' - name key -> first bundle image with that key
+    """
+    catalog = ''
+    bundles = {}
+    for match in COPY_LINE.finditer(output or ''):
+        line = match.group(0)
+        if not catalog and CATALOG_LINE.search(line):
+            image = CATALOG_IMAGE.match(line)
+            catalog = image.group(1) if image else line
+        if BUNDLE_LINE.search(line):
+            image = BUNDLE_IMAGE.match(line)
+            bundles.setdefault(image.group(1) if image else line, None)
+
+    bundles_by_name = {}
+    for image in bundles:
+        for key in _name_keys(image):
+            bundles_by_name.setdefault(key, image)
+    return {
+        'catalog': catalog,
+        'bundles': list(bundles),
+        'bundles_by_name': bundles_by_name,
+    }
+
+
+def _find_bundle(name, images):
+    if name in images['bundles_by_name']:
+        return images['bundles_by_name'][name]
+    # Names that aren't whole words of a repository (rare) fall back to a
+    # substring search, as before.
+    for image in images['bundles']:
+        if name in image and 'bundle' in image:
+            return image
+    return ''
+
+
+def prod_operators_metadata(metadata, operators, images, fbc, namespace_map=None):
+    """
+    Add production operators to the lockdown metadata dict.
+
+    When oc-mirror copied bundles, every operator gets an entry with its
+    pinned bundle (operator.bundle) or the bundle matched by name. Otherwise
+    operators not already in metadata get an entry without a bundle.
+
+    Args:
+        metadata: Existing lockdown_metadata_operators dict
+        operators: Operator list (name, catalog, nsname, channel, ...)
+        images: Result of lockdown_oc_mirror_images
+        fbc: Catalog image with digest
+        namespace_map: Operator name -> namespace for operators without nsname
+
+    Returns:
+        dict: Updated lockdown_metadata_operators
+    """
+    namespace_map = namespace_map or {}
+    result = dict(metadata or {})
+    have_bundles = bool(images and images['bundles'])
+    for operator in operators:
+        name = operator['name']
+        if have_bundles:
+            bundle = operator.get('bundle') or _find_bundle(name, images)
+        elif name in result:
+            continue
+        else:
+            bundle = ''
+        result[name] = {
+            'name': name,
+            'catalog': operator['catalog'],
+            'nsname': operator.get('nsname') or namespace_map.get(name, ''),
+            'channel': operator.get('channel', ''),
+            'default_channel': operator.get('default_channel', ''),
+            'bundle': bundle,
+            'fbc': fbc,
+        }
+    return result
+
+
+class FilterModule(object):
+    """Ansible filter module for lockdown metadata accumulation."""
+
+    def filters(self):
+        return {
+            'lockdown_oc_mirror_images': oc_mirror_images,
+            'lockdown_prod_operators_metadata': prod_operators_metadata,
+        }
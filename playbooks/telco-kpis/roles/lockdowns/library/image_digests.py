@@ -0,0 +1,232 @@
+#!/usr/bin/python
+"""
+Ansible module that resolves a batch of image references to manifest
+digests (and optionally architectures) straight from their registries.
+
+Replaces one `skopeo inspect` process per image, run one after another
+while capturing or generating a lockdown: all references are resolved at
+once over a shared registry client, and results are kept in a short-lived
+cache keyed by reference (per authfile and TLS setting) so tasks that
+inspect the same image again in the same run don't go back to the registry.
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.json_cache import load_cache, save_cache
+from ansible.module_utils.registry_client import (
+    INDEX_MEDIA_TYPES,
+    RegistryClient,
+    RegistryError,
+    load_auths,
+)
+
+DOCUMENTATION = r"""
+---
+module: image_digests
+short_description: Resolve image references to digests concurrently
+description:
+  - Resolves every reference in I(images) to the digest of the manifest it
+    points at, up to I(concurrency) at a time, like C(skopeo inspect
+    --format '{{.Digest}}') but without a process per image.
+  - Reports whether the image is a manifest list (multi-arch) and, with
+    I(architecture), the architecture of a single-arch image.
+  - Results are cached in I(cache_path), separately for each I(authfile)
+    and I(tls_verify) combination. Entries for references pinned by digest
+    never expire; entries for tags expire after I(cache_ttl) seconds.
+  - Fails if any reference can't be resolved; the other results are still
+    returned.
+options:
+  images:
+    description: Image references, by tag or digest.
+    type: list
+    elements: str
+    required: true
+  authfile:
+    description:
+      - Registry credentials. The usual containers auth files are used if
+        omitted, as skopeo does.
+    type: path
+  tls_verify:
+    description: Verify registry TLS certificates.
+    type: bool
+    default: true
+  architecture:
+    description: Also read the architecture of single-arch images from their config.
+    type: bool
+    default: false
+  concurrency:
+    description: References resolved at the same time.
+    type: int
+    default: 8
+  retries:
+    description: Retries per reference after the first attempt.
+    type: int
+    default: 2
+  retry_delay:
+    description: Seconds between attempts.
+    type: int
+    default: 5
+  cache_path:
+    description: Digest cache file. Caching is disabled if empty.
+    type: path
+    default: /tmp/lockdown-image-digests.json
+  cache_ttl:
+    description: Seconds a cached tag resolution stays valid.
+    type: int
+    default: 300
+"""
+
+EXAMPLES = r"""
+- name: Inspect OCP release image
+  image_digests:
+    images:
+      - quay.io/openshift-release-dev/ocp-release:4.22.0-x86_64
+    architecture: true
+  register: _release_image
+
+- name: Show digest
+  ansible.builtin.debug:
+    msg: "{{ _release_image.images['quay.io/openshift-release-dev/ocp-release:4.22.0-x86_64'].digest_ref }}"
+"""
+
+RETURN = r"""
+images:
+  description: Result per reference, keyed by the reference as given.
+  returned: always
+  type: dict
+  contains:
+    digest:
+      description: Manifest digest (sha256:...).
+      type: str
+    digest_ref:
+      description: The reference's repository pinned to I(digest).
+      type: str
+    multi_arch:
+      description: Whether the manifest is a manifest list / image index.
+      type: bool
+    architecture:
+      description: Architecture of a single-arch image (with I(architecture)), C(multi) for a manifest list.
+      type: str
+    cached:
+      description: Whether the result came from the cache.
+      type: bool
+    error:
+      description: Why the reference couldn't be resolved.
+      type: str
+cache_hits:
+  description: References answered from the cache.
+  returned: always
+  type: int
+"""
+
+
+def repository_of(ref):
+    """ref without its tag or digest."""
+    name = ref.split("@")[0]
+    if name.rfind(":") > name.rfind("/"):
+        name = name[:name.rfind(":")]
+    return name
+
+
+def inspect(client, ref, params):
+    media_type, body, digest = client.get_manifest(ref, params["tls_verify"])
+    manifest = json.loads(body)
+    multi_arch = media_type in INDEX_MEDIA_TYPES or "manifests" in manifest
+    result = {
+        "digest": digest,
+        "digest_ref": f"{repository_of(ref)}@{digest}",
+        "multi_arch": multi_arch,
+    }
+    if params["architecture"]:
+        if multi_arch:
+            result["architecture"] = "multi"
+        else:
+            config = client.open_blob(ref, manifest["config"]["digest"], params["tls_verify"])
+            result["architecture"] = json.load(config).get("architecture", "")
+    return result
+
+
+def resolve(client, ref, params):
+    for attempt in range(params["retries"] + 1):
+        if attempt:
+            time.sleep(params["retry_delay"])
+        try:
+            return inspect(client, ref, params)
+        except (RegistryError, ValueError, KeyError) as e:
+            error = str(e)
+    return {"error": error}
+
+
+def cache_key(params, ref):
+    """Cache key for ref under the settings a result depends on: what one
+    authfile can see, or resolves to over an unverified connection, must
+    not be served to calls made with another."""
+    return f"authfile={params['authfile'] or ''} tls_verify={params['tls_verify']} {ref}"
+
+
+def pinned(key):
+    """Whether a cache key's reference is pinned by digest (never expires)."""
+    return "@" in key.rsplit(" ", 1)[-1]
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            images=dict(type="list", elements="str", required=True),
+            authfile=dict(type="path"),
+            tls_verify=dict(type="bool", default=True),
+            architecture=dict(type="bool", default=False),
+            concurrency=dict(type="int", default=8),
+            retries=dict(type="int", default=2),
+            retry_delay=dict(type="int", default=5),
+            cache_path=dict(type="path", default="/tmp/lockdown-image-digests.json"),
+            cache_ttl=dict(type="int", default=300),
+        ),
+        supports_check_mode=True,
+    )
+    params = module.params
+    if params["concurrency"] < 1:
+        module.fail_json(msg="concurrency must be at least 1")
+
+    now = time.time()
+    cache = (
+        load_cache(params["cache_path"], params["cache_ttl"], now, "resolved_at", pinned)
+        if params["cache_path"] else {}
+    )
+
+    images = {}
+    pending = []
+    for ref in dict.fromkeys(params["images"]):
+        entry = cache.get(cache_key(params, ref))
+        if entry and (not params["architecture"] or "architecture" in entry):
+            images[ref] = dict(entry, cached=True)
+            images[ref].pop("resolved_at", None)
+        else:
+            pending.append(ref)
+
+    if pending:
+        client = RegistryClient(load_auths(params["authfile"]))
+        with ThreadPoolExecutor(max_workers=min(params["concurrency"], len(pending))) as pool:
+            for ref, result in zip(pending, pool.map(lambda ref: resolve(client, ref, params), pending)):
+                images[ref] = dict(result, cached=False)
+                if "error" not in result:
+                    cache[cache_key(params, ref)] = dict(result, resolved_at=now)
+
+    if params["cache_path"] and pending:
+        try:
+            save_cache(params["cache_path"], cache)
+        except OSError as e:
+            module.warn(f"Could not write digest cache {params['cache_path']}: {e}")
+
+    cache_hits = len(images) - len(pending)
+    errors = [f"{ref}: {result['error']}" for ref, result in images.items() if "error" in result]
+    if errors:
+        module.fail_json(msg="; ".join(errors), images=images, cache_hits=cache_hits)
+    module.exit_json(changed=False, images=images, cache_hits=cache_hits)
+
+
+if __name__ == "__main__":
+    main()
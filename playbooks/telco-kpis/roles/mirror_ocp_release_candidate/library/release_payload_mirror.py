@@ -0,0 +1,405 @@
+#!/usr/bin/python
+"""
+Ansible module that makes sure an OCP release candidate, every component
+image of its payload and (optionally) their sigstore signatures are present
+in the disconnected registry, mirroring only what is missing.
+
+Replaces a HEAD of the release digest followed by serial `oc image mirror`
+runs for each .sig tag: the mirror path is resolved from registries.conf
+and IDMS in one step, the presence of the release and all its components is
+checked concurrently, missing pieces are mirrored concurrently, and a
+release found complete is recorded in a presence cache keyed by its digest,
+so reruns for the same release candidate only check the release itself.
+"""
+
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.json_cache import load_cache, save_cache
+from ansible.module_utils.registry_client import (
+    INDEX_MEDIA_TYPES,
+    RegistryClient,
+    RegistryError,
+    load_auths,
+)
+
+DOCUMENTATION = r"""
+---
+module: release_payload_mirror
+short_description: Mirror the missing parts of an OCP release payload concurrently
+description:
+  - Resolves the mirror repository for I(release_image) from
+    I(registries_conf) (a mirror shared by C(ocp-release) and the art-dev
+    repository), then I(idms), then I(default_repo).
+  - Lists the payload's component images with C(oc adm release info). A
+    multi-arch release (manifest list) is fanned out: every per-arch release
+    manifest is listed, and its digest is checked and signed like a
+    component.
+  - Checks the release digest, every component digest and, with
+    I(signatures), every C(sha256-<hex>.sig) tag in the mirror repository,
+    up to I(concurrency) at a time.
+  - A missing release image is mirrored with C(oc adm release mirror).
+    Components and signatures still missing after that are copied with
+    C(oc image mirror), up to I(concurrency) at a time. Signature copies
+    that fail only produce warnings.
+  - A release found complete is recorded in I(cache_path). Later runs for
+    the same digest and mirror repository, within I(cache_ttl) seconds, only
+    check that the release image (and its signature) is still in the
+    registry instead of checking every component. An entry whose release is
+    gone, e.g. because the registry was redeployed, is dropped.
+  - Only a 404 counts as missing; any other registry error fails the module
+    rather than triggering a full mirror.
+options:
+  release_image:
+    description: Release image pinned by digest (C(repo@sha256:...)).
+    type: str
+    required: true
+  registry:
+    description: Disconnected registry, C(host:port).
+    type: str
+    required: true
+  registries_conf:
+    description: Content of the assisted-service registries.conf, if any.
+    type: str
+    default: ''
+  idms:
+    description: ImageDigestMirrorSet resources of the hub cluster.
+    type: list
+    elements: dict
+    default: []
+  artdev_repo:
+    description: Versioned art-dev repository name, e.g. C(ocp-v5.0-art-dev).
+    type: str
+    required: true
+  default_repo:
+    description: Mirror repository used when neither registries.conf nor IDMS has one.
+    type: str
+    required: true
+  authfile:
+    description: Pull secret with source and disconnected registry credentials.
+    type: path
+    required: true
+  source_tls_verify:
+    description: Verify the TLS certificate of the registry I(release_image) is read from.
+    type: bool
+    default: true
+  signatures:
+    description: Also mirror the sigstore signatures of the release and its components.
+    type: bool
+    default: false
+  concurrency:
+    description: Registry checks and image copies run at the same time.
+    type: int
+    default: 8
+  cache_path:
+    description: Presence cache file. Caching is disabled if empty.
+    type: path
+    default: /tmp/mirror-rc-presence.json
+  cache_ttl:
+    description: Seconds a presence cache entry is trusted.
+    type: int
+    default: 86400
+"""
+
+EXAMPLES = r"""
+- name: Mirror release candidate payload
+  release_payload_mirror:
+    release_image: quay.io/openshift-release-dev/ocp-release@sha256:abc...
+    registry: disconnected.registry.local:5000
+    registries_conf: "{{ _cm.resources[0].data['registries.conf'] }}"
+    idms: "{{ _idms.resources }}"
+    artdev_repo: ocp-v4.0-art-dev
+    default_repo: ocp4/openshift/release-images
+    authfile: /tmp/pull-secret.json
+    signatures: true
+"""
+
+RETURN = r"""
+mirror_repo:
+  description: Mirror repository path, without the registry.
+  returned: always
+  type: str
+mirror_repo_source:
+  description: Where the mirror repository came from (C(registries.conf), C(idms) or C(default)).
+  returned: always
+  type: str
+release_mirrored:
+  description: Whether the release image was missing and has been mirrored.
+  returned: always
+  type: bool
+cached:
+  description: Whether the release was recorded as complete in the presence cache and is still in the registry.
+  returned: always
+  type: bool
+architectures:
+  description: Per-arch release manifests of a multi-arch release, 0 for a single-arch one.
+  returned: unless cached
+  type: int
+components:
+  description: Number of component images in the payload.
+  returned: unless cached
+  type: int
+components_mirrored:
+  description: Component images that were missing and have been copied.
+  returned: unless cached
+  type: list
+  elements: str
+signatures_mirrored:
+  description: Signature tags that were missing and have been copied.
+  returned: unless cached
+  type: list
+  elements: str
+signatures_failed:
+  description: Signature tags that could not be copied.
+  returned: unless cached
+  type: list
+  elements: str
+"""
+
+DIGEST_RE = re.compile(r"sha256:[a-f0-9]{64}")
+MIRROR_LOCATION_RE = re.compile(r'\[\[registry\.mirror\]\][^[]*location\s*=\s*"([^"]+)"')
+
+
+def conf_mirrors(registries_conf, location, prefix):
+    """Mirror locations under prefix of the registries.conf entry for location."""
+    block = re.search(
+        r'(?s)location\s*=\s*"' + re.escape(location) + r'".*?(?=\n\[\[registry\]\]|\Z)', registries_conf
+    )
+    if not block:
+        return []
+    return [mirror for mirror in MIRROR_LOCATION_RE.findall(block.group(0)) if mirror.startswith(prefix)]
+
+
+def resolve_mirror_repo(params, release_repo):
+    """(mirror repository path, source), preferring a registries.conf mirror
+    that serves both ocp-release and the art-dev repository, since that is
+    what the assisted-service resolves images through."""
+    prefix = params["registry"]
+    if params["registries_conf"]:
+        conf = params["registries_conf"]
+        artdev = conf_mirrors(conf, f"quay.io/openshift-release-dev/{params['artdev_repo']}", prefix)
+        if not artdev and params["artdev_repo"] != "ocp-v4.0-art-dev":
+            artdev = conf_mirrors(conf, "quay.io/openshift-release-dev/ocp-v4.0-art-dev", prefix)
+        for mirror in conf_mirrors(conf, "quay.io/openshift-release-dev/ocp-release", prefix):
+            if mirror in artdev:
+                return mirror[len(prefix) + 1:], "registries.conf"
+
+    for idms in params["idms"]:
+        for entry in (idms.get("spec") or {}).get("imageDigestMirrors") or []:
+            if entry.get("source") != release_repo:
+                continue
+            for mirror in entry.get("mirrors") or []:
+                if mirror.startswith(prefix + "/"):
+                    return mirror[len(prefix) + 1:], "idms"
+
+    return params["default_repo"], "default"
+
+
+def signature_tag(digest):
+    return digest.replace(":", "-") + ".sig"
+
+
+def release_manifests(client, release_image, tls_verify):
+    """Digests of the per-arch release manifests if release_image is a
+    manifest list, an empty list otherwise."""
+    media_type, body, _ = client.get_manifest(release_image, tls_verify)
+    manifest = json.loads(body)
+    if media_type not in INDEX_MEDIA_TYPES and "manifests" not in manifest:
+        return []
+    return [child["digest"] for child in manifest["manifests"]]
+
+
+def release_components(module, oc, release_image, params):
+    """Source references of the component images of one release manifest, by digest."""
+    rc, stdout, stderr = module.run_command(
+        [oc, "adm", "release", "info", release_image, "-a", params["authfile"], "-o", "json"]
+    )
+    if rc != 0:
+        return None, f"oc adm release info {release_image} failed with rc {rc}: {stderr.strip()}"
+    try:
+        tags = json.loads(stdout).get("references", {}).get("spec", {}).get("tags", [])
+    except (ValueError, AttributeError) as e:
+        # Warnings on stdout or a truncated response, not release info JSON.
+        return None, f"oc adm release info {release_image} returned unparsable output: {e}"
+    components = {}
+    for tag in tags:
+        name = (tag.get("from") or {}).get("name", "")
+        match = DIGEST_RE.search(name)
+        if "@sha256:" in name and match:
+            components.setdefault(match.group(0), name)
+    return components, None
+
+
+def oc_image_mirror(module, oc, source, destination, params):
+    rc, _, stderr = module.run_command(
+        [oc, "image", "mirror", "--insecure=true", "-a", params["authfile"], source, destination]
+    )
+    return None if rc == 0 else f"rc {rc}: {stderr.strip()}"
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            release_image=dict(type="str", required=True),
+            registry=dict(type="str", required=True),
+            registries_conf=dict(type="str", default=""),
+            idms=dict(type="list", elements="dict", default=[]),
+            artdev_repo=dict(type="str", required=True),
+            default_repo=dict(type="str", required=True),
+            authfile=dict(type="path", required=True, no_log=False),
+            source_tls_verify=dict(type="bool", default=True),
+            signatures=dict(type="bool", default=False),
+            concurrency=dict(type="int", default=8),
+            cache_path=dict(type="path", default="/tmp/mirror-rc-presence.json"),
+            cache_ttl=dict(type="int", default=86400),
+        ),
+        supports_check_mode=False,
+    )
+    params = module.params
+    release_repo, _, release_digest = params["release_image"].partition("@")
+    if not DIGEST_RE.fullmatch(release_digest):
+        module.fail_json(msg=f"release_image must be pinned by digest, got {params['release_image']}")
+    if params["concurrency"] < 1:
+        module.fail_json(msg="concurrency must be at least 1")
+
+    mirror_repo, mirror_repo_source = resolve_mirror_repo(params, release_repo)
+    destination = f"{params['registry']}/{mirror_repo}"
+    result = {
+        "changed": False,
+        "mirror_repo": mirror_repo,
+        "mirror_repo_source": mirror_repo_source,
+        "release_mirrored": False,
+        "cached": False,
+    }
+
+    client = RegistryClient(load_auths(params["authfile"]))
+
+    def present(references):
+        """Reference -> whether the disconnected registry has it. Only a 404
+        means missing: a credential or registry failure must not look like
+        an empty mirror and set off a full mirror."""
+        def exists(reference):
+            try:
+                return client.manifest_digest(reference, tls_verify=False) is not None, None
+            except RegistryError as e:
+                return None, str(e)
+        with ThreadPoolExecutor(max_workers=params["concurrency"]) as pool:
+            checked = dict(zip(references, pool.map(exists, references)))
+        errors = [error for _, error in checked.values() if error]
+        if errors:
+            module.fail_json(msg=f"Could not check {destination}: {'; '.join(errors)}", **result)
+        return {reference: found for reference, (found, _) in checked.items()}
+
+    release_references = [f"{destination}@{release_digest}"]
+    if params["signatures"]:
+        release_references.append(f"{destination}:{signature_tag(release_digest)}")
+
+    now = time.time()
+    cache_key = f"{release_digest} {destination} signatures={params['signatures']}"
+    cache = load_cache(params["cache_path"], params["cache_ttl"], now, "checked_at") if params["cache_path"] else {}
+    if cache.get(cache_key, {}).get("complete"):
+        # Don't trust the entry blindly: the registry may have been wiped or
+        # redeployed since. A missing release invalidates it.
+        if all(present(release_references).values()):
+            result["cached"] = True
+            module.exit_json(**result)
+        del cache[cache_key]
+
+    oc = module.get_bin_path("oc", required=True)
+    started = time.monotonic()
+
+    def copy_all(pairs):
+        """Copy (source, destination) pairs concurrently; returns errors by source."""
+        with ThreadPoolExecutor(max_workers=params["concurrency"]) as pool:
+            errors = pool.map(lambda pair: oc_image_mirror(module, oc, pair[0], pair[1], params), pairs)
+        return {pair[0]: f"{pair[0]}: {error}" for pair, error in zip(pairs, errors) if error}
+
+    try:
+        architectures = release_manifests(client, params["release_image"], params["source_tls_verify"])
+    except (RegistryError, ValueError, KeyError) as e:
+        module.fail_json(msg=f"Could not read {params['release_image']}: {e}", **result)
+
+    # A multi-arch payload has one set of components per architecture; list
+    # them all at once, from each per-arch release manifest.
+    release_images = [f"{release_repo}@{digest}" for digest in architectures] or [params["release_image"]]
+    with ThreadPoolExecutor(max_workers=params["concurrency"]) as pool:
+        listed = list(pool.map(lambda image: release_components(module, oc, image, params), release_images))
+    errors = [error for _, error in listed if error]
+    if errors:
+        module.fail_json(msg="; ".join(errors), **result)
+    components = {}
+    for found_components, _ in listed:
+        components.update(found_components)
+    components.pop(release_digest, None)
+
+    # Every digest the mirror must hold, mapped to its source repository.
+    sources = {release_digest: release_repo}
+    sources.update((digest, release_repo) for digest in architectures)
+    sources.update((digest, name.partition("@")[0]) for digest, name in components.items())
+    wanted = {f"{destination}@{digest}": digest for digest in sources}
+    if params["signatures"]:
+        wanted.update((f"{destination}:{signature_tag(digest)}", digest) for digest in sources)
+    found = present(list(wanted))
+
+    if not found[f"{destination}@{release_digest}"]:
+        # oc adm release mirror copies the release image and every component
+        # it doesn't find in the destination, several at a time.
+        rc, stdout, stderr = module.run_command(
+            [oc, "adm", "release", "mirror", f"--from={params['release_image']}", f"--to={destination}",
+             "-a", params["authfile"], "--insecure=true"]
+        )
+        if rc != 0:
+            module.fail_json(msg=f"oc adm release mirror failed with rc {rc}: {stderr.strip()}", **result)
+        result.update(changed=True, release_mirrored=True, mirror_stdout_lines=stdout.splitlines()[-5:])
+        found = present(list(wanted))
+        if not found[f"{destination}@{release_digest}"]:
+            module.fail_json(msg=f"{release_digest} still missing from {destination} after mirroring", **result)
+
+    # oc image mirror only accepts a tag or nothing in the destination; with
+    # the bare repository it pushes by digest, keeping the source digest.
+    missing_components = [
+        (f"{sources[digest]}@{digest}", reference)
+        for reference, digest in wanted.items()
+        if "@" in reference and not found[reference]
+    ]
+    errors = copy_all([(source, destination) for source, _ in missing_components])
+    if errors:
+        module.fail_json(msg="; ".join(errors), **result)
+    result["components_mirrored"] = [reference for _, reference in missing_components]
+
+    missing_signatures = [
+        (f"{sources[digest]}:{signature_tag(digest)}", reference)
+        for reference, digest in wanted.items()
+        if "@" not in reference and not found[reference]
+    ]
+    signature_errors = copy_all(missing_signatures)
+    for error in signature_errors.values():
+        module.warn(f"Signature not mirrored: {error}")
+    result["signatures_mirrored"] = [
+        reference for source, reference in missing_signatures if source not in signature_errors
+    ]
+    result["signatures_failed"] = [
+        reference for source, reference in missing_signatures if source in signature_errors
+    ]
+    result["architectures"] = len(architectures)
+    result["components"] = len(components)
+    result["changed"] = result["changed"] or bool(missing_components or result["signatures_mirrored"])
+    result["elapsed"] = round(time.monotonic() - started, 2)
+
+    if params["cache_path"]:
+        # Saved even when incomplete, to drop expired or invalidated entries.
+        if not signature_errors:
+            cache[cache_key] = {"complete": True, "components": len(components), "checked_at": int(now)}
+        try:
+            save_cache(params["cache_path"], cache)
+        except OSError as e:
+            module.warn(f"Could not write presence cache {params['cache_path']}: {e}")
+
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,25 +8,109 @@ Need to do this because of a bug in junitparser's verify subcommand
 which fails if there is only one test suite
 This can be removed when https://github.com/weiwei/junitparser/pull/142 is merged
 
+Reports are read with a streaming iterparse-based reader, so peak memory is
+bounded per file rather than by the size of the largest report. With
+JUNIT_WORKERS > 1 files are parsed across a process pool; results are still
+printed and merged in file order, so the output is identical either way.
+
 Environment Variables:
     SHARED_DIR: Directory containing XML files (default: current directory)
     KNOWN_FAILURES: JSON array of test identifiers to ignore
                    e.g., '["test1", "test2"]' or '[{"test_id": "test1"}]'
+                   Object entries may also set "match" (substring (default),
+                   exact, regex or glob) and "suite" to scope the entry to
+                   a single test suite, e.g.
+                   '[{"test_id": "*ptp*", "match": "glob", "suite": "ran"}]'
+    JUNIT_INCLUDE: Comma-separated globs, relative to SHARED_DIR, selecting
+                   the reports to verify (default: '*.xml'). '*' stays within
+                   one directory level, '**/' spans any number of them, e.g.
+                   '**/*.xml' to also pick up per-suite subdirectories.
+    JUNIT_EXCLUDE: Comma-separated globs of files or directories to leave out,
+                   e.g. 'must-gather/**,**/*-manifest.xml'
+    JUNIT_WORKERS: Number of parser processes (default: 1, 0 = one per CPU)
+    SUMMARY_FILE: Optional path for a machine-readable summary (per-suite
+                  counts, failing cases, times, known-failure hits). Written
+                  as NDJSON when the name ends in .ndjson, JSON otherwise.
+    JUNIT_CACHE_FILE: Optional path of a parse cache. Files whose mtime and
+                      size (or, failing that, sha256) are unchanged since the
+                      last run reuse the cached parse instead of re-reading.
+                      Entries for reports not found in the run are dropped.
+    TIMING_TOP_N: Print the N slowest test cases and suites plus a histogram
+                  of case durations (default: 0, disabled)
+    TIMING_FILE: Optional path to write the per-case/per-suite time profile
+                 of this run as JSON
+    TIMING_BASELINE: Optional TIMING_FILE from a previous run; the largest
+                     duration changes against it are printed (top
+                     TIMING_TOP_N, or 10 when that is unset)
 
 Usage:
     python fail_if_any_test_failed.py
 """
 
-import glob
+import fnmatch
+import hashlib
+import heapq
 import json
 import os
+import re
 import sys
-from typing import Dict, List, Union
-
-from junitparser import JUnitXml, TestSuite
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import (Any, Deque, Dict, Iterable, Iterator, List, Optional, Pattern,
+                    Set, Tuple, Union)
 
 # Constants
 SUCCESS_MESSAGE = "✅ All tests passed or were skipped"
+FAILURE_TAGS = ("failure", "error")
+MATCH_MODES = ("substring", "exact", "regex", "glob")
+CACHE_VERSION = 2
+HASH_CHUNK_SIZE = 1024 * 1024
+DEFAULT_INCLUDE = "*.xml"
+JUNIT_ROOT_TAGS = ("testsuites", "testsuite")
+# Enough for an XML declaration, a license comment or two and a DOCTYPE.
+SNIFF_SIZE = 4096
+# Prolog constructs that may precede the root element.
+XML_PROLOG_RE = re.compile(
+    rb'\s*(?:<\?.*?\?>|<!--.*?-->|<!DOCTYPE[^>\[]*(?:\[.*?\])?\s*>)', re.DOTALL)
+XML_ROOT_TAG_RE = re.compile(rb'\s*<(?:[\w.-]+:)?([\w.-]+)')
+DEFAULT_TIMING_DIFF_TOP_N = 10
+# Upper bounds (seconds) of the case-duration histogram buckets.
+HISTOGRAM_BOUNDS = ((1, "< 1s"), (10, "1s-10s"), (60, "10s-1m"), (300, "1m-5m"),
+                    (900, "5m-15m"), (float('inf'), ">= 15m"))
+HISTOGRAM_WIDTH = 40
+# Changes smaller than both of these are noise, not regressions.
+TIMING_DIFF_MIN_SECONDS = 1.0
+TIMING_DIFF_MIN_RATIO = 0.1
+
+
+@dataclass
+class SuiteResult:
+    """Outcome of a single <testsuite>, reduced to what verification needs."""
+    name: str
+    tests: int = 0
+    skipped: int = 0
+    time: float = 0.0
+    failed_cases: List[str] = field(default_factory=list)
+    # (case name, seconds) for every case, in document order.
+    case_times: List[Tuple[str, float]] = field(default_factory=list)
+
+
+@dataclass
+class FileResult:
+    """Outcome of parsing one JUnit XML file (picklable for the pool)."""
+    path: str
+    suites: List[SuiteResult] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'FileResult':
+        """Rebuild a FileResult serialized with dataclasses.asdict()."""
+        return cls(path=data['path'],
+                   suites=[SuiteResult(**suite) for suite in data['suites']],
+                   error=data.get('error'))
 
 
 def parse_known_failures() -> List[Union[str, Dict[str, str]]]:
@@ -49,8 +133,7 @@ def parse_known_failures() -> List[Union[str, Dict[str, str]]]:
         
         print(f"Known failures loaded: {len(known_failures)} test(s)")
         for failure in known_failures:
-            test_id = failure.get('test_id', failure) if isinstance(failure, dict) else failure
-            print(f"  - {test_id}")
+            print(f"  - {_describe_known_failure(failure)}")
         return known_failures
         
     except json.JSONDecodeError as e:
@@ -58,11 +141,185 @@ def parse_known_failures() -> List[Union[str, Dict[str, str]]]:
         return []
 
 
+def _describe_known_failure(known_failure: Union[str, Dict[str, str]]) -> str:
+    """Render a KNOWN_FAILURES entry for log output."""
+    if not isinstance(known_failure, dict):
+        return str(known_failure)
+
+    description = str(known_failure.get('test_id', ''))
+    match_mode = known_failure.get('match', 'substring')
+    if match_mode != 'substring':
+        description += f" [{match_mode}]"
+    if known_failure.get('suite'):
+        description += f" (suite: {known_failure['suite']})"
+    return description
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """
+    Build a regex matching any of words, factored as a prefix trie.
+
+    A flat 'a|b|c' alternation makes the regex engine retry every id at
+    every position of the case name; sharing prefixes means each position
+    only walks the branches that can still match. The matched text is
+    always one complete word, so it can be mapped back to its entry.
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = []
+        for char in sorted(key for key in node if key):
+            child, chain = node[char], [char]
+            # Collapse single-child runs so nesting depth follows branch
+            # points, not id length.
+            while len(child) == 1 and '' not in child:
+                (next_char, child), = child.items()
+                chain.append(next_char)
+            branches.append(re.escape(''.join(chain)) + build(child))
+
+        if not branches:
+            return ''
+        if '' in node:
+            return f"(?:{'|'.join(branches)})?"
+        if len(branches) == 1:
+            return branches[0]
+        return f"(?:{'|'.join(branches)})"
+
+    return build(trie)
+
+
+class _KnownFailureIndex:
+    """Lookup structures for the known failures sharing one suite scope."""
+
+    def __init__(self) -> None:
+        self.exact: Dict[str, int] = {}
+        self.substrings: Dict[str, int] = {}
+        self.patterns: List[Tuple[Pattern[str], int]] = []
+        self.substring_re: Optional[Pattern[str]] = None
+
+    def compile(self) -> None:
+        if self.substrings:
+            self.substring_re = re.compile(_trie_regex(self.substrings))
+
+    def match(self, test_case_name: str) -> Optional[int]:
+        index = self.exact.get(test_case_name)
+        if index is not None:
+            return index
+
+        if self.substring_re is not None:
+            found = self.substring_re.search(test_case_name)
+            if found:
+                return self.substrings[found.group(0)]
+
+        for pattern, index in self.patterns:
+            if pattern.search(test_case_name):
+                return index
+
+        return None
+
+
+class KnownFailureMatcher:
+    """
+    Precompiled matcher over KNOWN_FAILURES entries.
+
+    Exact ids are resolved with a dict lookup and all substring ids with a
+    single trie-shaped regex, so the cost per failing case no longer grows
+    with the number of known failures. Only regex/glob entries are tried
+    one by one. Every hit is attributed to the entry that matched, so the
+    entries that never matched can be reported as stale.
+    """
+
+    def __init__(self, known_failures: List[Union[str, Dict[str, str]]]) -> None:
+        self.labels: List[str] = []
+        self.hits: List[int] = []
+        self._scopes: Dict[Optional[str], _KnownFailureIndex] = {}
+
+        for known_failure in known_failures:
+            self._add(known_failure)
+
+        for index in self._scopes.values():
+            index.compile()
+
+    def _add(self, known_failure: Union[str, Dict[str, str]]) -> None:
+        if isinstance(known_failure, dict):
+            test_id = str(known_failure.get('test_id', ''))
+            match_mode = known_failure.get('match', 'substring')
+            suite = known_failure.get('suite') or None
+        else:
+            test_id = str(known_failure)
+            match_mode = 'substring'
+            suite = None
+
+        if not test_id:
+            return
+
+        if match_mode not in MATCH_MODES:
+            print(f"Warning: Unknown match mode '{match_mode}' for known "
+                  f"failure '{test_id}', expected one of {', '.join(MATCH_MODES)}")
+            return
+
+        position = len(self.labels)
+        index = self._scopes.setdefault(suite, _KnownFailureIndex())
+
+        if match_mode == 'regex':
+            try:
+                index.patterns.append((re.compile(test_id), position))
+            except re.error as e:
+                print(f"Warning: Invalid regex in known failure '{test_id}': {e}")
+                return
+        elif match_mode == 'glob':
+            index.patterns.append(
+                (re.compile(fnmatch.translate(test_id)), position))
+        else:
+            index.exact.setdefault(test_id, position)
+            if match_mode == 'substring':
+                index.substrings.setdefault(test_id, position)
+
+        self.labels.append(_describe_known_failure(known_failure))
+        self.hits.append(0)
+
+    def match(self, test_case_name: str,
+              suite_name: Optional[str] = None) -> Optional[str]:
+        """
+        Find the known failure entry covering a test case.
+
+        Args:
+            test_case_name: Name of the failing test case.
+            suite_name: Name of its test suite, for suite-scoped entries.
+
+        Returns:
+            Description of the matching entry, or None.
+        """
+        for scope in (suite_name, None):
+            index = self._scopes.get(scope)
+            if index is None:
+                continue
+            position = index.match(test_case_name)
+            if position is not None:
+                self.hits[position] += 1
+                return self.labels[position]
+            if scope is None:
+                break
+        return None
+
+    def unused(self) -> List[str]:
+        """Return the entries that did not match any failing test case."""
+        return [label for label, hits in zip(self.labels, self.hits) if not hits]
+
+
 def is_known_failure(test_case_name: str, 
                     known_failures: List[Union[str, Dict[str, str]]]) -> bool:
     """
     Check if test case matches any known failure (exact or partial match).
     
+    Builds a one-off KnownFailureMatcher; callers checking many cases
+    should build the matcher once and call its match() instead.
+
     Args:
         test_case_name: Name of the test case to check.
         known_failures: List of known failure identifiers.
@@ -72,20 +329,694 @@ def is_known_failure(test_case_name: str,
     """
     if not known_failures:
         return False
-    
-    for known_failure in known_failures:
-        if isinstance(known_failure, dict):
-            test_id = known_failure.get('test_id', '')
+
+    return KnownFailureMatcher(known_failures).match(test_case_name) is not None
+
+
+def _glob_to_regex(pattern: str) -> Pattern[str]:
+    """
+    Compile a path glob where '*' and '?' stop at '/' and '**' crosses it.
+
+    fnmatch lets '*' match '/', which would make '*.xml' recursive; these
+    patterns follow shell globstar semantics instead.
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 2:]:
+            end = pattern.index(']', i + 2)
+            body = pattern[i + 1:end]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            parts.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+            i = end + 1
         else:
-            test_id = str(known_failure)
-        
-        if not test_id:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile(''.join(parts) + r'\Z', re.DOTALL)
+
+
+def _parse_globs(env_var: str, default: str = '') -> List[str]:
+    """Split a comma-separated glob list from the environment."""
+    value = os.getenv(env_var, default)
+    return [pattern.strip().strip('/') for pattern in value.split(',')
+            if pattern.strip()]
+
+
+def is_junit_xml(path: str) -> bool:
+    """
+    Cheaply check whether an XML file's root element is a JUnit one.
+
+    Only the first SNIFF_SIZE bytes are read. Files whose root cannot be
+    found in that window are given the benefit of the doubt and left to
+    the parser.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_SIZE)
+
+    head = head.lstrip(b'\xef\xbb\xbf')
+    pos = 0
+    while True:
+        prolog = XML_PROLOG_RE.match(head, pos)
+        if not prolog or prolog.end() == pos:
+            break
+        pos = prolog.end()
+
+    root = XML_ROOT_TAG_RE.match(head, pos)
+    if root is None:
+        return True
+    return root.group(1).decode('ascii', 'replace') in JUNIT_ROOT_TAGS
+
+
+def discover_junit_files(directory: str,
+                         include: Optional[List[str]] = None,
+                         exclude: Optional[List[str]] = None) -> Iterator[str]:
+    """
+    Walk directory with os.scandir and yield JUnit reports as they are found.
+
+    Entries are visited in sorted order within each directory so the output
+    is deterministic, but nothing is collected up front - the verifier can
+    start parsing the first file while the walk is still going. The walk
+    only descends when an include pattern spans directories, and prunes
+    directories matched by an exclude pattern. Symlinked directories are
+    followed, but every directory is walked at most once. Matching files
+    whose root element is not <testsuites>/<testsuite> are reported and
+    skipped, as are entries that cannot be stat'ed.
+
+    Args:
+        directory: Root directory to search.
+        include: Globs relative to directory (default: DEFAULT_INCLUDE).
+        exclude: Globs relative to directory to leave out.
+
+    Yields:
+        Paths of JUnit XML files.
+    """
+    include_res = [_glob_to_regex(p) for p in (include or [DEFAULT_INCLUDE])]
+    exclude_res = [_glob_to_regex(p) for p in (exclude or [])]
+    recursive = any('/' in p or '**' in p for p in (include or [DEFAULT_INCLUDE]))
+
+    def excluded(rel_path: str) -> bool:
+        return any(r.match(rel_path) for r in exclude_res)
+
+    # (st_dev, st_ino) of every directory queued, so a symlink back up the
+    # tree or to a sibling is walked once instead of looping or repeating
+    # reports.
+    visited: Set[Tuple[int, int]] = set()
+    try:
+        root_stat = os.stat(directory)
+        visited.add((root_stat.st_dev, root_stat.st_ino))
+    except OSError:
+        pass
+
+    pending = [(directory, '')]
+    while pending:
+        current, rel_dir = pending.pop()
+        try:
+            with os.scandir(current) as scan:
+                entries = sorted(scan, key=lambda entry: entry.name)
+        except OSError as e:
+            print(f"Warning: Cannot read directory {current}: {e}")
             continue
-        
-        if test_id == test_case_name or test_id in test_case_name:
-            return True
-    
-    return False
+
+        subdirs = []
+        for entry in entries:
+            rel_path = f"{rel_dir}{entry.name}"
+            try:
+                if entry.is_dir():
+                    if recursive and not (excluded(rel_path) or excluded(rel_path + '/')):
+                        dir_stat = entry.stat()
+                        key = (dir_stat.st_dev, dir_stat.st_ino)
+                        if key not in visited:
+                            visited.add(key)
+                            subdirs.append((entry.path, rel_path + '/'))
+                    continue
+
+                if not entry.is_file() or excluded(rel_path):
+                    continue
+                if not any(r.match(rel_path) for r in include_res):
+                    continue
+
+                if not is_junit_xml(entry.path):
+                    print(f"Skipping non-JUnit XML: {rel_path}")
+                    continue
+            except OSError as e:
+                print(f"Warning: Cannot read {rel_path}: {e}")
+                continue
+            yield entry.path
+
+        # Depth-first, keeping sorted order when popping from the stack.
+        pending.extend(reversed(subdirs))
+
+
+def _local_name(tag: str) -> str:
+    """Strip an XML namespace prefix ('{ns}testcase' -> 'testcase')."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _parse_time(value: Optional[str]) -> float:
+    """Parse a JUnit time attribute, tolerating missing or odd values."""
+    if not value:
+        return 0.0
+    try:
+        return float(value.replace(',', ''))
+    except ValueError:
+        return 0.0
+
+
+def parse_junit_file(xml_file: str) -> FileResult:
+    """
+    Parse one JUnit XML file with a streaming reader.
+
+    Each <testcase> is reduced to pass/fail as soon as it is closed, then
+    cleared and detached from its parent, so the element tree never holds
+    more than the open suites and the case being read (closed suites are
+    detached the same way). What is kept per suite is its counts and time,
+    the failing case names and, for the timing report, every case's name
+    and duration. Errors are captured in the result instead of raised, so
+    a pool worker never loses the file ordering.
+
+    Args:
+        xml_file: Path to the JUnit XML file.
+
+    Returns:
+        FileResult with one SuiteResult per <testsuite>, in document order.
+    """
+    result = FileResult(path=xml_file)
+    open_suites: List[SuiteResult] = []
+    # Suite time as reported by the <testsuite> itself, if any; falls back
+    # to the sum of its case times.
+    reported_times: List[Optional[str]] = []
+    # Open elements, so a finished case or suite can be detached from its
+    # parent; iterparse doesn't link children back to parents.
+    open_elems: List[ET.Element] = []
+
+    try:
+        for event, elem in ET.iterparse(xml_file, events=("start", "end")):
+            tag = _local_name(elem.tag)
+
+            if event == "start":
+                open_elems.append(elem)
+                if tag == "testsuite":
+                    open_suites.append(
+                        SuiteResult(name=elem.get('name') or "Unknown Suite"))
+                    reported_times.append(elem.get('time'))
+                continue
+
+            open_elems.pop()
+            if tag == "testcase" and open_suites:
+                suite = open_suites[-1]
+                suite.tests += 1
+                case_time = _parse_time(elem.get('time'))
+                suite.time += case_time
+                suite.case_times.append((elem.get('name', ''), case_time))
+                child_tags = {_local_name(child.tag) for child in elem}
+                if child_tags.intersection(FAILURE_TAGS):
+                    suite.failed_cases.append(elem.get('name', ''))
+                elif "skipped" in child_tags:
+                    suite.skipped += 1
+                elem.clear()
+                if open_elems:
+                    open_elems[-1].remove(elem)
+            elif tag == "testsuite" and open_suites:
+                suite = open_suites.pop()
+                reported_time = reported_times.pop()
+                if reported_time:
+                    suite.time = _parse_time(reported_time)
+                result.suites.append(suite)
+                elem.clear()
+                if open_elems:
+                    open_elems[-1].remove(elem)
+    except Exception as e:
+        result.error = str(e)
+
+    return result
+
+
+def _resolve_worker_count() -> int:
+    """
+    Read JUNIT_WORKERS, falling back to sequential parsing on bad input.
+
+    Returns:
+        Number of parser processes to use (at least 1).
+    """
+    workers_str = os.getenv('JUNIT_WORKERS', '1').strip() or '1'
+
+    try:
+        workers = int(workers_str)
+    except ValueError:
+        print(f"Warning: JUNIT_WORKERS is not an integer: {workers_str}")
+        return 1
+
+    if workers == 0:
+        return os.cpu_count() or 1
+    return max(workers, 1)
+
+
+def _sha256_file(path: str) -> str:
+    """Hash a file in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _parse_for_cache(xml_file: str, known_sha256: Optional[str] = None
+                     ) -> Tuple[Optional[FileResult], Dict[str, Any]]:
+    """
+    Fingerprint xml_file and parse it unless its sha256 is known_sha256.
+
+    Runs as the pool task when a cache is in use, so hashing is spread
+    across the workers along with parsing instead of running serially in
+    the main process.
+
+    Returns:
+        (None, fingerprint) if the content matched known_sha256, otherwise
+        (FileResult, fingerprint). The fingerprint holds mtime_ns, size and
+        sha256.
+    """
+    stat = os.stat(xml_file)
+    fingerprint = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                   'sha256': _sha256_file(xml_file)}
+    if fingerprint['sha256'] == known_sha256:
+        return None, fingerprint
+    return parse_junit_file(xml_file), fingerprint
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed FileResults for repeated gating in one job.
+
+    Entries are keyed by absolute path. A matching mtime and size is taken
+    as unchanged without reading the file; otherwise the sha256, computed
+    by _parse_for_cache in the worker, decides, so a file that was merely
+    touched or copied is still reused. Only entries for files seen in the
+    current run are saved, so reports that are gone don't accumulate. Only
+    parse results are cached - known-failure matching always runs fresh,
+    so changing KNOWN_FAILURES between runs is safe.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.hits = 0
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._seen: Set[str] = set()
+
+        if not os.path.exists(path):
+            return
+
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Ignoring unreadable cache {path}: {e}")
+            return
+
+        if isinstance(data, dict) and data.get('version') == CACHE_VERSION:
+            self._entries = data.get('files', {})
+
+    def _reuse(self, entry: Dict[str, Any], xml_file: str) -> FileResult:
+        self.hits += 1
+        result = FileResult.from_dict(entry['result'])
+        result.path = xml_file
+        return result
+
+    def lookup(self, xml_file: str) -> Tuple[Optional[FileResult], Optional[str]]:
+        """
+        Return the cached result for xml_file if its mtime and size are unchanged.
+
+        Returns:
+            (FileResult, None) on a hit. Otherwise (None, sha256 of a
+            same-size entry to compare against, or None).
+        """
+        key = os.path.abspath(xml_file)
+        self._seen.add(key)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, None
+
+        stat = os.stat(xml_file)
+        if (entry['mtime_ns'], entry['size']) == (stat.st_mtime_ns, stat.st_size):
+            return self._reuse(entry, xml_file), None
+        if entry['size'] == stat.st_size:
+            return None, entry['sha256']
+        return None, None
+
+    def store(self, xml_file: str, result: Optional[FileResult],
+              fingerprint: Dict[str, Any]) -> FileResult:
+        """
+        Record the outcome of _parse_for_cache for xml_file and return its result.
+
+        A None result means the sha256 matched the cached entry, whose parse
+        is reused under the new mtime. Failed parses are not cached.
+        """
+        key = os.path.abspath(xml_file)
+        if result is None:
+            entry = self._entries[key]
+            entry.update(fingerprint)
+            return self._reuse(entry, xml_file)
+
+        if result.error is None:
+            self._entries[key] = dict(fingerprint, result=asdict(result))
+        else:
+            self._entries.pop(key, None)
+        return result
+
+    def save(self) -> None:
+        """Write the cache atomically so a killed run never leaves it torn."""
+        files = {key: entry for key, entry in self._entries.items()
+                 if key in self._seen}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'files': files}, f)
+        os.replace(tmp_path, self.path)
+
+
+@contextmanager
+def _parser_pool(workers: int) -> Iterator[Optional[ProcessPoolExecutor]]:
+    """Provide a process pool for workers > 1, or None to parse in-process."""
+    if workers <= 1:
+        yield None
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        yield pool
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def _iter_file_results(xml_files: Iterable[str], workers: int,
+                       cache: Optional[ParseCache] = None) -> Iterator[FileResult]:
+    """
+    Yield results in the same order as xml_files, reusing cached parses.
+
+    xml_files is consumed lazily: each file is looked up in the cache and,
+    on a miss, parsed in-process or submitted to the pool as soon as it is
+    discovered. Results are yielded strictly in discovery order, each one as
+    soon as it and every result before it are ready. Freshly parsed results
+    are stored back into the cache.
+    """
+    def finish(xml_file: str, item: Any) -> FileResult:
+        if isinstance(item, Future):
+            item = item.result()
+        if isinstance(item, tuple):
+            return cache.store(xml_file, *item)
+        return item
+
+    with _parser_pool(workers) as pool:
+        # (xml_file, FileResult, _parse_for_cache output, or a Future of either)
+        pending: Deque[Tuple[str, Any]] = deque()
+
+        for xml_file in xml_files:
+            if cache is None:
+                hit, task, args = None, parse_junit_file, (xml_file,)
+            else:
+                hit, known_sha256 = cache.lookup(xml_file)
+                task, args = _parse_for_cache, (xml_file, known_sha256)
+
+            if hit is not None:
+                pending.append((xml_file, hit))
+            elif pool is None:
+                pending.append((xml_file, task(*args)))
+            else:
+                pending.append((xml_file, pool.submit(task, *args)))
+
+            while pending and (not isinstance(pending[0][1], Future)
+                               or pending[0][1].done()):
+                yield finish(*pending.popleft())
+
+        while pending:
+            yield finish(*pending.popleft())
+
+
+class TimingProfile:
+    """
+    Per-case and per-suite durations of one verification run.
+
+    Cases are keyed as '<suite>::<case>'; repeated names (e.g. retried
+    cases) accumulate, since that is the time the lane actually spent.
+    """
+
+    def __init__(self) -> None:
+        self.cases: Dict[str, float] = {}
+        self.suites: Dict[str, float] = {}
+
+    def add_suite(self, suite: SuiteResult) -> None:
+        self.suites[suite.name] = self.suites.get(suite.name, 0.0) + suite.time
+        for case_name, case_time in suite.case_times:
+            key = f"{suite.name}::{case_name}"
+            self.cases[key] = self.cases.get(key, 0.0) + case_time
+
+    @classmethod
+    def load(cls, path: str) -> 'TimingProfile':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        profile = cls()
+        profile.cases = data.get('cases', {})
+        profile.suites = data.get('suites', {})
+        return profile
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'suites': self._rounded(self.suites),
+                       'cases': self._rounded(self.cases)}, f, indent=2)
+            f.write('\n')
+        print(f"Timing profile written to {path}")
+
+    @staticmethod
+    def _rounded(times: Dict[str, float]) -> Dict[str, float]:
+        return {name: round(seconds, 3) for name, seconds in times.items()}
+
+    def slowest(self, top_n: int) -> List[Tuple[str, float]]:
+        return heapq.nlargest(top_n, self.cases.items(), key=lambda item: item[1])
+
+    def histogram(self) -> List[Tuple[str, int, float]]:
+        """Bucket case durations as (label, case count, total seconds)."""
+        counts = [0] * len(HISTOGRAM_BOUNDS)
+        totals = [0.0] * len(HISTOGRAM_BOUNDS)
+        for seconds in self.cases.values():
+            for i, (bound, _) in enumerate(HISTOGRAM_BOUNDS):
+                if seconds < bound:
+                    counts[i] += 1
+                    totals[i] += seconds
+                    break
+        return [(label, counts[i], totals[i])
+                for i, (_, label) in enumerate(HISTOGRAM_BOUNDS)]
+
+    def diff(self, baseline: 'TimingProfile') -> Dict[str, Any]:
+        """
+        Compare against a baseline run.
+
+        Returns:
+            Dict with 'changes' (cases in both runs whose duration moved by
+            more than the noise thresholds, largest absolute change first),
+            'added' and 'removed' case keys, and the total time delta.
+        """
+        changes = []
+        for key, seconds in self.cases.items():
+            before = baseline.cases.get(key)
+            if before is None:
+                continue
+            delta = seconds - before
+            if abs(delta) < TIMING_DIFF_MIN_SECONDS:
+                continue
+            if before and abs(delta) / before < TIMING_DIFF_MIN_RATIO:
+                continue
+            changes.append({'case': key, 'before': round(before, 3),
+                            'after': round(seconds, 3), 'delta': round(delta, 3)})
+        changes.sort(key=lambda change: abs(change['delta']), reverse=True)
+
+        return {
+            'changes': changes,
+            'added': sorted(set(self.cases) - set(baseline.cases)),
+            'removed': sorted(set(baseline.cases) - set(self.cases)),
+            'total_delta': round(sum(self.cases.values())
+                                 - sum(baseline.cases.values()), 3),
+        }
+
+
+def _format_seconds(seconds: float) -> str:
+    """Render a duration compactly, e.g. 75.2 -> '1m15.2s'."""
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    minutes, seconds = divmod(seconds, 60)
+    return f"{int(minutes)}m{seconds:04.1f}s"
+
+
+def _print_timing_report(profile: TimingProfile, top_n: int) -> None:
+    """Print the slowest cases and suites and a case-duration histogram."""
+    print(f"\n=== Slowest {top_n} test case(s) ===")
+    for key, seconds in profile.slowest(top_n):
+        print(f"  {_format_seconds(seconds):>10}  {key}")
+
+    print(f"\n=== Slowest {top_n} suite(s) ===")
+    for name, seconds in heapq.nlargest(top_n, profile.suites.items(),
+                                        key=lambda item: item[1]):
+        print(f"  {_format_seconds(seconds):>10}  {name}")
+
+    print("\n=== Test case duration histogram ===")
+    buckets = profile.histogram()
+    largest = max((count for _, count, _ in buckets), default=0) or 1
+    for label, count, total in buckets:
+        bar = '#' * round(HISTOGRAM_WIDTH * count / largest)
+        print(f"  {label:>8} {count:>6}  {_format_seconds(total):>10}  {bar}".rstrip())
+
+
+def _print_timing_diff(timing_diff: Dict[str, Any], top_n: int) -> None:
+    """Print the largest duration changes against the baseline."""
+    changes = timing_diff['changes']
+    print(f"\n=== Duration changes vs baseline "
+          f"(total {timing_diff['total_delta']:+.1f}s) ===")
+    if not changes:
+        print("  No significant changes")
+    for change in changes[:top_n]:
+        print(f"  {change['delta']:+9.1f}s  "
+              f"{_format_seconds(change['before'])} -> "
+              f"{_format_seconds(change['after'])}  {change['case']}")
+    if len(changes) > top_n:
+        print(f"  ... {len(changes) - top_n} more change(s)")
+    print(f"  {len(timing_diff['added'])} new case(s), "
+          f"{len(timing_diff['removed'])} removed case(s)")
+
+
+def _report_timings(profile: TimingProfile, summary: Dict[str, Any]) -> None:
+    """Handle TIMING_TOP_N / TIMING_FILE / TIMING_BASELINE for a finished run."""
+    top_n_str = os.getenv('TIMING_TOP_N', '0').strip() or '0'
+    try:
+        top_n = int(top_n_str)
+    except ValueError:
+        print(f"Warning: TIMING_TOP_N is not an integer: {top_n_str}")
+        top_n = 0
+
+    if top_n > 0:
+        _print_timing_report(profile, top_n)
+        summary['slowest_cases'] = [
+            {'case': key, 'time': round(seconds, 3)}
+            for key, seconds in profile.slowest(top_n)]
+
+    timing_path = os.getenv('TIMING_FILE', '').strip()
+    if timing_path:
+        profile.save(timing_path)
+
+    baseline_path = os.getenv('TIMING_BASELINE', '').strip()
+    if not baseline_path:
+        return
+
+    try:
+        baseline = TimingProfile.load(baseline_path)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Warning: Cannot read TIMING_BASELINE {baseline_path}: {e}")
+        return
+
+    timing_diff = profile.diff(baseline)
+    _print_timing_diff(timing_diff, top_n if top_n > 0 else DEFAULT_TIMING_DIFF_TOP_N)
+    summary['timing_diff'] = timing_diff
+
+
+def _report_file_results(file_results: Iterable[FileResult],
+                         matcher: KnownFailureMatcher,
+                         summary: Dict[str, Any],
+                         profile: Optional[TimingProfile] = None) -> int:
+    """
+    Print per-file/per-suite results and return the overall exit code.
+
+    The same results are recorded into summary (suite records and totals)
+    for the machine-readable output, and suite/case times into profile.
+    """
+    failed_tests = 0
+    skipped_known_failures = 0
+    total_tests = 0
+
+    for file_result in file_results:
+        xml_file = file_result.path
+        summary['files'] += 1
+        print(f"\nProcessing: {os.path.relpath(xml_file, summary['directory'])}")
+
+        if file_result.error is not None:
+            print(f"Error parsing {xml_file}: {file_result.error}")
+            summary['error'] = f"{xml_file}: {file_result.error}"
+            return 1
+
+        for suite in file_result.suites:
+            suite_failures = []
+            suite_known_failures = []
+            total_tests += suite.tests
+            if profile is not None:
+                profile.add_suite(suite)
+
+            for case_name in suite.failed_cases:
+                known_failure = matcher.match(case_name, suite.name)
+                if known_failure is not None:
+                    skipped_known_failures += 1
+                    suite_known_failures.append(
+                        {'name': case_name, 'known_failure': known_failure})
+                    print(f"  SKIPPED (known failure): {case_name}")
+                else:
+                    failed_tests += 1
+                    suite_failures.append(case_name)
+                    print(f"  FAILED: {case_name}")
+
+            _print_suite_status(suite.name, suite.tests, len(suite_failures),
+                               len(suite_known_failures))
+            summary['suites'].append({
+                'file': xml_file,
+                'name': suite.name,
+                'tests': suite.tests,
+                'skipped': suite.skipped,
+                'failed': len(suite_failures),
+                'known_failures_skipped': len(suite_known_failures),
+                'time': round(suite.time, 3),
+                'failed_cases': suite_failures,
+                'known_failure_cases': suite_known_failures,
+            })
+
+    if summary['files'] == 0:
+        print(f"Warning: No XML files found in {summary['directory']}")
+        return 1
+
+    print(f"\nVerified {summary['files']} XML file(s)")
+    _print_unused_known_failures(matcher)
+    summary.update({
+        'total_tests': total_tests,
+        'failed_tests': failed_tests,
+        'known_failures_skipped': skipped_known_failures,
+        'unused_known_failures': matcher.unused(),
+    })
+    return _print_summary_and_return_status(total_tests, failed_tests,
+                                           skipped_known_failures)
+
+
+def write_summary(path: str, summary: Dict[str, Any]) -> None:
+    """
+    Write the verification summary for downstream consumers.
+
+    A path ending in .ndjson gets one {"type": "suite"} line per suite
+    followed by a single {"type": "summary"} line, so large runs can be
+    streamed; any other path gets one JSON document.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        if path.endswith('.ndjson'):
+            for suite in summary['suites']:
+                f.write(json.dumps({'type': 'suite', **suite}) + '\n')
+            totals = {k: v for k, v in summary.items() if k != 'suites'}
+            f.write(json.dumps({'type': 'summary', **totals}) + '\n')
+        else:
+            json.dump(summary, f, indent=2)
+            f.write('\n')
+    print(f"Summary written to {path}")
 
 
 def verify_junit_reports(directory: str) -> int:
@@ -106,58 +1037,39 @@ def verify_junit_reports(directory: str) -> int:
         print(f"Error: {directory} is not a directory")
         return 1
     
-    known_failures = parse_known_failures()
+    matcher = KnownFailureMatcher(parse_known_failures())
     
-    xml_files = glob.glob(os.path.join(directory, "*.xml"))
-    if not xml_files:
-        print(f"Warning: No XML files found in {directory}")
-        return 1
-    
-    print(f"Found {len(xml_files)} XML file(s) to verify:")
-    for xml_file in xml_files:
-        print(f"  - {os.path.basename(xml_file)}")
-    
-    failed_tests = 0
-    skipped_known_failures = 0
-    total_tests = 0
-    
-    for xml_file in xml_files:
-        try:
-            print(f"\nProcessing: {os.path.basename(xml_file)}")
-            xml = JUnitXml.fromfile(xml_file)
-            
-            if isinstance(xml, TestSuite):
-                xml = [xml]
-            
-            for suite in xml:
-                suite_name = suite.name or "Unknown Suite"
-                suite_tests = 0
-                suite_failures = 0
-                suite_known_failures = 0
-                
-                for case in suite:
-                    total_tests += 1
-                    suite_tests += 1
-                    
-                    if not case.is_passed and not case.is_skipped:
-                        if is_known_failure(case.name, known_failures):
-                            skipped_known_failures += 1
-                            suite_known_failures += 1
-                            print(f"  SKIPPED (known failure): {case.name}")
-                        else:
-                            failed_tests += 1
-                            suite_failures += 1
-                            print(f"  FAILED: {case.name}")
-                
-                _print_suite_status(suite_name, suite_tests, suite_failures,
-                                   suite_known_failures)
-                    
-        except Exception as e:
-            print(f"Error parsing {xml_file}: {e}")
-            return 1
-    
-    return _print_summary_and_return_status(total_tests, failed_tests,
-                                           skipped_known_failures)
+    include = _parse_globs('JUNIT_INCLUDE', DEFAULT_INCLUDE)
+    exclude = _parse_globs('JUNIT_EXCLUDE')
+    print(f"Looking for {', '.join(include)} in {directory}"
+          + (f" (excluding {', '.join(exclude)})" if exclude else ""))
+    xml_files = discover_junit_files(directory, include, exclude)
+
+    workers = _resolve_worker_count()
+    if workers > 1:
+        print(f"Parsing with {workers} worker process(es)")
+
+    cache_path = os.getenv('JUNIT_CACHE_FILE', '').strip()
+    cache = ParseCache(cache_path) if cache_path else None
+
+    summary: Dict[str, Any] = {'directory': directory, 'files': 0, 'suites': []}
+    profile = TimingProfile()
+    status = _report_file_results(
+        _iter_file_results(xml_files, workers, cache), matcher, summary, profile)
+    summary['status'] = 'passed' if status == 0 else 'failed'
+
+    if profile.cases:
+        _report_timings(profile, summary)
+
+    if cache is not None:
+        print(f"Reused {cache.hits} cached parse result(s)")
+        cache.save()
+
+    summary_path = os.getenv('SUMMARY_FILE', '').strip()
+    if summary_path:
+        write_summary(summary_path, summary)
+
+    return status
 
 
 def _print_suite_status(suite_name: str, suite_tests: int, 
@@ -176,6 +1088,17 @@ def _print_suite_status(suite_name: str, suite_tests: int,
         print(f"  ✗ {base_msg}: {', '.join(failure_parts)}")
 
 
+def _print_unused_known_failures(matcher: KnownFailureMatcher) -> None:
+    """List known failures that matched nothing, so stale ones can be dropped."""
+    unused = matcher.unused()
+    if not unused:
+        return
+
+    print(f"\nUnused known failures ({len(unused)}), candidates for removal:")
+    for label in unused:
+        print(f"  - {label}")
+
+
 def _print_summary_and_return_status(total_tests: int, failed_tests: int,
                                     skipped_known_failures: int) -> int:
     """Print final summary and return exit code."""
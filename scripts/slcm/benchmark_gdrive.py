@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Upload/download throughput benchmark for the SLCM Drive scripts.
+
+This script is not officially supported and comes with no guarantees.
+Use it at your own risk. Test thoroughly in your environment before use.
+
+Generates a synthetic tree of N files x M MB, starts fake_gdrive_server.py
+in-process and runs the real upload_to_gdrive.py and download_from_gdrive.py
+against it as subprocesses, exactly as CI would. Downloaded files are
+checked against the originals, and wall time and throughput are reported for
+each phase.
+
+The fake server runs on loopback, so the numbers show the scripts' own
+overhead (connection handling, hashing, concurrency, request count). They
+do not predict Drive's real throughput. Use --latency-ms to approximate a
+round trip to Google and see how well concurrency hides it.
+
+Requires: pip install pyjwt cryptography
+
+Usage example:
+    python scripts/slcm/benchmark_gdrive.py --files 200 --size-mb 0.5 --concurrency 8
+    python scripts/slcm/benchmark_gdrive.py --files 4 --size-mb 64 --output bench.json
+"""
+
+from argparse import ArgumentParser
+from json import dumps
+from os import environ, urandom
+from pathlib import Path
+from subprocess import STDOUT, run
+from sys import executable, exit
+from tempfile import TemporaryDirectory
+from time import monotonic
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from fake_gdrive_server import FakeDrive, start_server
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+ROOT_FOLDER_ID = "benchmark-root"
+JOB_NAME = "benchmark"
+FILES_PER_DIR = 50
+
+
+def make_tree(root: Path, count: int, size: int) -> dict[str, bytes]:
+    """Write count random files of size bytes under root; return name -> content."""
+    contents = {}
+    for index in range(count):
+        # Uploads are flat, so names must be unique across subdirectories.
+        file_path = root / f"dir-{index // FILES_PER_DIR:03d}" / f"report-{index:05d}.xml"
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        data = urandom(size)
+        file_path.write_bytes(data)
+        contents[file_path.name] = data
+    return contents
+
+
+def service_account_key() -> str:
+    """Throwaway service account key; the fake server accepts any signed JWT."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    return dumps({"client_email": "benchmark@example.com", "private_key": pem.decode()})
+
+
+def run_phase(name: str, script: str, env: dict, log_file: Path) -> float:
+    """Run one SLCM script and return its wall time; exit with its log on failure."""
+    started = monotonic()
+    with open(log_file, "w") as log:
+        result = run([executable, str(SCRIPT_DIR / script)], env=env, stdout=log, stderr=STDOUT)
+    elapsed = monotonic() - started
+
+    if result.returncode != 0:
+        print(f"{name} failed with exit code {result.returncode}:")
+        print(log_file.read_text()[-4000:])
+        exit(1)
+    return elapsed
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark the SLCM Drive scripts against a local fake Drive API.")
+    parser.add_argument("--files", type=int, default=100, help="Number of files (default: 100)")
+    parser.add_argument("--size-mb", type=float, default=1.0, help="Size of each file in MB (default: 1)")
+    parser.add_argument("--concurrency", type=int, default=8, help="UPLOAD/DOWNLOAD_CONCURRENCY (default: 8)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay the fake server adds per request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests failed with HTTP 503")
+    parser.add_argument("--resumable-threshold-mb", type=int, help="Override RESUMABLE_THRESHOLD_MB")
+    parser.add_argument("--output", type=Path, help="Also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    drive = FakeDrive(fail_rate=args.fail_rate, latency=args.latency_ms / 1000)
+    drive.add_folder(ROOT_FOLDER_ID)
+    server = start_server(drive)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    size = int(args.size_mb * 1024 * 1024)
+    total_mb = args.files * size / (1024 * 1024)
+
+    with TemporaryDirectory(prefix="gdrive-benchmark-") as work:
+        work_dir = Path(work)
+        upload_dir = work_dir / "upload"
+        download_dir = work_dir / "download"
+        contents = make_tree(upload_dir, args.files, size)
+
+        env = dict(environ)
+        env.update(
+            {
+                "GDRIVE_API_ROOT": base_url,
+                "GDRIVE_OAUTH2_TOKEN_URL": f"{base_url}/token",
+                "GDRIVE_TOKEN_CACHE": "",
+                "GOOGLE_SERVICE_ACCOUNT_KEY": service_account_key(),
+                "LOCAL_XML_REPORT_DIR": str(upload_dir),
+                "GDRIVE_FOLDER_ID": ROOT_FOLDER_ID,
+                "JOB_NAME": JOB_NAME,
+                "API_URL": f"{base_url}/api/v1/job/execute",
+                "TOKEN": "benchmark",
+                "UPLOAD_CONCURRENCY": str(args.concurrency),
+                "GDRIVE_FOLDER_NAME": JOB_NAME,
+                "GDRIVE_PARENT_ID": ROOT_FOLDER_ID,
+                "LOCAL_DOWNLOAD_DIR": str(download_dir),
+                "DOWNLOAD_CONCURRENCY": str(args.concurrency),
+            }
+        )
+        if args.resumable_threshold_mb:
+            env["RESUMABLE_THRESHOLD_MB"] = str(args.resumable_threshold_mb)
+
+        upload_seconds = run_phase("Upload", "upload_to_gdrive.py", env, work_dir / "upload.log")
+        download_seconds = run_phase("Download", "download_from_gdrive.py", env, work_dir / "download.log")
+
+        mismatched = [
+            name
+            for name, data in contents.items()
+            if not (download_dir / name).is_file() or (download_dir / name).read_bytes() != data
+        ]
+
+    server.shutdown()
+
+    results = {
+        "files": args.files,
+        "file_size_mb": args.size_mb,
+        "total_mb": round(total_mb, 3),
+        "concurrency": args.concurrency,
+        "latency_ms": args.latency_ms,
+        "fail_rate": args.fail_rate,
+        "upload_seconds": round(upload_seconds, 3),
+        "upload_mb_per_second": round(total_mb / upload_seconds, 2),
+        "download_seconds": round(download_seconds, 3),
+        "download_mb_per_second": round(total_mb / download_seconds, 2),
+        "mismatched_files": len(mismatched),
+    }
+
+    print(f"{args.files} files x {args.size_mb} MB = {total_mb:.1f} MB, concurrency {args.concurrency}")
+    print(f"{'phase':<10} {'seconds':>9} {'MB/s':>9}")
+    print(f"{'upload':<10} {upload_seconds:>9.2f} {results['upload_mb_per_second']:>9.2f}")
+    print(f"{'download':<10} {download_seconds:>9.2f} {results['download_mb_per_second']:>9.2f}")
+
+    if args.output:
+        args.output.write_text(dumps(results, indent=2) + "\n")
+
+    if mismatched:
+        print(f"{len(mismatched)} downloaded file(s) missing or different, e.g. {mismatched[0]}")
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
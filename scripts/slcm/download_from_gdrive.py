@@ -10,6 +10,16 @@ Environment variables:
   GDRIVE_PARENT_ID: Parent folder/Shared Drive ID where to search
   LOCAL_DOWNLOAD_DIR: Local directory to save files
   GOOGLE_SERVICE_ACCOUNT_KEY: Service account JSON key as string
+  DOWNLOAD_CONCURRENCY: Number of parallel folder listings/downloads (default: 8)
+  DOWNLOAD_RETRIES: Attempts per request before giving up (default: 3)
+  GDRIVE_TOKEN_CACHE: Access token cache file shared between runs
+                      (default: ~/.cache/slcm/gdrive-token-cache.json,
+                      empty to disable; see gdrive_auth.py)
+
+Files are streamed to a '<name>.part' file and renamed into place once
+their md5 matches Drive's md5Checksum. A leftover .part file from an
+interrupted run or attempt is resumed with an HTTP Range request, and
+files whose local copy already matches are not downloaded again.
 
 Requires: pip install pyjwt cryptography
 
@@ -23,89 +33,54 @@ Usage example:
 
 from sys import exit, stderr
 from json import loads, JSONDecodeError
-from time import time
+from time import monotonic
 from logging import getLogger, basicConfig, INFO
-from os import getenv, path
+from os import getenv, path, replace
+from hashlib import md5
 from pathlib import Path
-from urllib.request import Request, urlopen
-from urllib.parse import urlencode, quote
-from urllib.error import HTTPError
-from jwt import encode
+from typing import Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import quote
+
+from gdrive_auth import TokenProvider, token_cache_path
+from gdrive_client import (
+    FOLDER_MIME_TYPE,
+    GDRIVE_API_URL,
+    DriveAPIError,
+    DriveClient,
+    list_folder,
+    md5_file,
+    positive_int_from_env,
+    validate_environment,
+    with_retries,
+)
 
 logger = getLogger(__name__)
 
-GDRIVE_AUTH_SCOPE = "https://www.googleapis.com/auth/drive"
-DRIVE_AUTH_TOKEN_URL = "https://oauth2.googleapis.com/token"
-DRIVE_FILES_API_URL = "https://www.googleapis.com/drive/v3/files"
-
-
-def get_access_token(service_account_info: dict) -> str:
-    """Generate access token from service account key using JWT."""
-    now = int(time())
-
-    payload = {
-        "iss": service_account_info["client_email"],
-        "scope": GDRIVE_AUTH_SCOPE,
-        "aud": DRIVE_AUTH_TOKEN_URL,
-        "iat": now,
-        "exp": now + 3600,
-    }
-
-    # Sign JWT with private key
-    signed_jwt = encode(payload, service_account_info["private_key"], algorithm="RS256")
-
-    # Exchange JWT for access token
-    data = urlencode(
-        {
-            "grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer",
-            "assertion": signed_jwt,
-        }
-    ).encode()
-
-    request = Request(
-        DRIVE_AUTH_TOKEN_URL,
-        data=data,
-        headers={"Content-Type": "application/x-www-form-urlencoded"},
-    )
-
-    try:
-        with urlopen(request) as response:
-            result = loads(response.read().decode())
-            return result["access_token"]
-    except HTTPError as e:
-        error_body = e.read().decode("utf-8")
-        raise Exception(f"Failed to get access token: {error_body}")
+DEFAULT_DOWNLOAD_CONCURRENCY = 8
+DEFAULT_DOWNLOAD_RETRIES = 3
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+PARTIAL_SUFFIX = ".part"
 
 
-def find_folder_by_name(parent_id: str, folder_name: str, access_token: str) -> str:
+def find_folder_by_name(parent_id: str, folder_name: str, client: DriveClient) -> str:
     """Find folder by name in parent directory."""
-    query = f"name='{folder_name}' and '{parent_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
+    query = f"name='{folder_name}' and '{parent_id}' in parents and mimeType='{FOLDER_MIME_TYPE}' and trashed=false"
     encoded_query = quote(query)
 
-    headers = {"Authorization": f"Bearer {access_token}"}
-
-    request = Request(
-        f"{DRIVE_FILES_API_URL}?q={encoded_query}&supportsAllDrives=true&includeItemsFromAllDrives=true&fields=files(id,name)",
-        headers=headers,
+    result = client.request_json(
+        "GET",
+        f"{GDRIVE_API_URL}?q={encoded_query}&supportsAllDrives=true&includeItemsFromAllDrives=true&fields=files(id,name)",
     )
+    files = result.get("files", [])
 
-    try:
-        with urlopen(request) as response:
-            result = loads(response.read().decode())
-            files = result.get("files", [])
-
-            if not files:
-                raise Exception(
-                    f"Folder '{folder_name}' not found in parent {parent_id}"
-                )
+    if not files:
+        raise Exception(f"Folder '{folder_name}' not found in parent {parent_id}")
 
-            return files[0]["id"]
-    except HTTPError as e:
-        error_body = e.read().decode("utf-8")
-        raise Exception(f"HTTP {e.code}: {error_body}")
+    return files[0]["id"]
 
 
-def find_folder_by_path(parent_id: str, folder_path: str, access_token: str) -> str:
+def find_folder_by_path(parent_id: str, folder_path: str, client: DriveClient) -> str:
     """Find folder by path (e.g., 'reports/slcm')."""
     # Split path into parts
     parts = folder_path.strip("/").split("/")
@@ -114,98 +89,220 @@ def find_folder_by_path(parent_id: str, folder_path: str, access_token: str) ->
 
     for part in parts:
         logger.info(f"Looking for folder: {part}")
-        current_parent = find_folder_by_name(current_parent, part, access_token)
+        current_parent = find_folder_by_name(current_parent, part, client)
 
     return current_parent
 
 
-def list_files_in_folder(folder_id: str, access_token: str) -> list[dict]:
-    """List all files and subfolders in a folder recursively."""
-    query = f"'{folder_id}' in parents and trashed=false"
-    encoded_query = quote(query)
-
-    headers = {"Authorization": f"Bearer {access_token}"}
-
-    request = Request(
-        f"{DRIVE_FILES_API_URL}?q={encoded_query}&supportsAllDrives=true&includeItemsFromAllDrives=true&fields=files(id,name,mimeType)",
-        headers=headers,
-    )
-
-    try:
-        with urlopen(request) as response:
-            result = loads(response.read().decode())
-            return result.get("files", [])
-    except HTTPError as e:
-        error_body = e.read().decode("utf-8")
-        raise Exception(f"HTTP {e.code}: {error_body}")
-
-
-def download_file(file_id: str, local_path: str, access_token: str) -> bool:
-    """Download a file from Google Drive."""
-    headers = {"Authorization": f"Bearer {access_token}"}
-
-    request = Request(
-        f"{DRIVE_FILES_API_URL}/{file_id}?alt=media&supportsAllDrives=true",
-        headers=headers,
-    )
+def list_files_in_folder(folder_id: str, client: DriveClient) -> list[dict]:
+    """List all files and subfolders in a folder, across every result page."""
+    return list_folder(folder_id, client, fields="id,name,mimeType,size,md5Checksum,modifiedTime")
+
+
+def newest_by_name(children: list[dict]) -> tuple[list[dict], list[dict]]:
+    """
+    Split a folder listing into the children to fetch and same-name duplicates.
+
+    Drive allows several files with one name in a folder, but they would all
+    be written to the same local path (and the same .part file). Only the
+    most recently modified one is kept; on a tie the last one listed wins,
+    as it did when files were downloaded one after another. Subfolders are
+    always kept.
+
+    Returns:
+        (children to fetch, in listing order, duplicate files left out)
+    """
+    newest = {}
+    for child in children:
+        if child["mimeType"] == FOLDER_MIME_TYPE:
+            continue
+        current = newest.get(child["name"])
+        if current is None or child.get("modifiedTime", "") >= current.get("modifiedTime", ""):
+            newest[child["name"]] = child
+
+    kept, duplicates = [], []
+    for child in children:
+        if child["mimeType"] == FOLDER_MIME_TYPE or newest[child["name"]] is child:
+            kept.append(child)
+        else:
+            duplicates.append(child)
+    return kept, duplicates
+
+
+def is_up_to_date(local_path: Path, remote_file: dict) -> bool:
+    """True if local_path already holds the same content as the Drive file."""
+    if not local_path.is_file():
+        return False
+    if "size" in remote_file and local_path.stat().st_size != int(remote_file["size"]):
+        return False
+    expected_md5 = remote_file.get("md5Checksum")
+    return bool(expected_md5) and md5_file(local_path) == expected_md5
+
+
+def download_file(remote_file: dict, local_path: Path, client: DriveClient) -> Optional[int]:
+    """
+    Stream a file from Google Drive to local_path.
+
+    Data is written in DOWNLOAD_CHUNK_SIZE pieces to '<local_path>.part'
+    and only renamed over local_path once complete and, when Drive
+    reports one, once its md5Checksum matches. If a .part file is left from
+    an interrupted attempt, only the missing tail is requested.
+
+    Returns:
+        Bytes fetched, or None if the local copy was already up to date.
+    """
+    if is_up_to_date(local_path, remote_file):
+        return None
+
+    partial_path = local_path.with_name(local_path.name + PARTIAL_SUFFIX)
+    expected_size = int(remote_file["size"]) if "size" in remote_file else None
+    offset = partial_path.stat().st_size if partial_path.is_file() else 0
+    if expected_size is not None and offset > expected_size:
+        offset = 0
+
+    digest = md5()
+    headers = {}
+    if offset:
+        # Hash what is already on disk so the final checksum covers it.
+        with open(partial_path, "rb") as f:
+            for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        headers["Range"] = f"bytes={offset}-"
+
+    fetched = 0
+    # offset == expected_size: an earlier attempt got every byte but failed
+    # before the rename, so there is nothing left to fetch.
+    if not offset or offset != expected_size:
+        url = f"{GDRIVE_API_URL}/{remote_file['id']}?alt=media&supportsAllDrives=true"
+        try:
+            with client.stream(url, headers=headers) as response:
+                if offset and response.status != 206:
+                    # Range ignored - the full body follows, start over.
+                    offset = 0
+                    digest = md5()
+                with open(partial_path, "ab" if offset else "wb") as f:
+                    for chunk in iter(lambda: response.read(DOWNLOAD_CHUNK_SIZE), b""):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        fetched += len(chunk)
+        except DriveAPIError as e:
+            if e.code != 416 or not offset:
+                raise
+            # The .part no longer lines up with the remote file; start over.
+            partial_path.unlink()
+            return download_file(remote_file, local_path, client)
+
+    expected_md5 = remote_file.get("md5Checksum")
+    if expected_md5 and digest.hexdigest() != expected_md5:
+        partial_path.unlink()
+        raise Exception(
+            f"Checksum mismatch: expected md5 {expected_md5}, got {digest.hexdigest()}"
+        )
 
-    try:
-        with urlopen(request) as response:
-            with open(local_path, "wb") as f:
-                f.write(response.read())
-            return True
-    except HTTPError as e:
-        error_body = e.read().decode("utf-8")
-        raise Exception(f"HTTP {e.code}: {error_body}")
+    replace(partial_path, local_path)
+    return fetched
 
 
 def download_folder_recursively(
-    folder_id: str, local_dir: Path, access_token: str, current_path: str = ""
-) -> tuple[int, int]:
-    """Download all files from folder recursively."""
-    files = list_files_in_folder(folder_id, access_token)
-
+    folder_id: str, local_dir: Path, client: DriveClient, concurrency: int, retries: int
+) -> tuple[int, int, int, int]:
+    """
+    Download all files from folder recursively through one bounded pool.
+
+    Listing a folder and downloading a file are both pool tasks. A listing
+    task only returns the folder's children; this thread then schedules
+    their downloads and the listings of any subfolders, so the tree is
+    explored breadth-first and concurrently without workers ever waiting on
+    each other.
+
+    Two downloads never target the same local path: same-name files in one
+    folder are reduced to the newest (see newest_by_name), and a path
+    already claimed through a same-name sibling folder is skipped.
+
+    Returns:
+        (downloaded count, up-to-date count, failed download and listing count,
+        downloaded bytes)
+    """
     downloaded = 0
+    skipped = 0
     failed = 0
+    downloaded_bytes = 0
+    # Local paths with a download scheduled, so two tasks never share a
+    # destination or .part file.
+    claimed = set()
+
+    def list_task(folder: str) -> list[dict]:
+        return with_retries(
+            lambda: list_files_in_folder(folder, client), retries, f"List folder {folder}"
+        )
 
-    for report_file in files:
-        file_name = report_file["name"]
-        file_id = report_file["id"]
-        mime_type = report_file["mimeType"]
-
-        if mime_type == "application/vnd.google-apps.folder":
-            # It's a subfolder - recurse
-            subfolder_path = path.join(current_path, file_name)
-            subfolder_local = local_dir / subfolder_path
-            subfolder_local.mkdir(parents=True, exist_ok=True)
-
-            logger.info(f"Entering folder: {subfolder_path}")
-            sub_downloaded, sub_failed = download_folder_recursively(
-                file_id, local_dir, access_token, subfolder_path
-            )
-            downloaded += sub_downloaded
-            failed += sub_failed
-        else:
-            # It's a file - download
-            file_path = path.join(current_path, file_name)
-            local_file_path = local_dir / file_path
-
-            try:
-                download_file(file_id, local_file_path, access_token)
-                logger.info(f"Downloaded: {file_path}")
-                downloaded += 1
-            except Exception as e:
-                logger.error(f"Failed to download {file_path}: {e}")
-                failed += 1
-
-    return downloaded, failed
-
+    def download_task(remote_file: dict, file_path: str) -> Optional[int]:
+        return with_retries(
+            lambda: download_file(remote_file, local_dir / file_path, client),
+            retries,
+            f"Download {file_path}",
+        )
 
-def validate_environment(env_var_value: str, env_var_name: str) -> str:
-    if not env_var_value:
-        logger.error(f"Error: {env_var_name} environment variable not set")
-        exit(1)
-    return env_var_value
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = {pool.submit(list_task, folder_id): ("list", "")}
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, current_path = pending.pop(future)
+
+                if kind == "download":
+                    try:
+                        fetched = future.result()
+                    except Exception as e:
+                        logger.error(f"Failed to download {current_path}: {e}")
+                        failed += 1
+                        continue
+
+                    if fetched is None:
+                        logger.info(f"Up to date: {current_path}")
+                        skipped += 1
+                    else:
+                        downloaded_bytes += fetched
+                        logger.info(f"Downloaded: {current_path}")
+                        downloaded += 1
+                    continue
+
+                try:
+                    children = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to list folder '{current_path or '.'}': {e}")
+                    failed += 1
+                    continue
+
+                children, duplicates = newest_by_name(children)
+                for duplicate in duplicates:
+                    logger.warning(
+                        f"Skipping older duplicate of {path.join(current_path, duplicate['name'])} "
+                        f"(ID: {duplicate['id']}, modified {duplicate.get('modifiedTime', 'unknown')})"
+                    )
+
+                for report_file in children:
+                    child_path = path.join(current_path, report_file["name"])
+
+                    if report_file["mimeType"] == FOLDER_MIME_TYPE:
+                        # It's a subfolder - list it concurrently
+                        (local_dir / child_path).mkdir(parents=True, exist_ok=True)
+                        logger.info(f"Entering folder: {child_path}")
+                        pending[pool.submit(list_task, report_file["id"])] = ("list", child_path)
+                    elif child_path in claimed:
+                        logger.warning(
+                            f"Skipping {child_path} (ID: {report_file['id']}): "
+                            "already downloading a file to that path"
+                        )
+                    else:
+                        # It's a file - download
+                        claimed.add(child_path)
+                        pending[
+                            pool.submit(download_task, report_file, child_path)
+                        ] = ("download", child_path)
+
+    return downloaded, skipped, failed, downloaded_bytes
 
 
 def download_from_gdrive():
@@ -219,6 +316,8 @@ def download_from_gdrive():
     service_account_key = validate_environment(
         getenv("GOOGLE_SERVICE_ACCOUNT_KEY"), "GOOGLE_SERVICE_ACCOUNT_KEY"
     )
+    concurrency = positive_int_from_env("DOWNLOAD_CONCURRENCY", DEFAULT_DOWNLOAD_CONCURRENCY)
+    retries = positive_int_from_env("DOWNLOAD_RETRIES", DEFAULT_DOWNLOAD_RETRIES)
 
     # Parse service account key
     try:
@@ -231,23 +330,26 @@ def download_from_gdrive():
     local_dir_path = Path(local_dir)
     local_dir_path.mkdir(parents=True, exist_ok=True)
 
-    # Get access token
+    # Get access token (reused from the on-disk cache when still valid)
     logger.info("Generating access token...")
+    token = TokenProvider(service_account_info, cache_path=token_cache_path())
     try:
-        access_token = get_access_token(service_account_info)
+        token()
     except Exception as e:
         logger.error(f"Error generating access token: {e}")
         exit(1)
 
+    client = DriveClient(token)
+
     # Find folder by name or path
     logger.info(f"Searching for folder '{folder_name}'...")
     try:
         # Path like "reports/slcm"
         if "/" in folder_name:
-            folder_id = find_folder_by_path(parent_id, folder_name, access_token)
+            folder_id = find_folder_by_path(parent_id, folder_name, client)
         # Simple name like "SLCM"
         else:
-            folder_id = find_folder_by_name(parent_id, folder_name, access_token)
+            folder_id = find_folder_by_name(parent_id, folder_name, client)
 
         logger.info(f"Found folder: {folder_name}")
     except Exception as e:
@@ -257,13 +359,21 @@ def download_from_gdrive():
     # Download all files
     logger.info(f"Downloading files to {local_dir}...")
     try:
-        downloaded, failed = download_folder_recursively(
-            folder_id, local_dir_path, access_token
+        started = monotonic()
+        downloaded, skipped, failed, downloaded_bytes = download_folder_recursively(
+            folder_id, local_dir_path, client, concurrency, retries
+        )
+        elapsed = monotonic() - started
+
+        megabytes = downloaded_bytes / (1024 * 1024)
+        logger.info(
+            f"Summary: {downloaded} downloaded, {skipped} up to date, {failed} failed, "
+            f"{megabytes:.2f} MB in {elapsed:.1f}s "
+            f"({megabytes / elapsed if elapsed else 0:.2f} MB/s, concurrency {concurrency})"
         )
-        logger.info(f"\nSummary: {downloaded} downloaded, {failed} failed")
 
         if failed > 0:
-            logger.error(f"Failed to download files")
+            logger.error("Failed to download files")
             exit(1)
     except Exception as e:
         logger.error(f"Error downloading files: {e}")
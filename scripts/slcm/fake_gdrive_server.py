@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Local in-memory stand-in for the parts of Google Drive v3 the SLCM scripts use.
+
+This script is not officially supported and comes with no guarantees.
+Use it at your own risk. Test thoroughly in your environment before use.
+
+Implements just enough of the API for upload_to_gdrive.py and
+download_from_gdrive.py to run end to end without Google credentials:
+
+  POST  /token                                   OAuth token exchange (any JWT accepted)
+  GET   /drive/v3/files?q=...                    list, with pageSize/pageToken paging
+  POST  /drive/v3/files                          create metadata (folders)
+  PATCH /drive/v3/files/{id}                     update metadata (trash)
+  GET   /drive/v3/files/{id}?alt=media           download, honouring Range
+  POST  /upload/drive/v3/files                   multipart or resumable upload
+  PATCH /upload/drive/v3/files/{id}              multipart or resumable update
+  PUT   /upload/drive/v3/files?upload_id=...     resumable chunk / status query
+  POST  /batch/drive/v3                          multipart/mixed batch of the above
+  POST  /api/...                                 job trigger, always accepted
+  GET   /api/.../{id}                            job status, always PENDING
+
+Only the query forms the scripts build are understood: "'<id>' in parents",
+"name='<name>'", "mimeType='<type>'", "mimeType!='<type>'" and
+"trashed=false". Nothing is persisted; all state lives in memory.
+
+Point the scripts at it with:
+    export GDRIVE_API_ROOT=http://127.0.0.1:8765
+    export GDRIVE_OAUTH2_TOKEN_URL=http://127.0.0.1:8765/token
+    export GDRIVE_TOKEN_CACHE=
+
+Usage example:
+    python scripts/slcm/fake_gdrive_server.py --port 8765 --folder root-folder-id
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from hashlib import md5
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps, loads
+from logging import INFO, basicConfig, getLogger
+from random import random
+from re import IGNORECASE, compile as compile_regex
+from threading import Lock, Thread
+from time import sleep
+from urllib.parse import parse_qs, unquote, urlsplit
+from uuid import uuid4
+
+logger = getLogger(__name__)
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+DEFAULT_PAGE_SIZE = 100
+PARENT_RE = compile_regex(r"'([^']+)' in parents")
+NAME_RE = compile_regex(r"name='([^']+)'")
+MIME_TYPE_RE = compile_regex(r"mimeType(!?=)'([^']+)'")
+BOUNDARY_RE = compile_regex(r'boundary="?([^";]+)"?')
+CONTENT_ID_RE = compile_regex(r"Content-ID:\s*<([^>]+)>", IGNORECASE)
+
+
+class FakeDrive:
+    """In-memory file store shared by all request handler threads."""
+
+    def __init__(self, fail_rate: float = 0.0, latency: float = 0.0):
+        self.files: dict[str, dict] = {}
+        self.sessions: dict[str, dict] = {}
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.lock = Lock()
+
+    def add_folder(self, folder_id: str, name: str = None, parent: str = None) -> str:
+        with self.lock:
+            self.files[folder_id] = {
+                "id": folder_id,
+                "name": name or folder_id,
+                "mimeType": FOLDER_MIME_TYPE,
+                "parents": [parent] if parent else [],
+                "trashed": False,
+            }
+        return folder_id
+
+    def create(self, metadata: dict, content: bytes = None) -> dict:
+        file = {"mimeType": "application/octet-stream", "parents": [], "trashed": False}
+        file.update(metadata)
+        file["id"] = uuid4().hex
+        file["modifiedTime"] = now_rfc3339()
+        if content is not None:
+            file["content"] = content
+        with self.lock:
+            self.files[file["id"]] = file
+        return file
+
+    def update(self, file_id: str, metadata: dict = None, content: bytes = None) -> dict:
+        with self.lock:
+            file = self.files.get(file_id)
+            if file is None:
+                return None
+            file.update(metadata or {})
+            file["modifiedTime"] = now_rfc3339()
+            if content is not None:
+                file["content"] = content
+        return file
+
+    def query(self, q: str) -> list[dict]:
+        parent = PARENT_RE.search(q)
+        name = NAME_RE.search(q)
+        with self.lock:
+            files = list(self.files.values())
+
+        matches = []
+        for file in files:
+            if parent and parent.group(1) not in file["parents"]:
+                continue
+            if name and file["name"] != name.group(1):
+                continue
+            if "trashed=false" in q and file["trashed"]:
+                continue
+            mime_ok = True
+            for operator, mime_type in MIME_TYPE_RE.findall(q):
+                if (file["mimeType"] == mime_type) != (operator == "="):
+                    mime_ok = False
+            if mime_ok:
+                matches.append(file)
+        return sorted(matches, key=lambda file: file["name"])
+
+
+def now_rfc3339() -> str:
+    """Current time in Drive's modifiedTime format (2026-10-19T10:00:00.000Z)."""
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def describe(file: dict) -> dict:
+    """File resource as the API returns it, including size/md5Checksum for blobs."""
+    resource = {key: value for key, value in file.items() if key != "content"}
+    if "content" in file:
+        resource["size"] = str(len(file["content"]))
+        resource["md5Checksum"] = md5(file["content"]).hexdigest()
+    resource["capabilities"] = {"canTrash": True}
+    return resource
+
+
+def parse_multipart_related(content_type: str, body: bytes) -> tuple[dict, bytes]:
+    """Split a multipart/related upload body into (metadata, content)."""
+    boundary = BOUNDARY_RE.search(content_type).group(1).encode()
+    parts = body.split(b"--" + boundary)
+    metadata = loads(parts[1].split(b"\r\n\r\n", 1)[1])
+    content = parts[2].split(b"\r\n\r\n", 1)[1]
+    return metadata, content[:-2] if content.endswith(b"\r\n") else content
+
+
+class FakeDriveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY every
+    # response stalls on Nagle + delayed ACK and the benchmark measures that.
+    disable_nagle_algorithm = True
+    drive: FakeDrive = None
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+    def _send(self, status: int, payload=None, raw: bytes = None, content_type="application/json", headers=None):
+        data = raw if raw is not None else (dumps(payload).encode() if payload is not None else b"")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _inject_fault(self) -> bool:
+        if self.drive.latency:
+            sleep(self.drive.latency)
+        if self.drive.fail_rate and random() < self.drive.fail_rate:
+            self._send(503, {"error": {"code": 503, "message": "injected failure"}})
+            return True
+        return False
+
+    def _upload_location(self, session_id: str) -> dict:
+        return {
+            "Location": f"http://{self.headers['Host']}/upload/drive/v3/files"
+            f"?uploadType=resumable&upload_id={session_id}"
+        }
+
+    def metadata_call(self, method: str, target: str, body: bytes) -> tuple[int, dict]:
+        """Metadata operations, shared by direct requests and batch parts."""
+        parts = urlsplit(target)
+        if parts.path == "/drive/v3/files" and method == "POST":
+            return 200, describe(self.drive.create(loads(body or b"{}")))
+        if parts.path.startswith("/drive/v3/files/") and method == "PATCH":
+            file = self.drive.update(parts.path.rsplit("/", 1)[1], loads(body or b"{}"))
+            if file is None:
+                return 404, {"error": {"code": 404, "message": "File not found"}}
+            return 200, describe(file)
+        return 404, {"error": {"code": 404, "message": f"Unsupported {method} {parts.path}"}}
+
+    def do_GET(self):
+        if self._inject_fault():
+            return
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+
+        if parts.path.startswith("/api/"):
+            return self._send(200, {"id": parts.path.rsplit("/", 1)[1], "job_status": "PENDING"})
+        if parts.path == "/drive/v3/files":
+            files = self.drive.query(unquote(query.get("q", [""])[0]))
+            page_size = int(query.get("pageSize", [DEFAULT_PAGE_SIZE])[0])
+            start = int(query.get("pageToken", ["0"])[0])
+            result = {"files": [describe(file) for file in files[start:start + page_size]]}
+            if start + page_size < len(files):
+                result["nextPageToken"] = str(start + page_size)
+            return self._send(200, result)
+
+        file = self.drive.files.get(parts.path.rsplit("/", 1)[1])
+        if file is None or not parts.path.startswith("/drive/v3/files/"):
+            return self._send(404, {"error": {"code": 404, "message": "File not found"}})
+        if query.get("alt") != ["media"]:
+            return self._send(200, describe(file))
+
+        content = file.get("content", b"")
+        byte_range = self.headers.get("Range")
+        if byte_range:
+            start = int(byte_range.split("=", 1)[1].split("-", 1)[0])
+            if start >= len(content):
+                return self._send(416, {"error": {"code": 416, "message": "Range not satisfiable"}})
+            return self._send(
+                206,
+                raw=content[start:],
+                content_type="application/octet-stream",
+                headers={"Content-Range": f"bytes {start}-{len(content) - 1}/{len(content)}"},
+            )
+        return self._send(200, raw=content, content_type="application/octet-stream")
+
+    def do_POST(self):
+        body = self._body()
+        if self._inject_fault():
+            return
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+
+        if parts.path == "/token":
+            return self._send(200, {"access_token": uuid4().hex, "expires_in": 3600, "token_type": "Bearer"})
+        if parts.path.startswith("/api/"):
+            return self._send(200, {"id": uuid4().hex, "job_status": "PENDING"})
+        if parts.path == "/batch/drive/v3":
+            return self._batch(body)
+        if parts.path == "/upload/drive/v3/files":
+            if query.get("uploadType") == ["resumable"]:
+                return self._start_session(loads(body or b"{}"), None)
+            metadata, content = parse_multipart_related(self.headers["Content-Type"], body)
+            return self._send(200, describe(self.drive.create(metadata, content)))
+
+        status, payload = self.metadata_call("POST", self.path, body)
+        self._send(status, payload)
+
+    def do_PATCH(self):
+        body = self._body()
+        if self._inject_fault():
+            return
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+
+        if parts.path.startswith("/upload/drive/v3/files/"):
+            file_id = parts.path.rsplit("/", 1)[1]
+            if file_id not in self.drive.files:
+                return self._send(404, {"error": {"code": 404, "message": "File not found"}})
+            if query.get("uploadType") == ["resumable"]:
+                return self._start_session(loads(body or b"{}"), file_id)
+            metadata, content = parse_multipart_related(self.headers["Content-Type"], body)
+            return self._send(200, describe(self.drive.update(file_id, metadata, content)))
+
+        status, payload = self.metadata_call("PATCH", self.path, body)
+        self._send(status, payload)
+
+    def do_PUT(self):
+        body = self._body()
+        session = self.drive.sessions.get(parse_qs(urlsplit(self.path).query).get("upload_id", [""])[0])
+        if session is None:
+            return self._send(404, {"error": {"code": 404, "message": "Upload session not found"}})
+
+        content_range = self.headers.get("Content-Range", "")
+        if not content_range.startswith("bytes */"):
+            if self._inject_fault():
+                return
+            start = int(content_range.split(" ", 1)[1].split("-", 1)[0])
+            session["data"][start:] = body
+
+        received = len(session["data"])
+        if received >= session["size"]:
+            content = bytes(session["data"])
+            if session["file_id"]:
+                file = self.drive.update(session["file_id"], session["metadata"], content)
+            else:
+                file = self.drive.create(session["metadata"], content)
+            return self._send(200, describe(file))
+        headers = {"Range": f"bytes=0-{received - 1}"} if received else {}
+        self._send(308, headers=headers)
+
+    def _start_session(self, metadata: dict, file_id: str):
+        session_id = uuid4().hex
+        self.drive.sessions[session_id] = {
+            "metadata": metadata,
+            "file_id": file_id,
+            "size": int(self.headers.get("X-Upload-Content-Length", 0)),
+            "data": bytearray(),
+        }
+        self._send(200, {}, headers=self._upload_location(session_id))
+
+    def _batch(self, body: bytes):
+        boundary = BOUNDARY_RE.search(self.headers["Content-Type"]).group(1).encode()
+        response_boundary = f"batch_{uuid4().hex}"
+        out = []
+        for part in body.split(b"--" + boundary)[1:]:
+            if part.startswith(b"--"):
+                break
+            content_id = CONTENT_ID_RE.search(part.decode(errors="replace")).group(1)
+            http_request = part.split(b"\r\n\r\n", 1)[1]
+            request_line, _, rest = http_request.partition(b"\r\n")
+            request_body = rest.partition(b"\r\n\r\n")[2].strip()
+            method, target, _ = request_line.decode().split(" ", 2)
+            status, payload = self.metadata_call(method, target, request_body)
+            out.append(
+                f"--{response_boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+                f"Content-Type: application/json\r\n\r\n{dumps(payload)}\r\n"
+            )
+        out.append(f"--{response_boundary}--\r\n")
+        self._send(
+            200,
+            raw="".join(out).encode(),
+            content_type=f"multipart/mixed; boundary={response_boundary}",
+        )
+
+
+def make_server(drive: FakeDrive, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """HTTP server bound to drive; port 0 picks a free port."""
+    handler = type("BoundFakeDriveHandler", (FakeDriveHandler,), {"drive": drive})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_server(drive: FakeDrive, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Serve drive from a background thread, e.g. inside a benchmark."""
+    server = make_server(drive, host, port)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    basicConfig(level=INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--folder",
+        action="append",
+        default=[],
+        help="ID of a pre-created root folder to use as GDRIVE_FOLDER_ID/GDRIVE_PARENT_ID (repeatable)",
+    )
+    parser.add_argument(
+        "--fail-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 503"
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=0.0, help="Delay added to every request"
+    )
+    args = parser.parse_args()
+
+    drive = FakeDrive(fail_rate=args.fail_rate, latency=args.latency_ms / 1000)
+    for folder_id in args.folder or ["root"]:
+        drive.add_folder(folder_id)
+
+    server = make_server(drive, args.host, args.port)
+    logger.info(f"Fake Drive API listening on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
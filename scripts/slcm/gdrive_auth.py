@@ -0,0 +1,185 @@
+"""
+Shared service-account token provider for the SLCM Drive scripts.
+
+This script is not officially supported and comes with no guarantees.
+Use it at your own risk. Test thoroughly in your environment before use.
+
+Access tokens are cached in memory and on disk, keyed by client_email and
+scope, so a token minted by one script run is reused by the next one (and
+by concurrent runs) until shortly before it expires. A fresh RS256 JWT is
+only signed and exchanged when no usable token is cached. The cache file is
+locked while it is read and updated, so parallel runs that all find it
+stale mint one token between them instead of one each.
+
+Environment variables:
+  GDRIVE_TOKEN_CACHE: Path of the on-disk token cache
+                      (default: ~/.cache/slcm/gdrive-token-cache.json;
+                      set to an empty string to disable it)
+  GDRIVE_OAUTH2_TOKEN_URL: OAuth token endpoint
+                           (default: https://oauth2.googleapis.com/token)
+
+Requires: pip install pyjwt cryptography
+"""
+
+from fcntl import LOCK_EX, LOCK_UN, flock
+from hashlib import sha256
+from json import JSONDecodeError, dumps, loads
+from logging import getLogger
+from os import O_CREAT, O_RDWR, close, fdopen, getenv, open as os_open
+from pathlib import Path
+from threading import Lock
+from time import time
+from typing import Optional
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from jwt import encode
+
+logger = getLogger(__name__)
+
+DRIVE_AUTH_SCOPE = "https://www.googleapis.com/auth/drive"
+OAUTH2_TOKEN_URL = getenv("GDRIVE_OAUTH2_TOKEN_URL", "https://oauth2.googleapis.com/token")
+TOKEN_LIFETIME = 3600  # seconds; the maximum Google accepts for a JWT grant
+# Refresh this long before expiry so a request never goes out with a token
+# that lapses while it is in flight.
+TOKEN_REFRESH_MARGIN = 300
+DEFAULT_TOKEN_CACHE = Path.home() / ".cache" / "slcm" / "gdrive-token-cache.json"
+
+
+def token_cache_path() -> Optional[Path]:
+    """Token cache location from GDRIVE_TOKEN_CACHE, or None if disabled."""
+    configured = getenv("GDRIVE_TOKEN_CACHE")
+    if configured is None:
+        return DEFAULT_TOKEN_CACHE
+    return Path(configured) if configured else None
+
+
+def fetch_access_token(service_account_info: dict, scope: str = DRIVE_AUTH_SCOPE) -> dict:
+    """
+    Sign a JWT with the service account key and exchange it for a token.
+
+    Returns:
+        {"access_token": ..., "expires_at": <epoch seconds>}
+    """
+    now = int(time())
+
+    payload = {
+        "iss": service_account_info["client_email"],
+        "scope": scope,
+        "aud": OAUTH2_TOKEN_URL,
+        "iat": now,
+        "exp": now + TOKEN_LIFETIME,
+    }
+
+    # Sign JWT with private key
+    signed_jwt = encode(payload, service_account_info["private_key"], algorithm="RS256")
+
+    # Exchange JWT for access token
+    data = urlencode(
+        {
+            "grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer",
+            "assertion": signed_jwt,
+        }
+    ).encode()
+
+    request = Request(
+        OAUTH2_TOKEN_URL,
+        data=data,
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+    try:
+        with urlopen(request) as response:
+            result = loads(response.read().decode())
+    except HTTPError as e:
+        error_body = e.read().decode("utf-8")
+        raise Exception(f"Failed to get access token: {error_body}")
+
+    return {
+        "access_token": result["access_token"],
+        "expires_at": now + int(result.get("expires_in", TOKEN_LIFETIME)),
+    }
+
+
+class TokenProvider:
+    """
+    Hands out a valid access token for one service account and scope.
+
+    Call the instance to get the current token. It is thread-safe and
+    refreshes the token TOKEN_REFRESH_MARGIN seconds before it expires, so
+    transfers that outlive a single token keep working.
+    """
+
+    def __init__(
+        self,
+        service_account_info: dict,
+        scope: str = DRIVE_AUTH_SCOPE,
+        cache_path: Optional[Path] = DEFAULT_TOKEN_CACHE,
+    ):
+        self.service_account_info = service_account_info
+        self.scope = scope
+        self.cache_path = cache_path
+        self.cache_key = sha256(
+            f"{service_account_info['client_email']}\n{scope}".encode()
+        ).hexdigest()
+        self._token: Optional[dict] = None
+        self._lock = Lock()
+
+    def __call__(self) -> str:
+        with self._lock:
+            if not self._usable(self._token):
+                self._token = self._load_or_fetch()
+            return self._token["access_token"]
+
+    @staticmethod
+    def _usable(token: Optional[dict]) -> bool:
+        return bool(token) and token["expires_at"] - TOKEN_REFRESH_MARGIN > time()
+
+    def _fetch(self) -> dict:
+        logger.info("Requesting a new access token")
+        return fetch_access_token(self.service_account_info, self.scope)
+
+    def _load_or_fetch(self) -> dict:
+        if self.cache_path is None:
+            return self._fetch()
+
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os_open(self.cache_path, O_RDWR | O_CREAT, 0o600)
+        except OSError as e:
+            # e.g. a read-only $HOME under an arbitrary container UID
+            logger.warning(f"Token cache {self.cache_path} unavailable ({e}), not caching")
+            self.cache_path = None
+            return self._fetch()
+
+        try:
+            cache_file = fdopen(fd, "r+")
+        except Exception:
+            close(fd)
+            raise
+
+        with cache_file:
+            # Held across the token request, so concurrent runs queue up
+            # behind the first one and then pick up the token it stored.
+            flock(cache_file, LOCK_EX)
+            try:
+                try:
+                    cache = loads(cache_file.read() or "{}")
+                except JSONDecodeError:
+                    cache = {}
+
+                token = cache.get(self.cache_key)
+                if self._usable(token):
+                    return token
+
+                token = self._fetch()
+                cache = {key: entry for key, entry in cache.items() if self._usable(entry)}
+                cache[self.cache_key] = token
+                cache_file.seek(0)
+                cache_file.truncate()
+                cache_file.write(dumps(cache))
+                cache_file.flush()
+                return token
+            finally:
+                flock(cache_file, LOCK_UN)
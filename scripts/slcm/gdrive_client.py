@@ -0,0 +1,335 @@
+"""
+Shared Google Drive v3 HTTP client for the SLCM upload/download scripts.
+
+This script is not officially supported and comes with no guarantees.
+Use it at your own risk. Test thoroughly in your environment before use.
+
+Only the standard library is used: one keep-alive connection per worker
+thread and host, retries with exponential backoff for transient failures,
+the batch endpoint for small metadata calls, and paginated folder listing.
+
+Environment variables:
+  GDRIVE_API_ROOT: Base URL of the Drive API (default: https://www.googleapis.com),
+                   e.g. a local fake_gdrive_server.py for testing
+"""
+
+from contextlib import contextmanager
+from hashlib import md5
+from json import loads, dumps
+from os import getenv
+from time import sleep
+from logging import getLogger
+from random import uniform
+from re import IGNORECASE, compile as compile_regex
+from sys import exit
+from threading import local
+from uuid import uuid4
+from http.client import (
+    HTTPConnection,
+    HTTPException,
+    HTTPMessage,
+    HTTPResponse,
+    HTTPSConnection,
+    RemoteDisconnected,
+)
+from pathlib import Path
+from typing import Callable, Iterator
+from urllib.parse import quote, urlsplit
+
+logger = getLogger(__name__)
+
+GDRIVE_API_ROOT = getenv("GDRIVE_API_ROOT", "https://www.googleapis.com").rstrip("/")
+GDRIVE_API_URL = f"{GDRIVE_API_ROOT}/drive/v3/files"
+DRIVE_UPLOAD_API_URL = f"{GDRIVE_API_ROOT}/upload/drive/v3"
+BATCH_API_URL = f"{GDRIVE_API_ROOT}/batch/drive/v3"
+BATCH_MAX_CALLS = 100  # Drive's per-batch request limit
+BATCH_CONTENT_ID_RE = compile_regex(rb"Content-ID:\s*<?response-item(\d+)>?", IGNORECASE)
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+LIST_PAGE_SIZE = 1000
+RETRY_BASE_DELAY = 2  # seconds, doubled on every attempt
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class DriveAPIError(Exception):
+    """Non-2xx response from the Drive API."""
+
+    def __init__(self, code: int, body: str):
+        super().__init__(f"HTTP {code}: {body}")
+        self.code = code
+        self.body = body
+
+
+class RequestNotSentError(ConnectionError):
+    """The request failed before the server could act on it, so repeating it is safe."""
+
+
+class DriveClient:
+    """
+    Minimal Drive v3 HTTP client shared by all transfer workers.
+
+    Each thread keeps its own keep-alive connection per host, so concurrent
+    transfers reuse TLS sessions instead of paying a handshake per request
+    the way a fresh urlopen() call does.
+
+    token is called for every request, so a provider that refreshes itself
+    (see gdrive_auth.TokenProvider) keeps long transfers authorized.
+    """
+
+    def __init__(self, token: Callable[[], str], timeout: int = 300):
+        self.token = token
+        self.timeout = timeout
+        self._local = local()
+
+    def _connection(self, scheme: str, netloc: str) -> HTTPConnection:
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+
+        key = (scheme, netloc)
+        if key not in connections:
+            connection_class = HTTPSConnection if scheme == "https" else HTTPConnection
+            connections[key] = connection_class(netloc, timeout=self.timeout)
+        return connections[key]
+
+    def _drop_connection(self, scheme: str, netloc: str) -> None:
+        connection = self._local.connections.pop((scheme, netloc), None)
+        if connection is not None:
+            connection.close()
+
+    def _open(
+        self, method: str, url: str, body: bytes = None, headers: dict = None
+    ) -> tuple[HTTPResponse, tuple[str, str]]:
+        """Send a request and return the unread response plus its pool key."""
+        parts = urlsplit(url)
+        target = f"{parts.path}?{parts.query}" if parts.query else parts.path
+        request_headers = {"Authorization": f"Bearer {self.token()}"}
+        request_headers.update(headers or {})
+
+        # A pooled connection may have been closed by the server while idle;
+        # that only shows up on the next request, so retry once on a new one.
+        # A POST (a create, or a batch holding one) that was sent is repeated
+        # only if a reused connection was closed without any response: the
+        # server may have acted on it otherwise, and a repeat would create
+        # the file or folder twice.
+        for attempt in (1, 2):
+            connection = self._connection(parts.scheme, parts.netloc)
+            reused = connection.sock is not None
+            try:
+                connection.request(method, target, body=body, headers=request_headers)
+            except (HTTPException, OSError) as e:
+                self._drop_connection(parts.scheme, parts.netloc)
+                if attempt == 2:
+                    raise RequestNotSentError(f"{method} {url}: {e}") from e
+                continue
+            try:
+                return connection.getresponse(), (parts.scheme, parts.netloc)
+            except (HTTPException, ConnectionError) as e:
+                self._drop_connection(parts.scheme, parts.netloc)
+                stale = reused and isinstance(e, RemoteDisconnected)
+                if attempt == 2 or not (method != "POST" or stale):
+                    raise
+
+    def send(
+        self, method: str, url: str, body: bytes = None, headers: dict = None
+    ) -> tuple[int, HTTPMessage, bytes]:
+        """
+        Send a request on this thread's pooled connection.
+
+        Returns:
+            (status, response headers, response body) for any non-error
+            status, including 308 from resumable uploads.
+        """
+        response, pool_key = self._open(method, url, body=body, headers=headers)
+        try:
+            data = response.read()
+        except (HTTPException, OSError):
+            self._drop_connection(*pool_key)
+            raise
+
+        if response.status >= 400:
+            raise DriveAPIError(response.status, data.decode("utf-8", errors="replace"))
+        return response.status, response.headers, data
+
+    @contextmanager
+    def stream(self, url: str, headers: dict = None) -> Iterator[HTTPResponse]:
+        """
+        GET url and yield the response unread, for chunked reading.
+
+        The connection goes back to the pool only if the body was read to
+        the end; a partially read response leaves it unusable, so it is
+        dropped instead.
+        """
+        response, pool_key = self._open("GET", url, headers=headers)
+        try:
+            if response.status >= 400:
+                data = response.read()
+                raise DriveAPIError(response.status, data.decode("utf-8", errors="replace"))
+            yield response
+        finally:
+            if not response.isclosed():
+                self._drop_connection(*pool_key)
+
+    def request(
+        self, method: str, url: str, body: bytes = None, headers: dict = None
+    ) -> bytes:
+        """Send a request on this thread's pooled connection, return the body."""
+        return self.send(method, url, body=body, headers=headers)[2]
+
+    def request_json(self, method: str, url: str, payload: dict = None) -> dict:
+        body = dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        data = self.request(method, url, body=body, headers=headers)
+        return loads(data.decode()) if data else {}
+
+    def batch(self, calls: list[tuple[str, str, dict]]) -> list[tuple[int, dict]]:
+        """
+        Run several small metadata calls through the Drive batch endpoint.
+
+        Args:
+            calls: (method, Drive API URL, JSON payload or None) tuples.
+
+        Returns:
+            (status, parsed JSON body) per call, in the order given. Failed
+            calls are returned, not raised - callers decide what is fatal.
+        """
+        results = []
+        for start in range(0, len(calls), BATCH_MAX_CALLS):
+            chunk = calls[start:start + BATCH_MAX_CALLS]
+            boundary = f"batch_{uuid4().hex}"
+            parts = []
+            for index, (method, url, payload) in enumerate(chunk):
+                url_parts = urlsplit(url)
+                target = f"{url_parts.path}?{url_parts.query}" if url_parts.query else url_parts.path
+                body = dumps(payload) if payload is not None else ""
+                parts.append(
+                    f"--{boundary}\r\n"
+                    "Content-Type: application/http\r\n"
+                    f"Content-ID: <item{index}>\r\n\r\n"
+                    f"{method} {target} HTTP/1.1\r\n"
+                    "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                    f"{body}\r\n"
+                )
+            parts.append(f"--{boundary}--\r\n")
+
+            _, headers, data = self.send(
+                "POST",
+                BATCH_API_URL,
+                body="".join(parts).encode("utf-8"),
+                headers={"Content-Type": f"multipart/mixed; boundary={boundary}"},
+            )
+            results.extend(parse_batch_response(headers.get("Content-Type", ""), data, len(chunk)))
+        return results
+
+
+def parse_batch_response(content_type: str, data: bytes, expected: int) -> list[tuple[int, dict]]:
+    """Split a multipart/mixed batch response into (status, JSON body) per call."""
+    boundary = content_type.split("boundary=", 1)[-1].strip('"')
+    results = [(0, {"error": "missing from batch response"})] * expected
+
+    for part in data.split(f"--{boundary}".encode())[1:]:
+        if part.startswith(b"--"):
+            break
+        content_id = BATCH_CONTENT_ID_RE.search(part)
+        outer_headers, _, http_response = part.strip().partition(b"\r\n\r\n")
+        status_line, _, rest = http_response.partition(b"\r\n")
+        _, _, body = rest.partition(b"\r\n\r\n")
+        if content_id is None or not status_line.startswith(b"HTTP/"):
+            continue
+        index = int(content_id.group(1))
+        if index < expected:
+            body = body.strip()
+            results[index] = (int(status_line.split()[1]), loads(body) if body else {})
+    return results
+
+
+def with_retries(operation, attempts: int, description: str, idempotent: bool = True):
+    """
+    Call operation(), retrying transient failures with exponential backoff.
+
+    Retries network errors and throttling/5xx responses; any other API error
+    (bad request, permission denied, ...) fails immediately. For a create
+    (idempotent=False), a network error is retried only if the request was
+    never sent: a timeout or reset after sending may come after Drive
+    created the file, and a repeat would leave two copies.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return operation()
+        except (DriveAPIError, OSError, HTTPException) as e:
+            if isinstance(e, DriveAPIError):
+                retryable = e.code in RETRYABLE_STATUS_CODES
+            else:
+                retryable = idempotent or isinstance(e, RequestNotSentError)
+            if not retryable or attempt == attempts:
+                raise
+            delay = RETRY_BASE_DELAY * 2 ** (attempt - 1) + uniform(0, 1)
+            logger.warning(
+                f"{description}: attempt {attempt} failed ({e}), retrying in {delay:.1f}s"
+            )
+            sleep(delay)
+
+
+def list_folder(
+    folder_id: str, client: DriveClient, query_filter: str = "", fields: str = "id,name,mimeType"
+) -> list[dict]:
+    """
+    List a folder's (non-trashed) children, following nextPageToken.
+
+    Args:
+        folder_id: Drive folder ID.
+        client: Shared DriveClient.
+        query_filter: Extra Drive query clause ANDed to the parent filter,
+            e.g. "mimeType!='application/vnd.google-apps.folder'".
+        fields: Per-file fields to request.
+    """
+    query = f"'{folder_id}' in parents and trashed=false"
+    if query_filter:
+        query += f" and {query_filter}"
+    files = []
+    page_token = None
+
+    while True:
+        url = (
+            f"{GDRIVE_API_URL}?q={quote(query)}&pageSize={LIST_PAGE_SIZE}"
+            f"&fields=nextPageToken,files({fields})"
+            "&supportsAllDrives=true&includeItemsFromAllDrives=true"
+        )
+        if page_token:
+            url += f"&pageToken={quote(page_token)}"
+        result = client.request_json("GET", url)
+        files.extend(result.get("files", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return files
+
+
+def md5_file(file_path: Path) -> str:
+    """Hex md5 of a file, read in HASH_CHUNK_SIZE chunks (Drive's md5Checksum format)."""
+    digest = md5()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def validate_environment(env_var_value: str, env_var_name: str) -> str:
+    if not env_var_value:
+        logger.error(f"Error: {env_var_name} environment variable not set")
+        exit(1)
+    return env_var_value
+
+
+def positive_int_from_env(env_var_name: str, default: int) -> int:
+    value = getenv(env_var_name)
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        logger.error(f"Error: {env_var_name} must be an integer, got '{value}'")
+        exit(1)
+    if number < 1:
+        logger.error(f"Error: {env_var_name} must be at least 1, got {number}")
+        exit(1)
+    return number
@@ -9,6 +9,26 @@ Environment variables:
   XML_DIR: Directory containing XML files to upload
   GDRIVE_FOLDER_ID: Google Drive folder ID (from folder URL)
   GOOGLE_SERVICE_ACCOUNT_KEY: Service account JSON key as string
+  UPLOAD_CONCURRENCY: Number of parallel uploads (default: 8)
+  UPLOAD_RETRIES: Attempts per file before giving up (default: 3)
+  RESUMABLE_THRESHOLD_MB: Files larger than this use chunked resumable
+                          uploads instead of one multipart request (default: 5)
+  GDRIVE_SYNC: If "true", keep the existing JOB_NAME folder and only upload
+               files that are new or whose size/md5 changed (default: false,
+               trash and recreate the folder)
+  GDRIVE_SYNC_DELETE: With GDRIVE_SYNC, also trash remote files that no
+                      longer exist locally (default: false)
+  GDRIVE_TOKEN_CACHE: Access token cache file shared between runs
+                      (default: ~/.cache/slcm/gdrive-token-cache.json,
+                      empty to disable; see gdrive_auth.py)
+  TRIGGER_TIMEOUT: Seconds to keep retrying the job trigger and polling its
+                   status (default: 600)
+  TRIGGER_STATUS_URL: Optional execution status URL, with "{id}" replaced by
+                      the execution ID from the trigger response; polled
+                      until the job leaves the queue
+  TRIGGER_DURING_UPLOAD: If "true", trigger the job while files are still
+                         uploading (default: false, trigger only after every
+                         upload succeeded)
 
 Setup:
   1. Share a Drive folder with the service account email
@@ -30,19 +50,47 @@ Usage example:
 from os import getenv
 from sys import exit, stderr
 from json import loads, dumps, JSONDecodeError
-from time import time, sleep
+from time import sleep, monotonic
 from logging import getLogger, basicConfig, INFO
 from pathlib import Path
+from random import uniform
+from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.client import HTTPException, HTTPMessage
 from urllib.request import Request, urlopen
-from urllib.parse import urlencode
+from urllib.parse import quote
 from urllib.error import HTTPError
-from jwt import encode
+
+from gdrive_auth import TokenProvider, token_cache_path
+from gdrive_client import (
+    DRIVE_UPLOAD_API_URL,
+    FOLDER_MIME_TYPE,
+    GDRIVE_API_URL,
+    RETRY_BASE_DELAY,
+    RETRYABLE_STATUS_CODES,
+    DriveAPIError,
+    DriveClient,
+    list_folder,
+    md5_file,
+    positive_int_from_env,
+    validate_environment,
+    with_retries,
+)
 
 logger = getLogger(__name__)
-DRIVE_AUTH_API_URL = "https://www.googleapis.com/auth/drive"
-DRIVE_API_URL = "https://www.googleapis.com/upload/drive/v3"
-GDRIVE_API_URL = "https://www.googleapis.com/drive/v3/files"
-OAUTH2_API_URL = "https://oauth2.googleapis.com/token"
+DEFAULT_RESUMABLE_THRESHOLD_MB = 5
+# Resumable chunks must be a multiple of 256 KiB; this is also the most
+# file data held in memory per upload.
+RESUMABLE_CHUNK_SIZE = 32 * 256 * 1024
+UPLOAD_CONTENT_TYPE = "application/xml"
+DEFAULT_UPLOAD_CONCURRENCY = 8
+DEFAULT_UPLOAD_RETRIES = 3
+DEFAULT_TRIGGER_TIMEOUT = 600  # seconds, covering trigger retries and status polling
+TRIGGER_RETRY_MAX_DELAY = 60
+TRIGGER_POLL_INTERVAL = 10
+# Gangway job_status values before and after a job is picked up
+TRIGGER_QUEUED_STATUSES = {"", "JOB_EXECUTION_STATUS_UNSPECIFIED", "TRIGGERED"}
+TRIGGER_FAILED_STATUSES = {"FAILURE", "ABORTED", "ERROR"}
 
 
 def set_headers(access_token: str) -> dict:
@@ -52,166 +100,353 @@ def set_headers(access_token: str) -> dict:
     }
 
 
-def create_folder(parent_id: str, folder_name: str, access_token: str) -> str:
-    """Create a folder in Google Drive."""
+def find_or_create_folder(parent_id: str, folder_name: str, client: DriveClient) -> str:
+    """
+    Create a fresh folder, trashing any existing folder with the same name.
+
+    The trash and create calls are independent, so they go out as one batch
+    request instead of one round trip each.
+    """
+    query = f"name='{folder_name}' and '{parent_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
+    encoded_query = quote(query)
+
+    result = client.request_json(
+        "GET",
+        f"{GDRIVE_API_URL}?q={encoded_query}&fields=files(id,name,capabilities)&supportsAllDrives=true&includeItemsFromAllDrives=true",
+    )
+    existing = result.get("files", [])
+    for folder in existing:
+        logger.info(
+            f"Found existing folder '{folder_name}': ID={folder['id']}, capabilities={folder.get('capabilities')}"
+        )
+
     metadata = {
         "name": folder_name,
         "mimeType": "application/vnd.google-apps.folder",
         "parents": [parent_id],
     }
+    calls = [
+        ("PATCH", f"{GDRIVE_API_URL}/{folder['id']}?supportsAllDrives=true", {"trashed": True})
+        for folder in existing
+    ]
+    calls.append(("POST", f"{GDRIVE_API_URL}?supportsAllDrives=true", metadata))
 
-    headers = set_headers(access_token)
-
-    request = Request(
-        f"{GDRIVE_API_URL}?supportsAllDrives=true",
-        data=dumps(metadata).encode("utf-8"),
-        headers=headers,
-        method="POST",
-    )
+    *trash_results, (create_status, created) = client.batch(calls)
 
-    try:
-        with urlopen(request) as response:
-            result = loads(response.read().decode())
-            return result.get("id")
-    except HTTPError as e:
-        error_body = e.read().decode("utf-8")
-        raise Exception(f"HTTP {e.code}: {error_body}")
+    for folder, (status, body) in zip(existing, trash_results):
+        if status < 400:
+            logger.info(f"Successfully deleted folder: {folder_name} ({folder['id']})")
+        else:
+            logger.error(
+                f"Failed to delete folder {folder_name} ({folder['id']}): HTTP {status} {body}, "
+                "but continuing to create new one"
+            )
 
+    if create_status >= 400:
+        raise DriveAPIError(create_status, dumps(created))
+    return created.get("id")
 
-def find_or_create_folder(parent_id: str, folder_name: str, access_token: str) -> str:
-    """Find existing folder or create new one."""
-    from urllib.parse import quote
 
-    query = f"name='{folder_name}' and '{parent_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
-    encoded_query = quote(query)
+def find_or_create_sync_folder(parent_id: str, folder_name: str, client: DriveClient) -> str:
+    """Reuse the existing folder for sync mode, creating it only if missing."""
+    query = f"name='{folder_name}' and '{parent_id}' in parents and mimeType='{FOLDER_MIME_TYPE}' and trashed=false"
 
-    headers = set_headers(access_token)
-    # headers = {
-    #     'Authorization': f'Bearer {access_token}'
-    # }
+    result = client.request_json(
+        "GET",
+        f"{GDRIVE_API_URL}?q={quote(query)}&fields=files(id,name)&supportsAllDrives=true&includeItemsFromAllDrives=true",
+    )
+    files = result.get("files", [])
+    if files:
+        logger.info(f"Syncing into existing folder '{folder_name}': ID={files[0]['id']}")
+        return files[0]["id"]
 
-    request = Request(
-        f"{GDRIVE_API_URL}?q={encoded_query}&fields=files(id,name,capabilities)&supportsAllDrives=true&includeItemsFromAllDrives=true",
-        headers=headers,
+    created = client.request_json(
+        "POST",
+        f"{GDRIVE_API_URL}?supportsAllDrives=true",
+        {"name": folder_name, "mimeType": FOLDER_MIME_TYPE, "parents": [parent_id]},
     )
+    logger.info(f"Created folder '{folder_name}': ID={created.get('id')}")
+    return created.get("id")
 
-    try:
-        with urlopen(request) as response:
-            result = loads(response.read().decode())
-            files = result.get("files", [])
-            if files:
-                folder = files[0]
-                logger.info(
-                    f"Found existing folder '{folder_name}': ID={folder['id']}, capabilities={folder.get('capabilities')}"
-                )
 
-                # Try to delete
-                if trash_gdrive_folder(folder["id"], access_token):
-                    logger.info(f"Successfully deleted folder: {folder_name}")
-                else:
-                    logger.error(
-                        f"Failed to delete folder {folder_name}, but continuing to create new one"
-                    )
+def plan_sync(
+    local_files: list[Path], remote_files: list[dict]
+) -> tuple[dict[Path, str], list[Path], list[dict]]:
+    """
+    Compare local files against the remote folder listing.
+
+    Files are matched by name, since uploads are flat. A remote file is
+    unchanged when its size matches and, only then, its md5Checksum - so
+    most changed files are detected without hashing them locally.
 
-            return create_folder(parent_id, folder_name, access_token)
-    except HTTPError as e:
-        error_body = e.read().decode("utf-8")
-        raise Exception(f"HTTP {e.code}: {error_body}")
+    Returns:
+        (uploads mapping each new/changed local file to the remote file ID
+        to update, or None for a new file; unchanged local files; remote
+        files with no local counterpart)
+    """
+    remote_by_name = {}
+    stale = []
+    for remote in remote_files:
+        if remote["name"] in remote_by_name:
+            # Duplicates left behind by earlier runs
+            stale.append(remote)
+        else:
+            remote_by_name[remote["name"]] = remote
+
+    local_by_name = {}
+    for file_path in sorted(local_files):
+        if file_path.name in local_by_name:
+            logger.warning(
+                f"Skipping {file_path}: {local_by_name[file_path.name]} has the same name "
+                "and uploads are flat"
+            )
+            continue
+        local_by_name[file_path.name] = file_path
+
+    uploads = {}
+    unchanged = []
+    for name, file_path in local_by_name.items():
+        remote = remote_by_name.pop(name, None)
+        if remote is None:
+            uploads[file_path] = None
+        elif (
+            int(remote.get("size", -1)) == file_path.stat().st_size
+            and remote.get("md5Checksum") == md5_file(file_path)
+        ):
+            unchanged.append(file_path)
+        else:
+            uploads[file_path] = remote["id"]
+
+    return uploads, unchanged, stale + list(remote_by_name.values())
+
+
+def trash_remote_files(files: list[dict], client: DriveClient) -> int:
+    """Trash files in one batch request per 100; returns the failure count."""
+    calls = [
+        ("PATCH", f"{GDRIVE_API_URL}/{remote['id']}?supportsAllDrives=true", {"trashed": True})
+        for remote in files
+    ]
+    failed = 0
+    for remote, (status, body) in zip(files, client.batch(calls)):
+        if status < 400:
+            logger.info(f"Trashed remote file: {remote['name']} (ID: {remote['id']})")
+        else:
+            logger.error(f"Failed to trash {remote['name']} (ID: {remote['id']}): HTTP {status} {body}")
+            failed += 1
+    return failed
+
+
+def _upload_request(
+    folder_id: str, file_path: Path, file_id: str, upload_type: str
+) -> tuple[str, str, dict]:
+    """Method, URL and metadata to create a file, or update file_id's content."""
+    if file_id:
+        return (
+            "PATCH",
+            f"{DRIVE_UPLOAD_API_URL}/files/{file_id}?uploadType={upload_type}&supportsAllDrives=true",
+            {},
+        )
+    return (
+        "POST",
+        f"{DRIVE_UPLOAD_API_URL}/files?uploadType={upload_type}&supportsAllDrives=true",
+        {"name": file_path.name, "parents": [folder_id]},
+    )
 
 
-def get_access_token(service_account_info: dict) -> str:
-    """Generate access token from service account key using JWT."""
-    now = int(time())
+def upload_file_multipart(
+    folder_id: str, file_path: Path, client: DriveClient, file_id: str = None
+) -> str:
+    """Upload a small file in a single multipart request."""
+    # Step 1: Create file metadata
+    method, url, metadata = _upload_request(folder_id, file_path, file_id, "multipart")
+
+    # Step 2: Upload file using multipart upload. The file is sent as raw
+    # bytes - decoding it as text would corrupt anything not UTF-8.
+    boundary = f"-------{uuid4().hex}"
+    prefix = (
+        f"--{boundary}\r\n"
+        "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+        f"{dumps(metadata)}\r\n"
+        f"--{boundary}\r\n"
+        f"Content-Type: {UPLOAD_CONTENT_TYPE}\r\n\r\n"
+    ).encode("utf-8")
+    suffix = f"\r\n--{boundary}--".encode("utf-8")
+
+    body = prefix + file_path.read_bytes() + suffix
 
-    payload = {
-        "iss": service_account_info["client_email"],
-        "scope": DRIVE_AUTH_API_URL,
-        "aud": OAUTH2_API_URL,
-        "iat": now,
-        "exp": now + 3600,
+    headers = {
+        "Content-Type": f"multipart/related; boundary={boundary}",
+        "Content-Length": str(len(body)),
     }
 
-    # Sign JWT with private key
-    signed_jwt = encode(payload, service_account_info["private_key"], algorithm="RS256")
+    result = loads(client.request(method, url, body=body, headers=headers).decode())
+    return result.get("id")
 
-    # Exchange JWT for access token
-    data = urlencode(
-        {
-            "grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer",
-            "assertion": signed_jwt,
-        }
-    ).encode()
 
-    request = Request(
-        OAUTH2_API_URL,
-        data=data,
-        headers={"Content-Type": "application/x-www-form-urlencoded"},
-    )
+def _persisted_offset(headers: HTTPMessage) -> int:
+    """Next byte to send, from a 308 response's 'Range: bytes=0-N' header."""
+    persisted = headers.get("Range")
+    if not persisted:
+        return 0
+    return int(persisted.rsplit("-", 1)[1]) + 1
 
-    try:
-        with urlopen(request) as response:
-            result = loads(response.read().decode())
-            return result["access_token"]
-    except HTTPError as e:
-        error_body = e.read().decode("utf-8")
-        raise Exception(f"Failed to get access token: {error_body}")
 
+def upload_file_resumable(
+    folder_id: str, file_path: Path, client: DriveClient, retries: int, file_id: str = None
+) -> str:
+    """
+    Upload a large file in RESUMABLE_CHUNK_SIZE chunks.
 
-def upload_file_to_drive(folder_id: str, file_path: Path, access_token: str) -> str:
-    """Upload a file to Google Drive folder."""
-    file_name = file_path.name
+    Only one chunk is held in memory at a time. A failed chunk does not
+    restart the upload: after backing off, the session is asked how much it
+    already persisted and the upload continues from there.
+    """
+    size = file_path.stat().st_size
+    method, url, metadata = _upload_request(folder_id, file_path, file_id, "resumable")
+
+    def start_session() -> str:
+        _, headers, _ = client.send(
+            method,
+            url,
+            body=dumps(metadata).encode("utf-8"),
+            headers={
+                "Content-Type": "application/json; charset=UTF-8",
+                "X-Upload-Content-Type": UPLOAD_CONTENT_TYPE,
+                "X-Upload-Content-Length": str(size),
+            },
+        )
+        return headers["Location"]
 
-    # Step 1: Create file metadata
-    metadata = {"name": file_name, "parents": [folder_id]}
+    session_url = with_retries(start_session, retries, f"Start upload {file_path.name}")
 
-    # Step 2: Upload file using multipart upload
-    boundary = "-------314159265358979323846"
+    def query_offset() -> tuple[int, HTTPMessage, bytes]:
+        return client.send(
+            "PUT", session_url, body=b"", headers={"Content-Range": f"bytes */{size}"}
+        )
 
+    offset = 0
+    failures = 0
     with open(file_path, "rb") as f:
-        file_content = f.read()
-
-    # Build multipart body
-    body_parts = [
-        f"--{boundary}",
-        "Content-Type: application/json; charset=UTF-8",
-        "",
-        dumps(metadata),
-        f"--{boundary}",
-        "Content-Type: application/xml",
-        "",
-        file_content.decode("utf-8", errors="replace"),
-        f"--{boundary}--",
-    ]
-
-    body = "\r\n".join(str(part) for part in body_parts).encode("utf-8")
+        while True:
+            f.seek(offset)
+            chunk = f.read(RESUMABLE_CHUNK_SIZE)
+            content_range = f"bytes {offset}-{offset + len(chunk) - 1}/{size}"
+
+            resumed = False
+            try:
+                status, headers, data = client.send(
+                    "PUT", session_url, body=chunk, headers={"Content-Range": content_range}
+                )
+            except (DriveAPIError, OSError, HTTPException) as e:
+                resumed = True
+                failures += 1
+                retryable = not isinstance(e, DriveAPIError) or e.code in RETRYABLE_STATUS_CODES
+                if not retryable or failures >= retries:
+                    raise
+                delay = RETRY_BASE_DELAY * 2 ** (failures - 1) + uniform(0, 1)
+                logger.warning(
+                    f"Upload {file_path.name}: chunk {content_range} failed ({e}), "
+                    f"resuming in {delay:.1f}s"
+                )
+                sleep(delay)
+                status, headers, data = with_retries(
+                    query_offset, retries, f"Resume upload {file_path.name}"
+                )
 
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": f"multipart/related; boundary={boundary}",
-        "Content-Length": str(len(body)),
-    }
+            if status in (200, 201):
+                return loads(data.decode()).get("id")
+            new_offset = _persisted_offset(headers)
+            if new_offset > offset:
+                failures = 0
+            elif not resumed:
+                # The chunk was accepted with a 308 but nothing new was
+                # persisted; that counts as a failed attempt too, or the
+                # same chunk would be sent forever.
+                failures += 1
+                if failures >= retries:
+                    raise Exception(
+                        f"Upload {file_path.name} made no progress past byte {offset} of {size} "
+                        f"after {failures} attempts"
+                    )
+                delay = RETRY_BASE_DELAY * 2 ** (failures - 1) + uniform(0, 1)
+                logger.warning(
+                    f"Upload {file_path.name}: chunk {content_range} not persisted, retrying in {delay:.1f}s"
+                )
+                sleep(delay)
+            offset = new_offset
+
+
+def upload_file_to_drive(
+    folder_id: str,
+    file_path: Path,
+    client: DriveClient,
+    retries: int,
+    resumable_threshold: int,
+    file_id: str = None,
+) -> str:
+    """
+    Upload a file to Google Drive folder, resumably if it is large.
 
-    request = Request(
-        f"{DRIVE_API_URL}/files?uploadType=multipart&supportsAllDrives=true",
-        data=body,
-        headers=headers,
-        method="POST",
+    With file_id, the content of that existing file is replaced instead.
+    """
+    if file_path.stat().st_size > resumable_threshold:
+        return upload_file_resumable(folder_id, file_path, client, retries, file_id)
+
+    # Replacing file_id's content can be repeated; creating a new file can't.
+    return with_retries(
+        lambda: upload_file_multipart(folder_id, file_path, client, file_id),
+        retries,
+        f"Upload {file_path.name}",
+        idempotent=file_id is not None,
     )
 
-    try:
-        with urlopen(request) as response:
-            result = loads(response.read().decode())
-            return result.get("id")
-    except HTTPError as e:
-        error_body = e.read().decode("utf-8")
-        raise Exception(f"HTTP {e.code}: {error_body}")
 
+def upload_files_concurrently(
+    folder_id: str,
+    files: dict[Path, str],
+    client: DriveClient,
+    concurrency: int,
+    retries: int,
+    resumable_threshold: int,
+) -> tuple[int, int, int]:
+    """
+    Upload files through a bounded thread pool.
+
+    files maps each local file to the remote file ID whose content it
+    replaces, or to None to create a new file.
 
-def validate_environment(env_var_value: str, env_var_name: str) -> str:
-    if not env_var_value:
-        logger.error(f"Error: {env_var_name} environment variable not set")
-        exit(1)
-    return env_var_value
+    Returns:
+        (uploaded count, failed count, uploaded bytes)
+    """
+    uploaded = 0
+    failed = 0
+    uploaded_bytes = 0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {
+            pool.submit(
+                upload_file_to_drive,
+                folder_id,
+                file_path,
+                client,
+                retries,
+                resumable_threshold,
+                file_id,
+            ): file_path
+            for file_path, file_id in files.items()
+        }
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                file_id = future.result()
+                logger.info(f"Uploaded: {file_path.name} (ID: {file_id})")
+                uploaded += 1
+                uploaded_bytes += file_path.stat().st_size
+            except Exception as e:
+                logger.error(f"Failed to upload {file_path.name}: {e}")
+                failed += 1
+
+    return uploaded, failed, uploaded_bytes
 
 
 def upload_xml_files():
@@ -224,32 +459,38 @@ def upload_xml_files():
         getenv("GOOGLE_SERVICE_ACCOUNT_KEY"), "GOOGLE_SERVICE_ACCOUNT_KEY"
     )
     job_name = validate_environment(getenv("JOB_NAME"), "JOB_NAME")
+    concurrency = positive_int_from_env("UPLOAD_CONCURRENCY", DEFAULT_UPLOAD_CONCURRENCY)
+    retries = positive_int_from_env("UPLOAD_RETRIES", DEFAULT_UPLOAD_RETRIES)
+    resumable_threshold = 1024 * 1024 * positive_int_from_env(
+        "RESUMABLE_THRESHOLD_MB", DEFAULT_RESUMABLE_THRESHOLD_MB
+    )
+    sync = getenv("GDRIVE_SYNC", "false").lower() == "true"
+    sync_delete = getenv("GDRIVE_SYNC_DELETE", "false").lower() == "true"
 
     # Parse service account key
     try:
         service_account_info = loads(service_account_key)
     except JSONDecodeError as e:
-        logger.error(
-            f"Error: Invalid JSON in GOOGLE_SERVICE_ACCOUNT_KEY: {e}", file=stderr
-        )
+        logger.error(f"Error: Invalid JSON in GOOGLE_SERVICE_ACCOUNT_KEY: {e}")
         exit(1)
 
     xml_dir_path = Path(xml_dir)
 
     if not xml_dir_path.exists():
-        logger.error(f"Error: Directory {xml_dir} does not exist", file=stderr)
+        logger.error(f"Error: Directory {xml_dir} does not exist")
         exit(1)
 
     if not xml_dir_path.is_dir():
-        logger.error(f"Error: {xml_dir} is not a directory", file=stderr)
+        logger.error(f"Error: {xml_dir} is not a directory")
         exit(1)
 
-    # Get access token
+    # Get access token (reused from the on-disk cache when still valid)
     logger.info("Generating access token...")
+    token = TokenProvider(service_account_info, cache_path=token_cache_path())
     try:
-        access_token = get_access_token(service_account_info)
+        token()
     except Exception as e:
-        logger.error(f"Error generating access token: {e}", file=stderr)
+        logger.error(f"Error generating access token: {e}")
         exit(1)
 
     # Find all XML files recursively
@@ -261,72 +502,124 @@ def upload_xml_files():
 
     logger.info(f"Found {len(xml_files)} XML file(s) in {xml_dir}")
 
-    # Upload each file
-    uploaded = 0
-    failed = 0
-
-    folder_id = find_or_create_folder(folder_id, job_name, access_token)
-    for xml_file in xml_files:
-        try:
-            file_id = upload_file_to_drive(folder_id, xml_file, access_token)
-            logger.info(f"Uploaded: {xml_file.name} (ID: {file_id})")
-            uploaded += 1
-        except Exception as e:
-            logger.error(f"Failed to upload {xml_file.name}: {e}", file=stderr)
-            failed += 1
-
-    logger.info(f"Summary: {uploaded} uploaded, {failed} failed")
+    client = DriveClient(token)
+    trash_failed = 0
+    if sync:
+        folder_id = find_or_create_sync_folder(folder_id, job_name, client)
+        remote_files = list_folder(
+            folder_id,
+            client,
+            f"mimeType!='{FOLDER_MIME_TYPE}'",
+            "id,name,size,md5Checksum",
+        )
+        uploads, unchanged, removed = plan_sync(xml_files, remote_files)
+        logger.info(
+            f"Sync plan: {sum(1 for file_id in uploads.values() if file_id is None)} new, "
+            f"{sum(1 for file_id in uploads.values() if file_id)} changed, "
+            f"{len(unchanged)} unchanged, {len(removed)} only on Drive"
+        )
+        if removed and sync_delete:
+            trash_failed = trash_remote_files(removed, client)
+    else:
+        folder_id = find_or_create_folder(folder_id, job_name, client)
+        uploads = dict.fromkeys(xml_files)
+
+    # Upload files in parallel
+    started = monotonic()
+    uploaded, failed, uploaded_bytes = upload_files_concurrently(
+        folder_id, uploads, client, concurrency, retries, resumable_threshold
+    )
+    elapsed = monotonic() - started
+    failed += trash_failed
+
+    megabytes = uploaded_bytes / (1024 * 1024)
+    logger.info(
+        f"Summary: {uploaded} uploaded, {failed} failed, "
+        f"{megabytes:.2f} MB in {elapsed:.1f}s "
+        f"({megabytes / elapsed if elapsed else 0:.2f} MB/s, concurrency {concurrency})"
+    )
 
     if failed > 0:
         exit(1)
 
 
-def trash_gdrive_folder(folder_id: str, access_token: str) -> bool:
-    """Trash a folder in Google Drive (moves to trash)."""
-    headers = set_headers(access_token)
+def _call_job_api(request: Request, deadline: float, description: str) -> dict:
+    """
+    Send a CI API request, retrying throttling, 5xx and network errors with
+    exponential backoff and full jitter until deadline (a monotonic() time).
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            with urlopen(request, timeout=max(1, deadline - monotonic())) as response:
+                body = response.read().decode("utf-8")
+                return loads(body) if body else {}
+        except HTTPError as e:
+            error_msg = f"HTTP {e.code}: {e.read().decode('utf-8', errors='replace')}"
+            if e.code not in RETRYABLE_STATUS_CODES:
+                raise Exception(f"{description} failed: {error_msg}")
+        except (OSError, HTTPException) as e:
+            error_msg = str(e)
+
+        delay = uniform(0, min(TRIGGER_RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+        if monotonic() + delay >= deadline:
+            raise Exception(f"{description} failed after {attempt} attempts: {error_msg}")
+        logger.warning(
+            f"{description} attempt {attempt} failed: {error_msg}. Retrying in {delay:.1f} seconds..."
+        )
+        sleep(delay)
+
+
+def poll_job_status(status_url: str, headers: dict, deadline: float) -> dict:
+    """
+    Poll a triggered job until it leaves the queue.
 
-    # Update the folder to set trashed=true
-    data = dumps({"trashed": True}).encode("utf-8")
+    Returns:
+        The last status response, once job_status shows the job was picked up
 
-    request = Request(
-        f"{GDRIVE_API_URL}/{folder_id}?supportsAllDrives=true",
-        data=data,
-        headers=headers,
-        method="PATCH",
-    )
+    Raises:
+        Exception: If the job failed to start or was still queued at deadline
+    """
+    while True:
+        status = _call_job_api(Request(status_url, headers=headers), deadline, "Polling job status")
+        job_status = str(status.get("job_status", "")).upper()
 
-    try:
-        with urlopen(request) as response:
-            logger.info(f"Trashed folder if it exists")
-            return True
-    except HTTPError as e:
-        if e.code == 404:
-            logger.warning(f"Folder not found, skipping trash")
-            return False
-        error_body = e.read().decode("utf-8")
-        raise Exception(f"HTTP {e.code}: {error_body}")
+        if job_status in TRIGGER_FAILED_STATUSES:
+            raise Exception(f"Job execution {status.get('id')} ended with status {job_status}")
+        if job_status not in TRIGGER_QUEUED_STATUSES:
+            logger.info(f"Job execution {status.get('id')} is {job_status}")
+            return status
+        if monotonic() + TRIGGER_POLL_INTERVAL >= deadline:
+            raise Exception(f"Job execution {status.get('id')} still {job_status or 'queued'} at timeout")
+        sleep(TRIGGER_POLL_INTERVAL)
 
 
 def trigger_job_execution(job_execution_type: str = "1", envs: dict = None) -> dict:
     """
     Trigger a job execution via Gangway API.
 
+    Configuration comes from TOKEN, JOB_NAME and API_URL. Retries back off
+    exponentially with jitter for up to TRIGGER_TIMEOUT seconds. If
+    TRIGGER_STATUS_URL is set, the job's status is then polled until it is
+    picked up, within the same timeout.
+
     Args:
-        token: Bearer token for authentication
-        job_name: Name of the job to execute
         job_execution_type: Execution type (default "1")
         envs: Dictionary of environment variables to override
 
     Returns:
-       Response JSON as dict
+       Response JSON as dict (the last status response when polling)
 
     Raises:
-        Exception: If the API request fails after 3 retries
+        Exception: If the API request fails or the timeout expires
     """
     # Build payload
     token = validate_environment(getenv("TOKEN"), "TOKEN")
     job_name = validate_environment(getenv("JOB_NAME"), "JOB_NAME")
     api_url = validate_environment(getenv("API_URL"), "API_URL")
+    status_url = getenv("TRIGGER_STATUS_URL")
+    deadline = monotonic() + positive_int_from_env("TRIGGER_TIMEOUT", DEFAULT_TRIGGER_TIMEOUT)
 
     payload = {"job_name": job_name, "job_execution_type": job_execution_type}
 
@@ -336,61 +629,22 @@ def trigger_job_execution(job_execution_type: str = "1", envs: dict = None) -> d
     # Headers
     headers = set_headers(token)
 
-    # Retry logic: 3 attempts with 1 minute delay
-    max_retries = 3
-    retry_delay = 60  # seconds
-
-    for attempt in range(1, max_retries + 1):
-        try:
-            # Create request
-            request = Request(
-                api_url,
-                data=dumps(payload).encode("utf-8"),
-                headers=headers,
-                method="POST",
-            )
-
-            # Execute request
-            with urlopen(request) as response:
-                if response.status == 200:
-                    result = loads(response.read().decode("utf-8"))
-                    return result
-                else:
-                    error_msg = (
-                        f"HTTP {response.status}: {response.read().decode('utf-8')}"
-                    )
-                    if attempt < max_retries:
-                        logger.warning(
-                            f"Attempt {attempt} failed: {error_msg}. Retrying in {retry_delay} seconds..."
-                        )
-                        sleep(retry_delay)
-                    else:
-                        logger.error(
-                            f"Failed after {max_retries} attempts: {error_msg}"
-                        )
-                        raise Exception(
-                            f"Failed after {max_retries} attempts: {error_msg}"
-                        )
+    request = Request(
+        api_url,
+        data=dumps(payload).encode("utf-8"),
+        headers=headers,
+        method="POST",
+    )
+    result = _call_job_api(request, deadline, f"Triggering job {job_name}")
+    logger.info(f"Triggered job {job_name} (execution ID: {result.get('id')})")
 
-        except HTTPError as e:
-            error_body = e.read().decode("utf-8")
-            error_msg = f"HTTP {e.code}: {error_body}"
+    if status_url:
+        if not result.get("id"):
+            logger.warning("Trigger response has no execution ID, skipping status polling")
+        else:
+            result = poll_job_status(status_url.format(id=result["id"]), headers, deadline)
 
-            if attempt < max_retries:
-                logger.warning(
-                    f"Attempt {attempt} failed: {error_msg}. Retrying in {retry_delay} seconds..."
-                )
-                sleep(retry_delay)
-            else:
-                raise Exception(f"Failed after {max_retries} attempts: {error_msg}")
-        except Exception as e:
-            if attempt < max_retries:
-                logger.warning(
-                    f"Attempt {attempt} failed: {str(e)}. Retrying in {retry_delay} seconds..."
-                )
-                sleep(retry_delay)
-            else:
-                raise Exception(f"Failed after {max_retries} attempts: {str(e)}")
+    return result
 
 
 def main():
@@ -400,8 +654,28 @@ def main():
         datefmt="%b %d %H:%M:%S",
         stream=stderr,
     )
-    upload_xml_files()
-    trigger_job_execution()
+    if getenv("TRIGGER_DURING_UPLOAD", "false").lower() != "true":
+        # The job reads the uploaded folder, so only trigger it once every
+        # file is there; a failed upload raises before the trigger is sent.
+        upload_xml_files()
+        trigger_job_execution()
+        return
+
+    # Opt-in: the trigger spends its time waiting on the CI API, so run it
+    # alongside the uploads: wall time becomes the longer of the two, not
+    # their sum, but the job may start before the folder is complete.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        trigger = executor.submit(trigger_job_execution)
+        try:
+            upload_xml_files()
+        finally:
+            # A sent trigger can't be recalled, so always wait for it.
+            trigger_error = trigger.exception()
+            if isinstance(trigger_error, Exception):
+                logger.error(f"Job trigger failed: {trigger_error}")
+
+    if trigger_error is not None:
+        exit(1)
 
 
 if __name__ == "__main__":
@@ -14,21 +14,41 @@ behaved correctly, but because a stale value from a previous case happened
 to satisfy the assertion. A fresh process per case gives every case a
 genuinely blank slate.
 
+Because every case is already its own process, cases are independent and
+can run side by side: `run_tests.py -j N` keeps up to N ansible-playbook
+processes going at once, each with its own ANSIBLE_LOCAL_TEMP /
+ANSIBLE_REMOTE_TEMP directory. Results print as cases finish; the closing
+summary is always in case order. The default (-j 1) runs them one at a time.
+
+Most of a short case's wall time is ansible-playbook's own startup (Python
+imports, plugin and collection loader setup), not the role under test.
+`run_tests.py --warm` pays that once: the runner imports Ansible itself,
+then forks one child per case that calls the ansible-playbook CLI entry
+point directly. Each case is still a separate process that starts from the
+same pristine, pre-playbook state, so the no-fact-bleed guarantee above
+holds unchanged.
+
 This module holds the runner logic shared by every role's tests/run_tests.py
 wrapper. It is intentionally role-agnostic: it knows nothing about any
 specific role's input vars, only the cases/*.yml + test.yml conventions
 documented in each role's tests/README.md.
 """
 
+import argparse
 import difflib
+import importlib
 import os
 import re
+import shutil
 import subprocess
 import sys
 import tempfile
+import traceback
+import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, NoReturn, Optional
 
 # Fixtures are trusted, hand-written YAML with a flat `expect_failure: true`
 # key - a regex match avoids pulling in PyYAML just to read one boolean.
@@ -52,6 +72,22 @@ DIFF_PAIR_RE = re.compile(r"^(.*expected ')([^']*)(', got ')([^']*)('.*)$")
 # has no quoted expected value to diff against.
 DIFF_GOT_ONLY_RE = re.compile(r"^(.*got ')([^']*)('.*)$")
 
+# What an ansible-playbook process spends most of its startup importing,
+# loaded once in --warm mode. ansible.cli itself is left out on purpose:
+# importing it checks that stdin/stdout/stderr are blocking, and that check
+# must run against each case's log file in the child, not against the
+# runner's own terminal.
+WARM_IMPORTS = (
+    "ansible.constants",
+    "ansible.executor.playbook_executor",
+    "ansible.inventory.manager",
+    "ansible.parsing.dataloader",
+    "ansible.playbook",
+    "ansible.plugins.loader",
+    "ansible.template",
+    "ansible.vars.manager",
+)
+
 _GREEN = "\x1b[32m"
 _RED = "\x1b[31m"
 _BOLD = "\x1b[1m"
@@ -153,35 +189,189 @@ def assertion_diffs(log_file: Path) -> list[str]:
     return seen
 
 
-def run_case(test_playbook: Path, case_file: Path) -> CaseResult:
+def playbook_args(test_playbook: Path, case_file: Path) -> list[str]:
+    return ["ansible-playbook", str(test_playbook), "-e", f"@{case_file}"]
+
+
+def case_result(case_file: Path, returncode: int, log_file: Path) -> CaseResult:
+    """Build a case's result, discarding its log if it passed."""
+    result = CaseResult(case_file.stem, expects_failure(case_file), returncode != 0, log_file)
+    if result.passed:
+        log_file.unlink()
+        result.log_file = None
+    return result
+
+
+def run_case(test_playbook: Path, case_file: Path, tmp_root: Path) -> CaseResult:
     """Run one fixture through test.yml in its own ansible-playbook process
     and capture its combined stdout/stderr to a temp file. The log is only
     useful for diagnosing a failure, so main() deletes it for passing cases
-    and prints its path for failing ones."""
+    and prints its path for failing ones.
+
+    Ansible's local/remote tmp for the case is a fresh directory under
+    tmp_root, removed afterwards, so concurrently running cases never share
+    (or clean up) each other's module staging files."""
     name = case_file.stem
-    expect_failure = expects_failure(case_file)
+    case_tmp_dir = tempfile.mkdtemp(prefix=f"{name}-", dir=tmp_root)
+    env = dict(os.environ, ANSIBLE_LOCAL_TEMP=case_tmp_dir, ANSIBLE_REMOTE_TEMP=case_tmp_dir)
 
     fd, log_path = tempfile.mkstemp(prefix=f"{name}-")
     log_file = Path(log_path)
-    with os.fdopen(fd, "w") as log:
-        proc = subprocess.run(
-            ["ansible-playbook", str(test_playbook), "-e", f"@{case_file}"],
-            stdout=log,
-            stderr=subprocess.STDOUT,
-        )
-
-    result = CaseResult(name, expect_failure, proc.returncode != 0, log_file)
+    try:
+        with os.fdopen(fd, "w") as log:
+            proc = subprocess.run(
+                playbook_args(test_playbook, case_file),
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                env=env,
+            )
+    finally:
+        shutil.rmtree(case_tmp_dir, ignore_errors=True)
+
+    return case_result(case_file, proc.returncode, log_file)
+
+
+def run_cases_in_pool(
+    test_playbook: Path, case_files: list[Path], tmp_root: Path, jobs: int
+) -> Iterator[CaseResult]:
+    """Run each case as a fresh ansible-playbook subprocess, up to jobs at a
+    time, yielding results in completion order."""
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(run_case, test_playbook, case_file, tmp_root) for case_file in case_files
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def warm_up_ansible() -> None:
+    """Import Ansible and set up its plugin loaders in this process, so
+    forked cases start with all of that already done. Raises ImportError if
+    Ansible isn't importable from this interpreter."""
+    for module in WARM_IMPORTS:
+        importlib.import_module(module)
+
+    from ansible.plugins import loader
+
+    # Each case's CLI run calls init_plugin_loader() again; the collection
+    # finder is already installed by then, which Ansible reports with a
+    # harmless Python warning.
+    loader.init_plugin_loader([])
+    warnings.filterwarnings("ignore", message="AnsibleCollectionFinder has already been configured")
+
+    # Jinja filters/tests are loaded for every templar; enumerating them
+    # here imports their modules once for all cases.
+    for plugin_loader in (loader.filter_loader, loader.test_loader):
+        list(plugin_loader.all())
+
+
+def _run_forked_case(test_playbook: Path, case_file: Path, case_tmp_dir: str, log_fd: int) -> NoReturn:
+    """Body of a --warm child: point stdio at the case's log and run the
+    ansible-playbook CLI in-process. Never returns - os._exit() skips the
+    runner's own atexit handlers and buffered output, which belong to the
+    parent."""
+    exit_code = 1
+    try:
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(log_fd, 1)
+        os.dup2(log_fd, 2)
+
+        os.environ["ANSIBLE_LOCAL_TEMP"] = case_tmp_dir
+        os.environ["ANSIBLE_REMOTE_TEMP"] = case_tmp_dir
+        import ansible.constants as C
+
+        # Resolved from the environment when the parent imported it; the
+        # remote tmp is read per plugin load, so only this one needs redoing.
+        C.DEFAULT_LOCAL_TMP = C.config.get_config_value("DEFAULT_LOCAL_TMP")
+
+        from ansible.cli.playbook import main as ansible_playbook
+
+        ansible_playbook(playbook_args(test_playbook, case_file))
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else int(e.code is not None)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(exit_code)
+
+
+def run_cases_forked(
+    test_playbook: Path, case_files: list[Path], tmp_root: Path, jobs: int
+) -> Iterator[CaseResult]:
+    """--warm counterpart of run_cases_in_pool: fork this (already warmed
+    up) process once per case, up to jobs at a time. Forking happens from
+    the main thread only, so no child inherits a lock held by another
+    thread."""
+    pending = list(case_files)
+    running = {}  # pid -> (case_file, log_file, case_tmp_dir)
+
+    while pending or running:
+        while pending and len(running) < jobs:
+            case_file = pending.pop(0)
+            case_tmp_dir = tempfile.mkdtemp(prefix=f"{case_file.stem}-", dir=tmp_root)
+            fd, log_path = tempfile.mkstemp(prefix=f"{case_file.stem}-")
+
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                _run_forked_case(test_playbook, case_file, case_tmp_dir, fd)
+            os.close(fd)
+            running[pid] = (case_file, Path(log_path), case_tmp_dir)
+
+        pid, status = os.wait()
+        case_file, log_file, case_tmp_dir = running.pop(pid)
+        shutil.rmtree(case_tmp_dir, ignore_errors=True)
+        yield case_result(case_file, os.waitstatus_to_exitcode(status), log_file)
+
+
+def print_result(result: CaseResult) -> None:
     if result.passed:
-        log_file.unlink()
-        result.log_file = None
-
-    return result
+        print(f"{_color('PASS', _GREEN, _BOLD)}  {result.name}", flush=True)
+        return
+
+    got = "fail" if result.actual_failure else "pass"
+    print(
+        f"{_color('FAIL', _RED, _BOLD)}  {result.name}  "
+        f"(expected_failure={str(result.expect_failure).lower()}, "
+        f"got={got}, log: {result.log_file})",
+        flush=True,
+    )
+    for diff in assertion_diffs(result.log_file):
+        print(f"        {highlight_diff(diff)}", flush=True)
+
+
+def parse_args(argv: Optional[list[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run this role's cases/*.yml fixtures through test.yml.")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="run up to N cases at once (0 = one per CPU; default: 1)",
+    )
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="import Ansible once and fork each case from this process instead "
+        "of starting a new ansible-playbook (needs Ansible importable from this Python)",
+    )
+    args = parser.parse_args(argv)
+    if args.jobs < 0:
+        parser.error("--jobs must be 0 or greater")
+    args.jobs = args.jobs or os.cpu_count() or 1
+    return args
 
 
-def main(script_dir: Path) -> int:
+def main(script_dir: Path, argv: Optional[list[str]] = None) -> int:
     """Run every cases/*.yml fixture under script_dir through script_dir's
     test.yml. Intended to be called from a role's tests/run_tests.py with
-    script_dir = that file's own directory."""
+    script_dir = that file's own directory; argv defaults to sys.argv[1:]."""
+    args = parse_args(argv)
     cases_dir = script_dir / "cases"
     test_playbook = script_dir / "test.yml"
 
@@ -196,32 +386,33 @@ def main(script_dir: Path) -> int:
     # Ansible defaults local/remote tmp to ~/.ansible/tmp. Under restricted
     # container UIDs (e.g. OpenShift's arbitrary-UID SCC), $HOME can resolve
     # to a read-only path, so module execution fails before any assertion
-    # runs. Point both at a fresh, always-writable directory for the test
-    # runner only - real playbook runs keep ansible.cfg's default.
-    tmp_dir = tempfile.mkdtemp(prefix="ansible-role-test-tmp-")
-    os.environ["ANSIBLE_LOCAL_TEMP"] = tmp_dir
-    os.environ["ANSIBLE_REMOTE_TEMP"] = tmp_dir
+    # runs. Each case gets its own fresh, always-writable directory under
+    # this one (see run_case) - real playbook runs keep ansible.cfg's default.
+    tmp_root = Path(tempfile.mkdtemp(prefix="ansible-role-test-tmp-"))
 
     # Print each result as its case finishes rather than batching output
     # until the end - a full run is several seconds per case, and a runner
     # that goes silent for a while looks hung.
-    results = []
-    for case_file in sorted(cases_dir.glob("*.yml")):
-        result = run_case(test_playbook, case_file)
-        results.append(result)
+    case_files = sorted(cases_dir.glob("*.yml"))
+    run_cases = run_cases_in_pool
+    if args.warm:
+        try:
+            warm_up_ansible()
+            run_cases = run_cases_forked
+        except ImportError as e:
+            print(f"--warm unavailable ({e}), running ansible-playbook per case", flush=True)
 
-        if result.passed:
-            print(f"{_color('PASS', _GREEN, _BOLD)}  {result.name}", flush=True)
-        else:
-            got = "fail" if result.actual_failure else "pass"
-            print(
-                f"{_color('FAIL', _RED, _BOLD)}  {result.name}  "
-                f"(expected_failure={str(result.expect_failure).lower()}, "
-                f"got={got}, log: {result.log_file})",
-                flush=True,
-            )
-            for diff in assertion_diffs(result.log_file):
-                print(f"        {highlight_diff(diff)}", flush=True)
+    results = []
+    try:
+        for result in run_cases(test_playbook, case_files, tmp_root, args.jobs):
+            results.append(result)
+            print_result(result)
+    finally:
+        shutil.rmtree(tmp_root, ignore_errors=True)
+
+    # Completion order varies with -j; the summary doesn't.
+    order = {case_file.stem: index for index, case_file in enumerate(case_files)}
+    results.sort(key=lambda result: order[result.name])
 
     failed = [result for result in results if not result.passed]
     print("----")